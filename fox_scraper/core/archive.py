@@ -0,0 +1,130 @@
+# fox_scraper/core/archive.py
+import json
+import logging
+import os
+import zlib
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK = 64 * 1024
+
+
+class ResponseArchive:
+    """Append-only archive of fetched responses in compressed segment files
+
+    Each record is its own gzip member holding a JSON header line followed by
+    the raw body, so a segment can be streamed with plain `zcat` and any record
+    can be read back from its (segment, offset) pair. Every crawl starts a new
+    segment; old segments are never reopened for writing.
+    """
+
+    def __init__(self, directory, segment_size=64 * 1024 * 1024):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.segment_name = None
+        self.segment_file = None
+        self.sequence = 0
+        self.records_written = 0
+
+    def open_segment(self):
+        """Start a new segment file"""
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        self.sequence += 1
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+        self.segment_name = f'{stamp}-{os.getpid()}-{self.sequence:04d}.seg.gz'
+        self.segment_file = open(os.path.join(self.directory, self.segment_name), 'ab')
+
+    def write(self, url, status, headers, body, meta=None):
+        """Append a response record and return its (segment, offset)"""
+        if self.segment_file is None or self.segment_file.tell() >= self.segment_size:
+            self.open_segment()
+
+        header = {
+            'url': url,
+            'status': status,
+            'headers': headers,
+            'meta': meta or {},
+            'fetched_at': datetime.utcnow().isoformat(),
+            'length': len(body)
+        }
+        record = json.dumps(header, ensure_ascii=False).encode('utf-8') + b'\n' + body
+        offset = self.segment_file.tell()
+        self.segment_file.write(gzip_member(record))
+        self.segment_file.flush()
+        self.records_written += 1
+        return self.segment_name, offset
+
+    def close(self):
+        if self.segment_file is not None:
+            self.segment_file.close()
+            self.segment_file = None
+
+    def segments(self):
+        """Segment names in the order they were written"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if name.endswith('.seg.gz'))
+
+    def records(self):
+        """Yield (segment, offset, header, body) for every archived response"""
+        for segment in self.segments():
+            path = os.path.join(self.directory, segment)
+            with open(path, 'rb') as f:
+                for offset, record in iter_members(f, path):
+                    header, body = split_record(record)
+                    yield segment, offset, header, body
+
+    def read(self, segment, offset):
+        """Read back a single record as (header, body)"""
+        path = os.path.join(self.directory, segment)
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for _, record in iter_members(f, path, offset=offset):
+                return split_record(record)
+        raise KeyError(f"No archived record at {segment}:{offset}")
+
+
+def gzip_member(data):
+    """Compress data as one gzip member"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def split_record(record):
+    """Split a decompressed record into its header dict and body bytes"""
+    header_line, _, body = record.partition(b'\n')
+    return json.loads(header_line), body
+
+
+def iter_members(f, path, offset=0):
+    """Yield (offset, data) for each gzip member from the current position
+
+    A truncated or corrupt trailing member, as left by a crash mid-write,
+    ends the segment with a warning instead of failing the whole read.
+    """
+    buffer = b''
+    while True:
+        start = offset
+        decompressor = zlib.decompressobj(31)
+        parts = []
+        try:
+            while not decompressor.eof:
+                if not buffer:
+                    buffer = f.read(READ_CHUNK)
+                    if not buffer:
+                        if offset > start:
+                            logger.warning(f"Truncated record at {path}:{start}")
+                        return
+                parts.append(decompressor.decompress(buffer))
+                if decompressor.eof:
+                    offset += len(buffer) - len(decompressor.unused_data)
+                    buffer = decompressor.unused_data
+                else:
+                    offset += len(buffer)
+                    buffer = b''
+        except zlib.error as e:
+            logger.warning(f"Corrupt record at {path}:{start}: {str(e)}")
+            return
+        yield start, b''.join(parts)
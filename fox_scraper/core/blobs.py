@@ -0,0 +1,129 @@
+# fox_scraper/core/blobs.py
+import hashlib
+import zlib
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from .database import ContentBlob
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+
+# Blobs no raw_data, raw_data_history or cleaned_data row refers to
+DELETE_ORPHANS_SQL = text("""
+    DELETE FROM content_blobs b
+    WHERE b.created_at < :cutoff
+      AND NOT EXISTS (SELECT 1 FROM raw_data r WHERE r.raw_content ->> 'html_ref' = b.digest)
+      AND NOT EXISTS (SELECT 1 FROM raw_data_history h WHERE h.raw_content ->> 'html_ref' = b.digest)
+      AND NOT EXISTS (SELECT 1 FROM cleaned_data c WHERE c.data_json ->> 'html_ref' = b.digest)
+""")
+
+
+def content_digest(text):
+    """Content address of a text blob"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def compress(text):
+    """Compress text with zstd when installed, zlib otherwise"""
+    data = text.encode('utf-8')
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(data)
+    return 'zlib', zlib.compress(data, 9)
+
+
+def decompress(encoding, data):
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    if encoding == 'zlib':
+        return zlib.decompress(data).decode('utf-8')
+    raise ValueError(f"Unknown blob encoding: {encoding}")
+
+
+class BlobStore:
+    """Content-addressed store for entry HTML in the content_blobs table
+
+    Rows in raw_data/cleaned_data keep only the digest. A snippet that was
+    already stored, in this or any earlier run, is written once.
+    """
+
+    def __init__(self, max_known=100000):
+        self.known = set()  # Digests committed by this process
+        self.pending = set()  # Digests written in the open transaction
+        self.max_known = max_known
+
+    def put(self, session, text):
+        """Store text if new and return its digest"""
+        digest = content_digest(text)
+        if digest in self.known or digest in self.pending:
+            return digest
+
+        encoding, data = compress(text)
+        session.execute(
+            insert(ContentBlob).values(
+                digest=digest,
+                encoding=encoding,
+                data=data,
+                size=len(text)
+            ).on_conflict_do_nothing(index_elements=[ContentBlob.digest])
+        )
+        self.pending.add(digest)
+        return digest
+
+    def put_many(self, session, texts):
+        """Store new texts in one multi-row insert and return their digests in order"""
+        digests = [content_digest(text) for text in texts]
+        rows = {}
+        for digest, text in zip(digests, texts):
+            if digest in self.known or digest in self.pending or digest in rows:
+                continue
+            encoding, data = compress(text)
+            rows[digest] = dict(digest=digest, encoding=encoding, data=data, size=len(text))
+
+        if rows:
+            session.execute(
+                insert(ContentBlob).values(list(rows.values())).on_conflict_do_nothing(
+                    index_elements=[ContentBlob.digest]
+                )
+            )
+            self.pending.update(rows)
+        return digests
+
+    def committed(self):
+        """Call after the session commits so stored digests are remembered"""
+        if len(self.known) + len(self.pending) > self.max_known:
+            self.known.clear()
+        self.known.update(self.pending)
+        self.pending.clear()
+
+    def rolled_back(self):
+        """Call after a rollback; blobs written in it were discarded"""
+        self.pending.clear()
+
+    def get(self, session, digest):
+        """Load and decompress a blob, or None if it does not exist"""
+        blob = session.get(ContentBlob, digest)
+        if blob is None:
+            return None
+        return decompress(blob.encoding, blob.data)
+
+
+def delete_orphan_blobs(session, older_than_days=7):
+    """Delete blobs left without references by compaction and expired history
+
+    Blobs younger than older_than_days are kept, since a crawl may have
+    stored one whose row it has not committed yet. Returns the blobs deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    try:
+        deleted = session.execute(DELETE_ORPHANS_SQL, {'cutoff': cutoff}).rowcount
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return deleted
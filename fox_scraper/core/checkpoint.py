@@ -0,0 +1,79 @@
+# fox_scraper/core/checkpoint.py
+import json
+import os
+import tempfile
+from datetime import datetime
+
+
+class CheckpointJournal:
+    """Per-run record of completed pages and pending requests
+
+    The journal is a small JSON file named after the ScrapingRun id. Every
+    flush writes a temporary file and renames it over the old one, so a crash
+    leaves either the previous or the new state on disk, never a torn file.
+    """
+
+    def __init__(self, directory, run_id):
+        self.path = os.path.join(directory, f'run_{run_id}.json')
+        self.run_id = run_id
+        self.completed_pages = set()
+        self.pending = {}  # url -> request meta needed to re-issue it
+        self.last_page = None
+        self.end_seen = False
+        self.dirty = False
+
+    @classmethod
+    def load(cls, directory, run_id):
+        """Load the journal of a run, or an empty one if none was written"""
+        journal = cls(directory, run_id)
+        if os.path.exists(journal.path):
+            with open(journal.path, encoding='utf-8') as f:
+                state = json.load(f)
+            journal.completed_pages = set(state.get('completed_pages', []))
+            journal.pending = state.get('pending', {})
+            journal.last_page = state.get('last_page')
+            journal.end_seen = state.get('end_seen', False)
+        return journal
+
+    def mark_pending(self, url, meta):
+        """Record a request that has been scheduled but not yet handled"""
+        self.pending[url] = meta
+        self.dirty = True
+
+    def mark_completed(self, url, page=None):
+        """Record a handled request and, for listing pages, its page number"""
+        self.pending.pop(url, None)
+        if page is not None:
+            self.completed_pages.add(page)
+        self.dirty = True
+
+    def frontier_page(self):
+        """Highest page number that was either completed or scheduled"""
+        pages = list(self.completed_pages)
+        pages += [meta['page'] for meta in self.pending.values() if meta.get('page')]
+        return max(pages) if pages else 0
+
+    def flush(self):
+        """Atomically write the journal to disk if it changed"""
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        state = {
+            'run_id': self.run_id,
+            'completed_pages': sorted(self.completed_pages),
+            'pending': self.pending,
+            'last_page': self.last_page,
+            'end_seen': self.end_seen,
+            'updated_at': datetime.utcnow().isoformat()
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        self.dirty = False
@@ -0,0 +1,209 @@
+# fox_scraper/core/cleaning.py
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from sqlalchemy import text, update
+from sqlalchemy.dialects.postgresql import insert
+import pandas as pd
+from .database import RawData, CleanedData
+from .normalize import normalize_frame
+
+logger = logging.getLogger(__name__)
+
+# Lock a chunk of pending rows; rows locked by another worker are skipped,
+# so concurrent workers end up with disjoint id ranges
+CLAIM_SQL = text("""
+    SELECT id, source_id, raw_content
+    FROM raw_data
+    WHERE processing_status = 'pending' AND id > :after_id
+    ORDER BY id
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+""")
+
+
+def records_frame(raw_contents):
+    """Columns of the fields the normalizer works on"""
+    addresses = [raw_content.get('address') or {} for raw_content in raw_contents]
+    return pd.DataFrame({
+        'name': [raw_content.get('name') for raw_content in raw_contents],
+        'category': [raw_content.get('category') for raw_content in raw_contents],
+        'street': [address.get('street') for address in addresses],
+        'city': [address.get('city') for address in addresses],
+        'phone': [raw_content.get('phone') for raw_content in raw_contents],
+        'opening_hours': [raw_content.get('opening_hours') for raw_content in raw_contents],
+    })
+
+
+def clean_records(raw_contents):
+    """Cleaned_data fields for a list of raw_content dicts, normalized as one frame"""
+    normalized = normalize_frame(records_frame(raw_contents))
+    cleaned = []
+    for raw_content, row in zip(raw_contents, normalized.itertuples(index=False)):
+        missing = [
+            field for field, value in (('name', row.name), ('postcode', row.postcode), ('phone', row.phone_e164))
+            if not value
+        ]
+        cleaned.append(dict(
+            name=row.name,
+            category=row.category,
+            address={
+                'street': row.street,
+                'house_number': row.house_number,
+                'postcode': row.postcode,
+                'city': row.city,
+            },
+            contact={
+                'phone': row.phone,
+                'phone_e164': row.phone_e164,
+                'hours': row.opening_hours
+            },
+            data_json={
+                'page_number': raw_content.get('page_number'),
+                'subtitle': raw_content.get('subtitle', ''),
+                'html_ref': raw_content.get('html_ref')
+            },
+            validation_status=row.validation_status,
+            validation_errors=[f'missing {field}' for field in missing] or None
+        ))
+    return cleaned
+
+
+def clean_batch(rows):
+    """Clean (id, source_id, raw_content) rows; runs in a worker process
+
+    Returns (id, cleaned row or None, error or None) per input row. The
+    batch is normalized as one frame; if that fails it is split in halves
+    until the broken rows are isolated, so good rows stay vectorized.
+    """
+    results = {}
+    valid = []
+    for row in rows:
+        if isinstance(row[2], dict):
+            valid.append(row)
+        else:
+            results[id(row)] = (row[0], None, f"raw_content is {type(row[2]).__name__}, not an object")
+
+    pending = [valid] if valid else []
+    while pending:
+        part = pending.pop()
+        try:
+            cleaned = clean_records([raw_content for _, _, raw_content in part])
+        except Exception as e:
+            if len(part) == 1:
+                results[id(part[0])] = (part[0][0], None, str(e))
+            else:
+                middle = len(part) // 2
+                pending.extend([part[:middle], part[middle:]])
+            continue
+        for row, cleaned_row in zip(part, cleaned):
+            cleaned_row.update(raw_data_id=row[0], source_id=row[1])
+            results[id(row)] = (row[0], cleaned_row, None)
+
+    return [results[id(row)] for row in rows]
+
+
+def upsert_cleaned(session, rows):
+    """Insert cleaned_data rows, replacing the existing row of a raw_data id"""
+    if not rows:
+        return
+    now = datetime.utcnow()
+    for row in rows:
+        row.setdefault('cleaned_at', now)
+    stmt = insert(CleanedData).values(rows)
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=[CleanedData.raw_data_id],
+        set_={
+            column: stmt.excluded[column]
+            for column in ('source_id', 'name', 'category', 'address', 'contact',
+                           'data_json', 'cleaned_at', 'validation_status', 'validation_errors')
+        }
+    ))
+
+
+class CleaningWorker:
+    """Cleans pending raw_data rows in chunks, outside the crawl
+
+    Each chunk is claimed, cleaned in a process pool, written and marked
+    in one transaction. A worker that dies leaves its chunk pending for the
+    next one, and re-cleaning a row only replaces its cleaned_data row, so
+    any number of workers can run side by side.
+    """
+
+    def __init__(self, db, chunk_size=5000, processes=None, batch_size=500):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.processes = processes
+        self.batch_size = batch_size
+        self.cleaned = 0
+        self.failed = 0
+
+    def reset(self, session, statuses=('processed', 'failed')):
+        """Mark already cleaned rows pending again, e.g. after the rules changed"""
+        count = session.execute(
+            update(RawData).where(
+                RawData.processing_status.in_(statuses),
+                RawData.hash.isnot(None)
+            ).values(processing_status='pending').execution_options(synchronize_session=False)
+        ).rowcount
+        session.commit()
+        return count
+
+    def run(self, max_chunks=None):
+        """Clean chunks until no pending rows are left, returns rows handled"""
+        start = time.perf_counter()
+        after_id = 0
+        chunks = 0
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            while max_chunks is None or chunks < max_chunks:
+                handled, after_id = self.run_chunk(pool, after_id)
+                if not handled:
+                    break
+                chunks += 1
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    f"Cleaned {self.cleaned} rows, {self.failed} failed, up to id {after_id} "
+                    f"({(self.cleaned + self.failed) / elapsed:,.0f} rows/sec)"
+                )
+        return self.cleaned + self.failed
+
+    def run_chunk(self, pool, after_id):
+        """Claim, clean and write one chunk; returns (rows, last id)"""
+        session = self.db.get_session()
+        try:
+            rows = session.execute(CLAIM_SQL, {'after_id': after_id, 'limit': self.chunk_size}).all()
+            if not rows:
+                session.rollback()
+                return 0, after_id
+
+            rows = [tuple(row) for row in rows]
+            batches = [rows[i:i + self.batch_size] for i in range(0, len(rows), self.batch_size)]
+            cleaned, processed, failed = [], [], []
+            for results in pool.map(clean_batch, batches):
+                for raw_data_id, row, error in results:
+                    if row is None:
+                        logger.error(f"Error cleaning raw_data {raw_data_id}: {error}")
+                        failed.append(raw_data_id)
+                    else:
+                        cleaned.append(row)
+                        processed.append(raw_data_id)
+
+            upsert_cleaned(session, cleaned)
+            for status, ids in (('processed', processed), ('failed', failed)):
+                if ids:
+                    session.execute(
+                        update(RawData).where(RawData.id.in_(ids)).values(
+                            processing_status=status
+                        ).execution_options(synchronize_session=False)
+                    )
+            session.commit()
+            self.cleaned += len(processed)
+            self.failed += len(failed)
+            return len(rows), rows[-1][0]
+
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
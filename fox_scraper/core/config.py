@@ -0,0 +1,157 @@
+# fox_scraper/core/config.py
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+load_dotenv()
+
+_lock = threading.Lock()
+_engines = {}  # url -> (pid, engine, session factory)
+
+
+def database_url():
+    """Connection URL built from the DB_* environment variables"""
+    return (
+        f"postgresql://{os.getenv('DB_USER', 'postgres')}:"
+        f"{os.getenv('DB_PASSWORD', 'Milena84')}@"
+        f"{os.getenv('DB_HOST', '192.168.1.164')}:"
+        f"{os.getenv('DB_PORT', '5432')}/"
+        f"{os.getenv('DB_NAME', 'fox_db')}"
+    )
+
+
+def pool_options():
+    """Pool settings from DB_POOL_* environment variables"""
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'statement_timeout_ms': int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '60000')),
+    }
+
+
+class PoolMetrics:
+    """Checkout counts and wait times of one engine's connection pool"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record_checkout(self, waited, timed_out=False):
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def record_connect(self):
+        with self.lock:
+            self.connects += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': self.wait_seconds / self.checkouts * 1000 if self.checkouts else 0.0,
+                'max_wait_ms': self.max_wait_seconds * 1000,
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    metrics = None  # PoolMetrics, set by build_engine
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.metrics.record_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def build_engine(url):
+    options = pool_options()
+    metrics = PoolMetrics()
+
+    connect_args = {}
+    if url.startswith('postgresql') and options['statement_timeout_ms']:
+        connect_args['options'] = f"-c statement_timeout={options['statement_timeout_ms']}"
+
+    engine = create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=options['pool_size'],
+        max_overflow=options['max_overflow'],
+        pool_timeout=options['pool_timeout'],
+        pool_recycle=options['pool_recycle'],
+        pool_pre_ping=True,
+        pool_use_lifo=True,  # Reuse the warmest connection, let idle ones expire
+        connect_args=connect_args
+    )
+    engine.pool.metrics = metrics
+    engine.pool_metrics = metrics
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        metrics.record_connect()
+
+    return engine
+
+
+def _registered(url):
+    """Engine and session factory for a URL, created once per process"""
+    url = url or database_url()
+    with _lock:
+        entry = _engines.get(url)
+        if entry and entry[0] != os.getpid():
+            # Forked worker: never share the parent's sockets
+            entry[1].dispose(close=False)
+            entry = None
+        if entry is None:
+            engine = build_engine(url)
+            entry = (os.getpid(), engine, sessionmaker(bind=engine))
+            _engines[url] = entry
+        return entry
+
+
+def get_engine(url=None):
+    """Process-wide pooled engine, shared by spider, pipelines and tools"""
+    return _registered(url)[1]
+
+
+def get_session_factory(url=None):
+    """Session factory bound to the shared engine"""
+    return _registered(url)[2]
+
+
+def pool_stats(url=None):
+    """Pool metrics plus the pool's current state"""
+    engine = get_engine(url)
+    return {
+        **engine.pool_metrics.snapshot(),
+        'pool_size': engine.pool.size(),
+        'checked_out': engine.pool.checkedout(),
+        'overflow': engine.pool.overflow(),
+    }
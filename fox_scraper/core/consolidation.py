@@ -0,0 +1,448 @@
+# fox_scraper/core/consolidation.py
+import hashlib
+import logging
+import re
+import time
+from collections import defaultdict
+from datetime import datetime
+from difflib import SequenceMatcher
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.postgresql import insert
+from .database import MasterRecord, MasterRecordMember, RecordBlock
+
+logger = logging.getLogger(__name__)
+
+# Words every practice name shares; they say nothing about which practice it is
+NAME_STOPWORDS = {
+    'tierarzt', 'tierarztin', 'tierarzte', 'tierarztpraxis', 'tierarztliche', 'tierarztlicher',
+    'tierklinik', 'kleintierpraxis', 'kleintierklinik', 'gemeinschaftspraxis', 'praxis', 'klinik',
+    'fur', 'und', 'der', 'die', 'das', 'am', 'im', 'an', 'dr', 'med', 'vet', 'prof', 'mvz', 'gmbh',
+}
+TOKEN = re.compile(r'[a-z0-9]+')
+FOLD = str.maketrans({'ä': 'a', 'ö': 'o', 'ü': 'u', 'ß': 'ss'})
+
+# Blocks bigger than this are too unspecific to compare within
+# (e.g. a phonetic key of a very common surname)
+MAX_BLOCK_SIZE = 200
+
+# Record weight by validation status, multiplied with the source confidence
+STATUS_WEIGHT = {'valid': 1.0, 'partial': 0.7, 'invalid': 0.4}
+DEFAULT_SOURCE_CONFIDENCE = 0.8
+
+# Serializes consolidation runs, see Consolidator.run_chunk
+ADVISORY_LOCK_ID = 7310019
+
+# Cleaned rows never consolidated, re-cleaned since, or queued again
+# because their master record lost rows to compaction
+AFFECTED_SQL = text("""
+    SELECT c.id
+    FROM cleaned_data c
+    LEFT JOIN master_record_members m ON m.cleaned_data_id = c.id
+    WHERE c.id > :after_id
+      AND (m.cleaned_data_id IS NULL OR m.consolidated_at IS NULL OR c.cleaned_at > m.consolidated_at)
+    ORDER BY c.id
+    LIMIT :limit
+""")
+
+# Rows sharing a block with the given keys, skipping oversized blocks
+CANDIDATES_SQL = text("""
+    SELECT b.cleaned_data_id
+    FROM record_blocks b
+    JOIN (
+        SELECT block_key
+        FROM record_blocks
+        WHERE block_key = ANY(:keys)
+        GROUP BY block_key
+        HAVING COUNT(*) <= :max_block
+    ) k ON k.block_key = b.block_key
+""")
+
+# Every member of the master records the given rows belong to
+CLUSTER_MEMBERS_SQL = text("""
+    SELECT other.cleaned_data_id
+    FROM master_record_members m
+    JOIN master_record_members other ON other.master_record_id = m.master_record_id
+    WHERE m.cleaned_data_id = ANY(:ids)
+""")
+
+RECORDS_SQL = text("""
+    SELECT c.id, c.raw_data_id, c.source_id, c.name, c.category, c.address, c.contact,
+           c.validation_status, c.cleaned_at, m.master_record_id,
+           COALESCE((s.config->>'confidence')::float, :default_confidence) AS source_confidence
+    FROM cleaned_data c
+    LEFT JOIN master_record_members m ON m.cleaned_data_id = c.id
+    LEFT JOIN data_sources s ON s.id = c.source_id
+    WHERE c.id = ANY(:ids)
+""")
+
+
+def name_tokens(name):
+    """Distinctive lowercase tokens of a practice name"""
+    tokens = TOKEN.findall((name or '').casefold().translate(FOLD))
+    distinctive = [token for token in tokens if token not in NAME_STOPWORDS]
+    return distinctive or tokens
+
+
+def cologne_phonetic(word):
+    """Kölner Phonetik code of a word, the German counterpart of Soundex"""
+    letters = [c for c in word.casefold().translate(FOLD) if 'a' <= c <= 'z']
+    codes = []
+    for i, c in enumerate(letters):
+        before = letters[i - 1] if i else ''
+        after = letters[i + 1] if i + 1 < len(letters) else ''
+        if c in 'aeijouy':
+            code = '0'
+        elif c == 'h':
+            continue
+        elif c == 'b':
+            code = '1'
+        elif c == 'p':
+            code = '3' if after == 'h' else '1'
+        elif c in 'dt':
+            code = '8' if after in ('c', 's', 'z') else '2'
+        elif c in 'fvw':
+            code = '3'
+        elif c in 'gkq':
+            code = '4'
+        elif c == 'c':
+            if i == 0:
+                code = '4' if after in 'ahkloqrux' and after else '8'
+            else:
+                code = '4' if after in 'ahkoqux' and after and before not in ('s', 'z') else '8'
+        elif c == 'x':
+            code = '8' if before in ('c', 'k', 'q') else '48'
+        elif c == 'l':
+            code = '5'
+        elif c in 'mn':
+            code = '6'
+        elif c == 'r':
+            code = '7'
+        else:  # s, z
+            code = '8'
+        codes.append(code)
+
+    collapsed = []
+    for code in ''.join(codes):
+        if not collapsed or collapsed[-1] != code:
+            collapsed.append(code)
+    if not collapsed:
+        return ''
+    return collapsed[0] + ''.join(code for code in collapsed[1:] if code != '0')
+
+
+def name_key(name):
+    """Phonetic key of a name: sorted codes of its distinctive tokens"""
+    codes = sorted(filter(None, (cologne_phonetic(token) for token in name_tokens(name))))
+    return '-'.join(codes)
+
+
+def blocking_keys(record):
+    """Block keys of a cleaned record: postcode, phonetic name and phone"""
+    address = record.get('address') or {}
+    contact = record.get('contact') or {}
+    keys = []
+    if address.get('postcode'):
+        keys.append(f"postcode:{address['postcode']}")
+    key = name_key(record.get('name'))
+    if key:
+        keys.append(f"name:{key}")
+    if contact.get('phone_e164'):
+        keys.append(f"phone:{contact['phone_e164']}")
+    return keys
+
+
+def name_similarity(a, b):
+    return SequenceMatcher(None, ' '.join(sorted(name_tokens(a))), ' '.join(sorted(name_tokens(b)))).ratio()
+
+
+def is_match(a, b):
+    """Whether two cleaned records describe the same practice"""
+    address_a, address_b = a.get('address') or {}, b.get('address') or {}
+    phone_a = (a.get('contact') or {}).get('phone_e164')
+    phone_b = (b.get('contact') or {}).get('phone_e164')
+    similarity = name_similarity(a.get('name'), b.get('name'))
+
+    same_phone = bool(phone_a) and phone_a == phone_b
+    same_place = bool(address_a.get('postcode')) and all(
+        (address_a.get(part) or '').casefold() == (address_b.get(part) or '').casefold()
+        for part in ('postcode', 'street', 'house_number')
+    )
+    if same_phone or same_place:
+        return similarity >= 0.6
+    same_postcode = bool(address_a.get('postcode')) and address_a.get('postcode') == address_b.get('postcode')
+    return same_postcode and similarity >= 0.9
+
+
+def cluster(records):
+    """Group records into matching clusters, comparing only within blocks
+
+    records maps id -> record dict. Returns a list of id sets; every record
+    lands in exactly one of them.
+    """
+    parent = {record_id: record_id for record_id in records}
+
+    def find(record_id):
+        while parent[record_id] != record_id:
+            parent[record_id] = parent[parent[record_id]]
+            record_id = parent[record_id]
+        return record_id
+
+    blocks = defaultdict(list)
+    for record_id, record in records.items():
+        for key in blocking_keys(record):
+            blocks[key].append(record_id)
+
+    compared = set()
+    for members in blocks.values():
+        if len(members) > MAX_BLOCK_SIZE:
+            continue
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                pair = (a, b) if a < b else (b, a)
+                if pair in compared:
+                    continue
+                compared.add(pair)
+                root_a, root_b = find(a), find(b)
+                if root_a != root_b and is_match(records[a], records[b]):
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters = defaultdict(set)
+    for record_id in records:
+        clusters[find(record_id)].add(record_id)
+    return list(clusters.values())
+
+
+def record_weight(record):
+    return record.get('source_confidence', DEFAULT_SOURCE_CONFIDENCE) * STATUS_WEIGHT.get(
+        record.get('validation_status'), STATUS_WEIGHT['invalid']
+    )
+
+
+def vote(records, value_of):
+    """Value with the most weight behind it and its share of the total weight
+
+    Empty values do not vote; ties go to the most recently cleaned record.
+    """
+    support = defaultdict(float)
+    latest = {}
+    values = {}
+    total = 0.0
+    for record in records:
+        weight = record_weight(record)
+        total += weight
+        value = value_of(record)
+        if not value:
+            continue
+        key = repr(value)
+        values[key] = value
+        support[key] += weight
+        latest[key] = max(latest.get(key, datetime.min), record.get('cleaned_at') or datetime.min)
+    if not support:
+        return None, 0.0
+    key = max(support, key=lambda k: (support[k], latest[k]))
+    return values[key], support[key] / total if total else 0.0
+
+
+def merge_cluster(records):
+    """Master record fields of a cluster of cleaned records
+
+    Each field takes the value with the most weight behind it, a record's
+    weight being its source's confidence times its validation weight. The
+    confidence score is the mean share of weight behind the chosen values.
+    """
+    fields = {
+        'name': vote(records, lambda r: r.get('name')),
+        'type': vote(records, lambda r: r.get('category')),
+        'address': vote(records, lambda r: r.get('address') if (r.get('address') or {}).get('postcode') else None),
+        'phone_e164': vote(records, lambda r: (r.get('contact') or {}).get('phone_e164')),
+        'phone': vote(records, lambda r: (r.get('contact') or {}).get('phone')),
+        'hours': vote(records, lambda r: (r.get('contact') or {}).get('hours')),
+    }
+    if fields['address'][0] is None:
+        fields['address'] = vote(records, lambda r: r.get('address'))
+    shares = [share for value, share in fields.values() if value]
+    source_ids = sorted({record.get('source_id') for record in records if record.get('source_id') is not None})
+    founder = min(records, key=lambda r: r['id'])
+
+    return dict(
+        external_id='mr-' + hashlib.blake2b(
+            f"{founder.get('source_id')}:{founder.get('raw_data_id') or founder['id']}".encode(), digest_size=8
+        ).hexdigest(),
+        name=fields['name'][0],
+        type=fields['type'][0],
+        status='active',
+        primary_data={field: {'value': value, 'support': round(share, 3)} for field, (value, share) in fields.items()},
+        address=fields['address'][0],
+        contact={
+            'phone': fields['phone'][0],
+            'phone_e164': fields['phone_e164'][0],
+            'hours': fields['hours'][0]
+        },
+        data_json={
+            'member_count': len(records),
+            'source_ids': source_ids,
+            'categories': sorted({record['category'] for record in records if record.get('category')})
+        },
+        sources=[
+            {
+                'source_id': record.get('source_id'),
+                'cleaned_data_id': record['id'],
+                'raw_data_id': record.get('raw_data_id'),
+                'confidence': round(record_weight(record), 3)
+            }
+            for record in sorted(records, key=lambda r: r['id'])
+        ],
+        confidence_score=round(sum(shares) / len(shares), 3) if shares else 0.0
+    )
+
+
+class Consolidator:
+    """Incrementally clusters cleaned_data into master_records
+
+    Each chunk takes cleaned rows that are new or re-cleaned since their
+    last consolidation, finds their candidates through record_blocks, and
+    re-clusters only those rows together with the full membership of the
+    master records involved. Untouched master records are never read.
+    """
+
+    def __init__(self, db, chunk_size=2000):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.consolidated = 0
+        self.created = 0
+        self.updated = 0
+        self.removed = 0
+
+    def rebuild(self, session):
+        """Drop all master records so the next run consolidates from scratch"""
+        for table in ('master_record_members', 'record_blocks', 'master_records'):
+            session.execute(text(f"DELETE FROM {table}"))
+        session.commit()
+
+    def run(self, max_chunks=None):
+        """Consolidate chunks until nothing is left, returns rows handled"""
+        start = time.perf_counter()
+        after_id = 0
+        chunks = 0
+        while max_chunks is None or chunks < max_chunks:
+            handled, after_id = self.run_chunk(after_id)
+            if not handled:
+                break
+            chunks += 1
+            elapsed = time.perf_counter() - start
+            logger.info(
+                f"Consolidated {self.consolidated} rows up to id {after_id}: {self.created} master records "
+                f"created, {self.updated} updated, {self.removed} merged away "
+                f"({self.consolidated / elapsed:,.0f} rows/sec)"
+            )
+        return self.consolidated
+
+    def run_chunk(self, after_id):
+        """Consolidate one chunk of affected rows; returns (rows, last id)"""
+        session = self.db.get_session()
+        try:
+            # One consolidator at a time; parallel runs would race on clusters
+            session.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {'lock_id': ADVISORY_LOCK_ID})
+            affected = [row[0] for row in session.execute(
+                AFFECTED_SQL, {'after_id': after_id, 'limit': self.chunk_size}
+            )]
+            if not affected:
+                session.rollback()
+                return 0, after_id
+
+            records = self.load_records(session, affected)
+            self.index_blocks(session, [records[record_id] for record_id in affected if record_id in records])
+
+            # Rows in a block with the affected ones, plus whole clusters of all of them
+            keys = sorted({key for record_id in affected if record_id in records
+                           for key in blocking_keys(records[record_id])})
+            candidates = set(affected)
+            if keys:
+                candidates.update(row[0] for row in session.execute(
+                    CANDIDATES_SQL, {'keys': keys, 'max_block': MAX_BLOCK_SIZE}
+                ))
+            candidates.update(row[0] for row in session.execute(CLUSTER_MEMBERS_SQL, {'ids': list(candidates)}))
+            records.update(self.load_records(session, candidates - set(records)))
+
+            self.write_clusters(session, records, cluster(records))
+            session.commit()
+            self.consolidated += len(affected)
+            return len(affected), affected[-1]
+
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def load_records(self, session, ids):
+        if not ids:
+            return {}
+        rows = session.execute(RECORDS_SQL, {
+            'ids': list(ids), 'default_confidence': DEFAULT_SOURCE_CONFIDENCE
+        }).mappings()
+        return {row['id']: dict(row) for row in rows}
+
+    def index_blocks(self, session, records):
+        """Replace the blocking keys of the given rows"""
+        ids = [record['id'] for record in records]
+        session.execute(delete(RecordBlock).where(RecordBlock.cleaned_data_id.in_(ids)))
+        rows = [
+            {'block_key': key, 'cleaned_data_id': record['id']}
+            for record in records
+            for key in blocking_keys(record)
+        ]
+        if rows:
+            session.execute(insert(RecordBlock).values(rows).on_conflict_do_nothing())
+
+    def write_clusters(self, session, records, clusters):
+        """Map clusters onto existing master records and write them
+
+        A cluster keeps the master record most of its rows already belong
+        to; master records left without rows were merged into another one
+        and are deleted.
+        """
+        now = datetime.utcnow()
+        previous = {record['master_record_id'] for record in records.values() if record['master_record_id']}
+        kept = set()
+        members = []
+
+        for ids in sorted(clusters, key=min):
+            counts = defaultdict(int)
+            for record_id in ids:
+                master_id = records[record_id]['master_record_id']
+                if master_id and master_id not in kept:
+                    counts[master_id] += 1
+            fields = merge_cluster([records[record_id] for record_id in ids])
+
+            if counts:
+                master_id = max(counts, key=lambda m: (counts[m], -m))
+                session.execute(
+                    MasterRecord.__table__.update().where(MasterRecord.id == master_id).values(
+                        updated_at=now, **fields
+                    )
+                )
+                self.updated += 1
+            else:
+                master_id = session.execute(
+                    insert(MasterRecord).values(created_at=now, updated_at=now, **fields).returning(MasterRecord.id)
+                ).scalar_one()
+                self.created += 1
+            kept.add(master_id)
+            members.extend(
+                {'cleaned_data_id': record_id, 'master_record_id': master_id, 'consolidated_at': now}
+                for record_id in ids
+            )
+
+        stmt = insert(MasterRecordMember).values(members)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=[MasterRecordMember.cleaned_data_id],
+            set_={
+                'master_record_id': stmt.excluded.master_record_id,
+                'consolidated_at': stmt.excluded.consolidated_at
+            }
+        ))
+        orphaned = previous - kept
+        if orphaned:
+            session.execute(delete(MasterRecord).where(MasterRecord.id.in_(orphaned)))
+            self.removed += len(orphaned)
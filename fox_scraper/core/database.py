@@ -1,13 +1,12 @@
 # fox_scraper/core/database.py
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey
+from sqlalchemy import text, Column, Integer, BigInteger, String, Date, DateTime, Text, Boolean, Float, ForeignKey, LargeBinary, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import relationship
 from datetime import datetime
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from .config import get_engine, get_session_factory
+from .migrations import migrate
+from .partitions import ensure_history
 
 Base = declarative_base()
 
@@ -29,6 +28,10 @@ class DataSource(Base):
 
 class ScrapingRun(Base):
     __tablename__ = 'scraping_runs'
+    __table_args__ = (
+        # Latest run of a source (resume, last completed run)
+        Index('ix_scraping_runs_source_start', 'source_id', 'start_time'),
+    )
 
     id = Column(Integer, primary_key=True)
     source_id = Column(Integer, ForeignKey('data_sources.id'))
@@ -42,27 +45,54 @@ class ScrapingRun(Base):
 
     # Relationships
     source = relationship("DataSource", back_populates="scraping_runs")
-    raw_data = relationship("RawData", back_populates="run")
+    raw_data = relationship("RawData", back_populates="run", foreign_keys="RawData.run_id")
 
 class RawData(Base):
     __tablename__ = 'raw_data'
+    __table_args__ = (
+        UniqueConstraint('source_id', 'identity_key', name='uq_raw_data_identity'),
+        Index('ix_raw_data_run_id', 'run_id'),
+        # Viewer pages of one source and status, newest first
+        Index('ix_raw_data_source_status_id', 'source_id', 'processing_status', 'id'),
+        # Latest row per (source_id, url) for detail merges
+        Index('ix_raw_data_source_url', 'source_id', 'url', 'id'),
+        # Cleaning claim; only the small pending slice is indexed
+        Index('ix_raw_data_pending', 'id', postgresql_where=text("processing_status = 'pending'")),
+        # Fresh detail pages per source, the one JSON path filtered on
+        Index(
+            'ix_raw_data_detail_fetched',
+            'source_id', text("(raw_content ->> 'detail_fetched_at')"),
+            postgresql_where=text("(raw_content ->> 'detail_fetched_at') IS NOT NULL")
+        ),
+        # Compaction of identity-less rows into raw_data_history
+        Index('ix_raw_data_superseded', 'scraped_at', postgresql_where=text('identity_key IS NULL')),
+    )
 
     id = Column(Integer, primary_key=True)
     source_id = Column(Integer, ForeignKey('data_sources.id'))
     run_id = Column(Integer, ForeignKey('scraping_runs.id'))
     url = Column(Text)
     raw_content = Column(JSONB)
-    hash = Column(Text)
+    hash = Column(Text, unique=True)  # Content hash; NULL for error rows
+    identity_key = Column(Text)  # Practice identity; NULL for error rows
     scraped_at = Column(DateTime, default=datetime.utcnow)
+    last_seen_run_id = Column(Integer, ForeignKey('scraping_runs.id'))
+    last_seen_at = Column(DateTime, default=datetime.utcnow)
     processing_status = Column(String(50), default='pending')
 
     # Relationships
     source = relationship("DataSource", back_populates="raw_data")
-    run = relationship("ScrapingRun", back_populates="raw_data")
+    run = relationship("ScrapingRun", back_populates="raw_data", foreign_keys=[run_id])
     cleaned_data = relationship("CleanedData", back_populates="raw_data")
 
 class CleanedData(Base):
     __tablename__ = 'cleaned_data'
+    __table_args__ = (
+        UniqueConstraint('raw_data_id', name='uq_cleaned_data_raw_data'),
+        # Viewer pages: newest rows of a source, optionally of one status
+        Index('ix_cleaned_data_source_id', 'source_id', 'id'),
+        Index('ix_cleaned_data_source_validation_id', 'source_id', 'validation_status', 'id'),
+    )
 
     id = Column(Integer, primary_key=True)
     raw_data_id = Column(Integer, ForeignKey('raw_data.id'))
@@ -82,6 +112,9 @@ class CleanedData(Base):
 
 class EnrichedData(Base):
     __tablename__ = 'enriched_data'
+    __table_args__ = (
+        UniqueConstraint('cleaned_data_id', 'enrichment_type', name='uq_enriched_data_type'),
+    )
 
     id = Column(Integer, primary_key=True)
     cleaned_data_id = Column(Integer, ForeignKey('cleaned_data.id'))
@@ -94,6 +127,154 @@ class EnrichedData(Base):
     # Relationships
     cleaned_data = relationship("CleanedData", back_populates="enriched_data")
 
+class PageValidator(Base):
+    __tablename__ = 'page_validators'
+    __table_args__ = (
+        Index('ix_page_validators_source_id', 'source_id'),
+        Index('ix_page_validators_run_id', 'run_id'),
+    )
+
+    url = Column(Text, primary_key=True)
+    source_id = Column(Integer, ForeignKey('data_sources.id'))
+    run_id = Column(Integer, ForeignKey('scraping_runs.id'))
+    etag = Column(Text)
+    last_modified = Column(Text)
+    body_digest = Column(String(64))
+    entry_count = Column(Integer)
+    identity_keys = Column(JSONB)  # Of the page's entries, touched when the page is skipped
+    checked_at = Column(DateTime, default=datetime.utcnow)
+
+class ContentBlob(Base):
+    __tablename__ = 'content_blobs'
+
+    digest = Column(String(64), primary_key=True)
+    encoding = Column(String(16), nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class FrontierEntry(Base):
+    __tablename__ = 'crawl_frontier'
+    __table_args__ = (
+        UniqueConstraint('run_id', 'url', name='uq_crawl_frontier_run_url'),
+        Index('idx_crawl_frontier_claim', 'run_id', 'status', 'priority'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey('scraping_runs.id'), nullable=False)
+    url = Column(Text, nullable=False)
+    kind = Column(String(50), default='listing')
+    page = Column(Integer)
+    meta = Column(JSONB)
+    priority = Column(Integer, default=0)
+    status = Column(String(50), default='pending')
+    worker = Column(String(255))
+    lease_expires_at = Column(DateTime)
+    attempts = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DeadLetter(Base):
+    __tablename__ = 'dead_letters'
+    __table_args__ = (
+        UniqueConstraint('run_id', 'url', name='uq_dead_letters_run_url'),
+        Index('ix_dead_letters_source_id', 'source_id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey('scraping_runs.id'), nullable=False)
+    source_id = Column(Integer, ForeignKey('data_sources.id'))
+    url = Column(Text, nullable=False)
+    page = Column(Integer)
+    callback = Column(String(255))
+    meta = Column(JSONB)
+    failure_class = Column(String(255))
+    failure_message = Column(Text)
+    attempts = Column(Integer, default=1)
+    status = Column(String(50), default='dead')
+    first_failed_at = Column(DateTime, default=datetime.utcnow)
+    last_failed_at = Column(DateTime, default=datetime.utcnow)
+
+class RunError(Base):
+    __tablename__ = 'run_errors'
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey('scraping_runs.id'), nullable=False, index=True)
+    occurred_at = Column(DateTime, default=datetime.utcnow)
+    url = Column(Text)
+    error = Column(Text)
+
+class MasterRecord(Base):
+    __tablename__ = 'master_records'
+    __table_args__ = (
+        # Viewer's recently updated records, paged on (updated_at, id)
+        Index('ix_master_records_updated_id', 'updated_at', 'id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    external_id = Column(String(255), index=True)
+    name = Column(String(255), index=True)
+    type = Column(String(255))
+    status = Column(String(50))
+    primary_data = Column(JSONB)
+    address = Column(JSONB)
+    contact = Column(JSONB)
+    data_json = Column(JSONB)
+    sources = Column(JSONB)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    confidence_score = Column(Float)
+
+class MasterRecordMember(Base):
+    __tablename__ = 'master_record_members'
+
+    cleaned_data_id = Column(Integer, ForeignKey('cleaned_data.id', ondelete='CASCADE'), primary_key=True)
+    master_record_id = Column(Integer, ForeignKey('master_records.id', ondelete='CASCADE'), nullable=False, index=True)
+    consolidated_at = Column(DateTime, default=datetime.utcnow)
+
+class RecordBlock(Base):
+    __tablename__ = 'record_blocks'
+
+    block_key = Column(Text, primary_key=True)
+    cleaned_data_id = Column(Integer, ForeignKey('cleaned_data.id', ondelete='CASCADE'), primary_key=True, index=True)
+
+# Row counts of raw_data, cleaned_data and master_records per source, day,
+# run and status, maintained by fox_scraper.core.rollups
+class RollupCount(Base):
+    __tablename__ = 'rollup_counts'
+
+    table_name = Column(String(64), primary_key=True)
+    source_id = Column(Integer, primary_key=True)  # 0 where the table has no source
+    day = Column(Date, primary_key=True)
+    run_id = Column(Integer, primary_key=True)  # 0 where the table has no run
+    status = Column(String(50), primary_key=True)
+    records = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+# Count changes appended by the rollup triggers until they are folded in
+class RollupDelta(Base):
+    __tablename__ = 'rollup_deltas'
+
+    id = Column(BigInteger, primary_key=True)
+    table_name = Column(String(64), nullable=False)
+    source_id = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False)
+    run_id = Column(Integer, nullable=False)
+    status = Column(String(50), nullable=False)
+    records = Column(BigInteger, nullable=False)
+
+def estimated_rows(session, table):
+    """Planner row estimate of a table, including its partitions
+
+    Reads pg_class instead of scanning the table like COUNT(*) does.
+    """
+    return session.execute(text("""
+        SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint
+        FROM pg_class c
+        WHERE c.oid = to_regclass(:table)
+           OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(:table))
+    """), {'table': table}).scalar()
+
 class DatabaseManager:
     def __init__(self):
         self.engine = None
@@ -101,24 +282,20 @@ class DatabaseManager:
         self.setup_connection()
 
     def setup_connection(self):
-        db_config = {
-            'host': os.getenv('DB_HOST', '192.168.1.164'),
-            'database': os.getenv('DB_NAME', 'fox_db'),
-            'user': os.getenv('DB_USER', 'postgres'),
-            'password': os.getenv('DB_PASSWORD', 'Milena84'),
-            'port': os.getenv('DB_PORT', '5432')
-        }
-        
-        connection_string = (
-            f"postgresql://{db_config['user']}:{db_config['password']}@"
-            f"{db_config['host']}:{db_config['port']}/{db_config['database']}"
-        )
-        
-        self.engine = create_engine(connection_string)
-        self.Session = sessionmaker(bind=self.engine)
+        # All managers in a process share one pooled engine
+        self.engine = get_engine()
+        self.Session = get_session_factory()
 
     def create_tables(self):
-        Base.metadata.create_all(self.engine)
+        """Bring the schema up to date and keep history partitions ahead
+
+        Runs on every start: the migrations only once, the partitions for
+        the coming months each time.
+        """
+        migrate(self.engine)
+        if self.engine.dialect.name == 'postgresql':
+            with self.engine.connect() as connection:
+                ensure_history(connection)
 
     def get_session(self):
         return self.Session()
\ No newline at end of file
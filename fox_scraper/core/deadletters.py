@@ -0,0 +1,72 @@
+# fox_scraper/core/deadletters.py
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert
+from .database import DeadLetter
+
+
+def failure_class(failure):
+    """Failure type name, with the status code for HTTP errors"""
+    name = failure.type.__name__ if failure.type else 'Failure'
+    response = getattr(failure.value, 'response', None)
+    if response is not None:
+        name = f'{name}({response.status})'
+    return name
+
+
+class DeadLetterQueue:
+    """Failed requests of a run, kept so they can be re-driven later
+
+    A URL has one row per run; failing again bumps `attempts` instead of
+    adding rows. Re-driven requests that succeed are marked 'resolved'.
+    """
+
+    def __init__(self, run_id, source_id=None):
+        self.run_id = run_id
+        self.source_id = source_id
+
+    def record(self, session, request, failure, callback):
+        """Store or update the dead letter for a failed request"""
+        now = datetime.utcnow()
+        meta = {
+            key: request.meta[key]
+            for key in ('page', 'listing_url', 'detail_url')
+            if key in request.meta
+        }
+        stmt = insert(DeadLetter).values(
+            run_id=self.run_id,
+            source_id=self.source_id,
+            url=request.url,
+            page=request.meta.get('page'),
+            callback=callback,
+            meta=meta,
+            failure_class=failure_class(failure),
+            failure_message=str(failure.value)[:2000],
+            attempts=1,
+            status='dead',
+            first_failed_at=now,
+            last_failed_at=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DeadLetter.run_id, DeadLetter.url],
+            set_={
+                'attempts': DeadLetter.attempts + 1,
+                'failure_class': stmt.excluded.failure_class,
+                'failure_message': stmt.excluded.failure_message,
+                'status': 'dead',
+                'last_failed_at': now
+            }
+        )
+        session.execute(stmt)
+        session.commit()
+
+    def pending(self, session):
+        """Dead letters of the run that have not been resolved"""
+        return session.query(DeadLetter).filter_by(
+            run_id=self.run_id, status='dead'
+        ).order_by(DeadLetter.id).all()
+
+    def resolve(self, session, dead_letter_id):
+        session.query(DeadLetter).filter_by(id=dead_letter_id).update(
+            {DeadLetter.status: 'resolved'}, synchronize_session=False
+        )
+        session.commit()
@@ -0,0 +1,63 @@
+# fox_scraper/core/dedup.py
+import sys
+from .database import RawData
+
+
+def hash_key(content_hash):
+    """Compact key for a hex content hash (16 bytes for md5)"""
+    try:
+        return bytes.fromhex(content_hash)
+    except ValueError:
+        return content_hash.encode('utf-8')
+
+
+class HashIndex:
+    """In-memory set of the raw_data content hashes already stored
+
+    Preloaded once when the spider opens so unchanged entries are recognised
+    without a query per item. The unique identity index on raw_data stays
+    the authority: rows another writer stored after the preload are caught
+    by the pipeline's ON CONFLICT upsert.
+    """
+
+    def __init__(self):
+        self.hashes = set()
+        self.pending = set()  # Hashes inserted in the open transaction
+
+    def load(self, session, source_id, batch_size=50000):
+        """Preload the stored hashes of a source, returns how many were loaded"""
+        query = session.query(RawData.hash).filter(
+            RawData.source_id == source_id,
+            RawData.hash.isnot(None)
+        ).yield_per(batch_size)
+        for content_hash, in query:
+            self.hashes.add(hash_key(content_hash))
+        return len(self.hashes)
+
+    def __contains__(self, content_hash):
+        key = hash_key(content_hash)
+        return key in self.hashes or key in self.pending
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def add(self, content_hash):
+        self.pending.add(hash_key(content_hash))
+
+    def committed(self):
+        """Call after the session commits so inserted hashes are remembered"""
+        self.hashes.update(self.pending)
+        self.pending.clear()
+
+    def rolled_back(self):
+        self.pending.clear()
+
+    def memory_bytes(self):
+        """Approximate memory held by the index"""
+        return sys.getsizeof(self.hashes) + sum(sys.getsizeof(key) for key in self.hashes)
+
+    def bytes_per_million(self):
+        """Memory use scaled to one million hashes"""
+        if not self.hashes:
+            return 0
+        return self.memory_bytes() / len(self.hashes) * 1000000
@@ -0,0 +1,317 @@
+# fox_scraper/core/export.py
+import csv
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import inspect, text
+from sqlalchemy import types as sqltypes
+
+logger = logging.getLogger(__name__)
+
+# What each exportable table can be filtered on. run and source filters of
+# tables without such a column go through the given SQL fragment.
+TABLES = {
+    'raw_data': {
+        'date_column': 't.scraped_at',
+        'source_filter': 't.source_id = :source_id',
+        'run_filter': 't.run_id = :run_id',
+    },
+    'cleaned_data': {
+        'date_column': 't.cleaned_at',
+        'source_filter': 't.source_id = :source_id',
+        'run_filter': 'EXISTS (SELECT 1 FROM raw_data r WHERE r.id = t.raw_data_id AND r.run_id = :run_id)',
+    },
+    'master_records': {
+        'date_column': 't.updated_at',
+        'source_filter': "t.data_json -> 'source_ids' @> CAST(:source_id AS TEXT)::jsonb",
+        'run_filter': None,
+    },
+}
+
+
+class ExportFilters:
+    """Row filters of an export; None leaves a filter out"""
+
+    def __init__(self, source_id=None, run_id=None, since=None, until=None):
+        self.source_id = source_id
+        self.run_id = run_id
+        self.since = since
+        self.until = until
+
+
+def export_query(table, filters):
+    """Keyset-paginated SELECT of a table with the filters applied"""
+    spec = TABLES[table]
+    conditions = ['t.id > :after_id']
+    params = {}
+    if filters.source_id is not None:
+        conditions.append(spec['source_filter'])
+        params['source_id'] = filters.source_id
+    if filters.run_id is not None:
+        if not spec['run_filter']:
+            raise ValueError(f"{table} cannot be filtered by run")
+        conditions.append(spec['run_filter'])
+        params['run_id'] = filters.run_id
+    if filters.since is not None:
+        conditions.append(f"{spec['date_column']} >= :since")
+        params['since'] = filters.since
+    if filters.until is not None:
+        conditions.append(f"{spec['date_column']} < :until")
+        params['until'] = filters.until
+    sql = f"SELECT t.* FROM {table} t WHERE {' AND '.join(conditions)} ORDER BY t.id"
+    return text(sql), params
+
+
+def stream_chunks(engine, statement, params, chunk_size=5000):
+    """Rows of a query as lists of dicts, read through a server-side cursor
+
+    Only one chunk is held in memory at a time, however large the result.
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(
+            statement, params
+        )
+        for partition in result.mappings().partitions(chunk_size):
+            yield [dict(row) for row in partition]
+
+
+def to_jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).hex()
+    return value
+
+
+def cell(value):
+    """Flat value for CSV cells; JSON columns become JSON text"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=to_jsonable)
+    return to_jsonable(value)
+
+
+def parquet_cell(value, is_json=False):
+    """Parquet cell; datetimes stay timestamps, JSON columns become JSON text"""
+    if value is None:
+        return None
+    if is_json or isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=to_jsonable)
+    if isinstance(value, memoryview):
+        return bytes(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def parquet_type(pa, column_type):
+    """Arrow type of a SQLAlchemy column type; JSON and unknown types are text"""
+    if isinstance(column_type, sqltypes.Boolean):
+        return pa.bool_()
+    if isinstance(column_type, sqltypes.Integer):
+        return pa.int64()
+    if isinstance(column_type, sqltypes.Numeric):
+        return pa.float64()
+    if isinstance(column_type, sqltypes.DateTime):
+        return pa.timestamp('us', tz='UTC' if column_type.timezone else None)
+    if isinstance(column_type, sqltypes.Date):
+        return pa.date32()
+    if isinstance(column_type, sqltypes.LargeBinary):
+        return pa.binary()
+    return pa.string()
+
+
+def open_text(path, append):
+    mode = 'at' if append else 'wt'
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+class CsvExportWriter:
+    parts = None
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.file = open_text(path, append)
+        self.writer = None
+        self.header_written = append and os.path.getsize(path) > 0
+
+    def write(self, rows):
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=list(rows[0]))
+            if not self.header_written:
+                self.writer.writeheader()
+        self.writer.writerows({column: cell(value) for column, value in row.items()} for row in rows)
+        self.file.flush()
+        return True
+
+    def close(self):
+        self.file.close()
+
+
+class NdjsonExportWriter:
+    parts = None
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.file = open_text(path, append)
+
+    def write(self, rows):
+        self.file.writelines(
+            json.dumps(row, ensure_ascii=False, default=to_jsonable) + '\n' for row in rows
+        )
+        self.file.flush()
+        return True
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetExportWriter:
+    """Directory of part-NNNNN.parquet files, rows_per_file rows each
+
+    Every chunk becomes a row group, so memory stays at one chunk. A part is
+    only readable once it is closed, so `parts` counts the closed ones and a
+    resumed export drops any part after the `parts` it last saved. The schema
+    comes from the table's columns, as reflected by SQLAlchemy, so NULLs in
+    the first chunk cannot fix a column's type and every part matches.
+    """
+
+    def __init__(self, path, columns, append=False, rows_per_file=500000, parts=None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        self.rows_per_file = rows_per_file
+        os.makedirs(path, exist_ok=True)
+        existing = sorted(name for name in os.listdir(path) if name.startswith('part-'))
+        if existing and not append:
+            raise RuntimeError(f"{path} already holds an export; use --resume or another directory")
+        if parts is not None:
+            # Left open by a crash, or closed after the last saved state;
+            # their rows are exported again
+            for name in existing[parts:]:
+                logger.warning(f"Removing {name}, written after the last saved export state")
+                os.remove(os.path.join(path, name))
+            existing = existing[:parts]
+        self.part = len(existing)
+        self.parts = self.part
+        self.writer = None
+        self.schema = pyarrow.schema([(column['name'], parquet_type(pyarrow, column['type'])) for column in columns])
+        self.json_columns = {
+            column['name'] for column in columns if isinstance(column['type'], sqltypes.JSON)
+        }
+        self.rows_in_file = 0
+
+    def write(self, rows):
+        """Write a chunk, True once every row so far is in a closed part"""
+        columns = {
+            name: [parquet_cell(row[name], name in self.json_columns) for row in rows]
+            for name in self.schema.names
+        }
+        table = self.pa.table(columns, schema=self.schema)
+        if self.writer is None:
+            self.part += 1
+            self.writer = self.pq.ParquetWriter(
+                os.path.join(self.path, f"part-{self.part:05d}.parquet"), self.schema
+            )
+            self.rows_in_file = 0
+        self.writer.write_table(table)
+        self.rows_in_file += len(rows)
+        if self.rows_in_file >= self.rows_per_file:
+            self.close()
+        return self.writer is None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.parts = self.part
+
+
+WRITERS = {
+    'csv': CsvExportWriter,
+    'ndjson': NdjsonExportWriter,
+    'parquet': ParquetExportWriter,
+}
+
+
+class ExportState:
+    """Last exported id of an export, kept next to it so it can be resumed"""
+
+    def __init__(self, path):
+        self.path = path
+        self.last_id = 0
+        self.rows = 0
+        self.parts = None  # Closed part files of a Parquet export
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                state = json.load(f)
+            self.last_id = state['last_id']
+            self.rows = state['rows']
+            self.parts = state.get('parts')
+        return self
+
+    def save(self, last_id, rows, parts=None):
+        self.last_id = last_id
+        self.rows += rows
+        self.parts = parts
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'last_id': self.last_id,
+                'rows': self.rows,
+                'parts': self.parts,
+                'updated_at': datetime.utcnow().isoformat()
+            }, f)
+        os.replace(tmp_path, self.path)
+
+
+def export_table(engine, table, output, fmt, filters=None, chunk_size=5000, resume=False, **writer_options):
+    """Stream a table to a file in chunks, returns the number of rows written
+
+    Progress is saved to <output>.state once written rows are durable: after
+    every chunk for CSV and NDJSON, whenever a part file closes for Parquet.
+    With resume the export picks up after the last id saved and appends.
+    """
+    state = ExportState(f"{output.rstrip('/')}.state")
+    if resume:
+        state.load()
+    statement, params = export_query(table, filters or ExportFilters())
+    params['after_id'] = state.last_id
+
+    append = resume and state.last_id > 0
+    if append and state.parts is not None:
+        writer_options['parts'] = state.parts
+    if fmt == 'parquet':
+        writer_options['columns'] = inspect(engine).get_columns(table)
+    writer = WRITERS[fmt](output, append=append, **writer_options)
+    written = 0
+    unsaved = 0
+    last_id = state.last_id
+    start = time.perf_counter()
+    try:
+        for rows in stream_chunks(engine, statement, params, chunk_size):
+            last_id = rows[-1]['id']
+            unsaved += len(rows)
+            if writer.write(rows):
+                state.save(last_id, unsaved, writer.parts)
+                unsaved = 0
+            written += len(rows)
+            elapsed = time.perf_counter() - start
+            logger.info(f"Exported {written} {table} rows up to id {last_id} ({written / elapsed:,.0f} rows/sec)")
+    finally:
+        writer.close()
+    if unsaved:
+        state.save(last_id, unsaved, writer.parts)
+    return written
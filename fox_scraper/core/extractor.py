@@ -0,0 +1,127 @@
+# fox_scraper/core/extractor.py
+from cssselect import HTMLTranslator
+from lxml import etree
+
+
+def has_class(element, name):
+    return name in (element.get('class') or '').split()
+
+
+class FieldRule:
+    """A `tag.class` selector, optionally inside an ancestor `tag[.class]`"""
+
+    def __init__(self, field, tag, cls=None, within=None, attr=None):
+        self.field = field
+        self.tag = tag
+        self.cls = cls
+        self.within = within  # (tag, class or None) of a required ancestor
+        self.attr = attr  # Read an attribute instead of the first text node
+
+    def matches(self, element, open_scopes):
+        if element.tag != self.tag or (self.cls and not has_class(element, self.cls)):
+            return False
+        return self.within is None or open_scopes.get(self.within, 0) > 0
+
+
+class HitExtractor:
+    """Single-pass field extraction for `div.hit` listing entries
+
+    The selectors the spider used to evaluate one by one per entry are
+    compiled into rules once. Each hit subtree is then walked a single time
+    with lxml's iterwalk, filling every field as its element goes by:
+
+        h2 a.hitlnk_name::text / ::attr(href), div.subline::text,
+        div.category::text, div.phoneblock span::text,
+        div.hitlnk_times::text, address//text()
+
+    `::text` fields take the first text node in document order, matching
+    parsel's `.get()`.
+    """
+
+    hit_selector = 'div.hit'
+
+    rules = [
+        FieldRule('name', 'a', 'hitlnk_name', within=('h2', None)),
+        FieldRule('url', 'a', 'hitlnk_name', within=('h2', None), attr='href'),
+        FieldRule('subtitle', 'div', 'subline'),
+        FieldRule('category', 'div', 'category'),
+        FieldRule('phone', 'span', within=('div', 'phoneblock')),
+        FieldRule('opening_hours', 'div', 'hitlnk_times'),
+    ]
+
+    def __init__(self):
+        self.find_hits = etree.XPath(HTMLTranslator().css_to_xpath(self.hit_selector))
+        self.rules_by_tag = {}
+        for rule in self.rules:
+            self.rules_by_tag.setdefault(rule.tag, []).append(rule)
+        # Ancestor scopes to track while walking, keyed by (tag, class)
+        self.scopes = {rule.within for rule in self.rules if rule.within}
+        self.scope_tags = {tag for tag, _ in self.scopes}
+
+    def hits(self, response):
+        """lxml elements of all hits on a listing page"""
+        return self.find_hits(response.selector.root)
+
+    def html(self, hit):
+        """Serialized hit markup, as parsel's `entry.get()` returns it"""
+        return etree.tostring(hit, method='html', encoding='unicode', with_tail=False)
+
+    def extract(self, hit):
+        """Extract all fields of a hit in one walk over its subtree"""
+        values = {}
+        text_owners = {}  # element -> fields waiting for its first text node
+        open_scopes = dict.fromkeys(self.scopes, 0)
+        address_depth = 0
+        address_texts = []
+
+        def emit_text(owner, text):
+            for field in text_owners.get(owner, ()):
+                if field not in values:
+                    values[field] = text
+
+        for event, element in etree.iterwalk(hit, events=('start', 'end', 'comment', 'pi')):
+            tag = element.tag
+            if event in ('comment', 'pi'):
+                # Comments and processing instructions only contribute tails
+                if element.tail is not None:
+                    if address_depth:
+                        address_texts.append(element.tail)
+                    emit_text(element.getparent(), element.tail)
+                continue
+
+            if event == 'start':
+                for rule in self.rules_by_tag.get(tag, ()):
+                    if rule.field in values or not rule.matches(element, open_scopes):
+                        continue
+                    if rule.attr:
+                        value = element.get(rule.attr)
+                        if value is not None:
+                            values[rule.field] = value
+                    else:
+                        text_owners.setdefault(element, []).append(rule.field)
+
+                if tag == 'address':
+                    address_depth += 1
+                if address_depth and element.text is not None:
+                    address_texts.append(element.text)
+                if element.text is not None:
+                    emit_text(element, element.text)
+
+                if tag in self.scope_tags:
+                    for scope in self.scopes:
+                        if scope[0] == tag and (scope[1] is None or has_class(element, scope[1])):
+                            open_scopes[scope] += 1
+            else:
+                if tag in self.scope_tags:
+                    for scope in self.scopes:
+                        if scope[0] == tag and (scope[1] is None or has_class(element, scope[1])):
+                            open_scopes[scope] -= 1
+                if tag == 'address':
+                    address_depth -= 1
+                if element is not hit and element.tail is not None:
+                    if address_depth:
+                        address_texts.append(element.tail)
+                    emit_text(element.getparent(), element.tail)
+
+        values['address_texts'] = address_texts
+        return values
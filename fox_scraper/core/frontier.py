@@ -0,0 +1,134 @@
+# fox_scraper/core/frontier.py
+import os
+import socket
+from datetime import datetime, timedelta
+from sqlalchemy import text, func, and_, or_
+from sqlalchemy.dialects.postgresql import insert
+from .database import FrontierEntry
+
+CLAIM_SQL = text("""
+    UPDATE crawl_frontier
+    SET status = 'leased',
+        worker = :worker,
+        lease_expires_at = :expires,
+        attempts = attempts + 1,
+        updated_at = :now
+    WHERE id IN (
+        SELECT id FROM crawl_frontier
+        WHERE run_id = :run_id
+          AND kind = :kind
+          AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < :now))
+          AND attempts < :max_attempts
+        ORDER BY priority DESC, id
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, url, kind, page, meta, attempts
+""")
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class SharedFrontier:
+    """Request queue of a ScrapingRun shared by several worker processes
+
+    Workers claim rows with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent
+    claims never hand out the same URL. A claim is a lease: rows whose lease
+    has expired, because their worker died or stalled, are claimed again by
+    whoever asks next. URLs are unique per run, so every worker can add what
+    it discovers without coordinating.
+    """
+
+    def __init__(self, run_id, worker_id=None, lease_seconds=300, max_attempts=5):
+        self.run_id = run_id
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def add(self, session, entries):
+        """Add entries (dicts with url, kind, page, meta, priority); duplicates are ignored"""
+        if not entries:
+            return
+        rows = [
+            {
+                'run_id': self.run_id,
+                'url': entry['url'],
+                'kind': entry.get('kind', 'listing'),
+                'page': entry.get('page'),
+                'meta': entry.get('meta'),
+                'priority': entry.get('priority', 0),
+                'status': 'pending',
+                'attempts': 0
+            }
+            for entry in entries
+        ]
+        session.execute(
+            insert(FrontierEntry).values(rows).on_conflict_do_nothing(
+                index_elements=[FrontierEntry.run_id, FrontierEntry.url]
+            )
+        )
+        session.commit()
+
+    def claim(self, session, limit, kind='listing'):
+        """Lease up to `limit` pending or abandoned entries of a kind to this worker"""
+        if limit <= 0:
+            return []
+        now = datetime.utcnow()
+        rows = session.execute(CLAIM_SQL, {
+            'worker': self.worker_id,
+            'expires': now + timedelta(seconds=self.lease_seconds),
+            'now': now,
+            'run_id': self.run_id,
+            'kind': kind,
+            'max_attempts': self.max_attempts,
+            'limit': limit
+        }).mappings().all()
+        session.commit()
+        return [dict(row) for row in rows]
+
+    def renew(self, session):
+        """Extend the leases this worker still holds"""
+        session.query(FrontierEntry).filter_by(
+            run_id=self.run_id, worker=self.worker_id, status='leased'
+        ).update({
+            FrontierEntry.lease_expires_at: datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+        }, synchronize_session=False)
+        session.commit()
+
+    def finish(self, session, url, status='done'):
+        """Mark an entry leased by this worker as done or failed"""
+        session.query(FrontierEntry).filter_by(
+            run_id=self.run_id, url=url, worker=self.worker_id
+        ).update({
+            FrontierEntry.status: status,
+            FrontierEntry.lease_expires_at: None,
+            FrontierEntry.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
+        session.commit()
+
+    def release(self, session):
+        """Hand this worker's unfinished leases back to the pool"""
+        session.query(FrontierEntry).filter_by(
+            run_id=self.run_id, worker=self.worker_id, status='leased'
+        ).update({
+            FrontierEntry.status: 'pending',
+            FrontierEntry.lease_expires_at: None,
+            FrontierEntry.attempts: FrontierEntry.attempts - 1
+        }, synchronize_session=False)
+        session.commit()
+
+    def remaining(self, session):
+        """Entries that still have to be crawled by any worker"""
+        # A lease on its last attempt still counts until it expires
+        return session.query(func.count(FrontierEntry.id)).filter(
+            FrontierEntry.run_id == self.run_id,
+            or_(
+                and_(FrontierEntry.status == 'pending', FrontierEntry.attempts < self.max_attempts),
+                and_(FrontierEntry.status == 'leased', or_(
+                    FrontierEntry.lease_expires_at >= datetime.utcnow(),
+                    FrontierEntry.attempts < self.max_attempts
+                ))
+            )
+        ).scalar()
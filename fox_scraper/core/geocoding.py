@@ -0,0 +1,213 @@
+# fox_scraper/core/geocoding.py
+import csv
+import gzip
+import logging
+import os
+import time
+from datetime import datetime
+from functools import lru_cache
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from .database import EnrichedData
+from .identity import normalize, normalize_street
+
+logger = logging.getLogger(__name__)
+
+ENRICHMENT_TYPE = 'geocode'
+
+# Confidence of a match by how precise the gazetteer entry is
+PRECISION_CONFIDENCE = {'street': 0.9, 'postcode': 0.7, 'city': 0.4}
+
+# Cleaned rows without a geocode yet or re-cleaned since their geocode
+# (all rows when reprocessing)
+PENDING_SQL = text("""
+    SELECT c.id, c.address
+    FROM cleaned_data c
+    LEFT JOIN enriched_data e ON e.cleaned_data_id = c.id AND e.enrichment_type = 'geocode'
+    WHERE c.id > :after_id AND (e.id IS NULL OR c.cleaned_at > e.enriched_at OR :reprocess)
+    ORDER BY c.id
+    LIMIT :limit
+""")
+
+
+def address_key(address):
+    """Normalized (postcode, street, city) of a cleaned address, the cache key"""
+    address = address or {}
+    return (
+        (address.get('postcode') or '').strip(),
+        normalize_street(address.get('street')),
+        normalize(address.get('city')),
+    )
+
+
+class Gazetteer:
+    """Postcode and street coordinates loaded from a local CSV file
+
+    Rows have postcode, city, street, lat and lon columns; rows with an
+    empty street are postcode centroids. Files ending in .gz are read
+    compressed. Missing postcode and city centroids are averaged from the
+    street rows.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.streets = {}
+        self.postcodes = {}
+        self.cities = {}
+        self.load()
+
+    def load(self):
+        opener = gzip.open if self.path.endswith('.gz') else open
+        postcode_points, city_points = {}, {}
+        with opener(self.path, 'rt', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                point = (float(row['lat']), float(row['lon']))
+                postcode = (row.get('postcode') or '').strip()
+                city = normalize(row.get('city'))
+                street = normalize_street(row.get('street'))
+                if street:
+                    self.streets[(postcode, street)] = point
+                elif postcode:
+                    self.postcodes[postcode] = point
+                if postcode:
+                    postcode_points.setdefault(postcode, []).append(point)
+                if city:
+                    city_points.setdefault(city, []).append(point)
+
+        for postcode, points in postcode_points.items():
+            self.postcodes.setdefault(postcode, centroid(points))
+        self.cities = {city: centroid(points) for city, points in city_points.items()}
+        logger.info(
+            f"Loaded gazetteer {self.path}: {len(self.streets)} streets, "
+            f"{len(self.postcodes)} postcodes, {len(self.cities)} cities"
+        )
+
+    def lookup(self, key):
+        """(lat, lon, precision) of a normalized address key, or None"""
+        postcode, street, city = key
+        if street and (postcode, street) in self.streets:
+            return self.streets[(postcode, street)] + ('street',)
+        if postcode in self.postcodes:
+            return self.postcodes[postcode] + ('postcode',)
+        if city in self.cities:
+            return self.cities[city] + ('city',)
+        return None
+
+
+def centroid(points):
+    return (sum(lat for lat, _ in points) / len(points), sum(lon for _, lon in points) / len(points))
+
+
+class Geocoder:
+    """Gazetteer lookups behind a bounded LRU cache keyed on the normalized address"""
+
+    def __init__(self, gazetteer, cache_size=50000):
+        self.gazetteer = gazetteer
+        self.cached_lookup = lru_cache(maxsize=cache_size)(gazetteer.lookup)
+        self.geocoded = 0
+        self.unmatched = 0
+        self.seconds = 0.0
+
+    def geocode(self, address):
+        """enriched_data fields for an address: (data, confidence_score)"""
+        start = time.perf_counter()
+        found = self.cached_lookup(address_key(address))
+        self.seconds += time.perf_counter() - start
+        if found is None:
+            self.unmatched += 1
+            return {'matched': False}, 0.0
+        self.geocoded += 1
+        lat, lon, precision = found
+        return {'matched': True, 'lat': lat, 'lon': lon, 'precision': precision}, PRECISION_CONFIDENCE[precision]
+
+    def stats(self):
+        info = self.cached_lookup.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            'addresses': self.geocoded + self.unmatched,
+            'geocoded': self.geocoded,
+            'unmatched': self.unmatched,
+            'cache_hits': info.hits,
+            'cache_misses': info.misses,
+            'cache_hit_rate': info.hits / lookups if lookups else 0.0,
+            'cache_size': info.currsize,
+            'cache_max_size': info.maxsize,
+            'lookups_per_sec': lookups / self.seconds if self.seconds else 0.0,
+        }
+
+
+class GeocodingWorker:
+    """Geocodes cleaned addresses in batches into enriched_data"""
+
+    def __init__(self, db, geocoder, chunk_size=5000, reprocess=False):
+        self.db = db
+        self.geocoder = geocoder
+        self.chunk_size = chunk_size
+        self.reprocess = reprocess
+        self.source = f"gazetteer:{os.path.basename(geocoder.gazetteer.path)}"
+        self.elapsed = 0.0
+
+    def run(self, max_chunks=None):
+        """Geocode chunks until no rows are left, returns rows handled"""
+        start = time.perf_counter()
+        after_id = 0
+        chunks = 0
+        while max_chunks is None or chunks < max_chunks:
+            handled, after_id = self.run_chunk(after_id)
+            self.elapsed = time.perf_counter() - start
+            if not handled:
+                break
+            chunks += 1
+            stats = self.stats()
+            logger.info(
+                f"Geocoded {stats['geocoded']} of {stats['addresses']} addresses up to id {after_id} "
+                f"({stats['addresses_per_sec']:,.0f}/sec, cache hit rate {stats['cache_hit_rate']:.1%})"
+            )
+        return self.geocoder.geocoded + self.geocoder.unmatched
+
+    def run_chunk(self, after_id):
+        """Geocode and write one chunk; returns (rows, last id)"""
+        session = self.db.get_session()
+        try:
+            rows = session.execute(PENDING_SQL, {
+                'after_id': after_id, 'limit': self.chunk_size, 'reprocess': self.reprocess
+            }).all()
+            if not rows:
+                session.rollback()
+                return 0, after_id
+
+            now = datetime.utcnow()
+            enriched = []
+            for cleaned_data_id, address in rows:
+                data, confidence = self.geocoder.geocode(address)
+                enriched.append(dict(
+                    cleaned_data_id=cleaned_data_id,
+                    enrichment_type=ENRICHMENT_TYPE,
+                    data=data,
+                    source=self.source,
+                    enriched_at=now,
+                    confidence_score=confidence
+                ))
+
+            stmt = insert(EnrichedData).values(enriched)
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=[EnrichedData.cleaned_data_id, EnrichedData.enrichment_type],
+                set_={
+                    column: stmt.excluded[column]
+                    for column in ('data', 'source', 'enriched_at', 'confidence_score')
+                }
+            ))
+            session.commit()
+            return len(rows), rows[-1][0]
+
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def stats(self):
+        """Geocoder stats plus end-to-end throughput including database time"""
+        stats = self.geocoder.stats()
+        stats['addresses_per_sec'] = stats['addresses'] / self.elapsed if self.elapsed else 0.0
+        return stats
@@ -0,0 +1,55 @@
+# fox_scraper/core/identity.py
+import hashlib
+import json
+import re
+
+NON_ALNUM = re.compile(r'[^0-9a-z]+')
+STREET_SUFFIX = re.compile(r'(stra(ss|ß)e|str\.?)(?=\W|\d|$)')
+
+# Fields that identify a practice, and those that never count as a change
+IDENTITY_FIELDS = ('name', 'street', 'city', 'phone')
+VOLATILE_FIELDS = ('page_number', 'html', 'html_ref')
+
+
+def fast_digest(text):
+    """128-bit blake2b hex digest"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def normalize(text):
+    """Casefolded alphanumerics only, so spacing and punctuation do not matter"""
+    return NON_ALNUM.sub('', (text or '').casefold())
+
+
+def normalize_street(street):
+    """Normalize a street, treating 'Straße', 'Strasse' and 'Str.' alike"""
+    return normalize(STREET_SUFFIX.sub('str', (street or '').casefold()))
+
+
+def normalize_phone(phone):
+    return re.sub(r'\D', '', phone or '')
+
+
+def identity_parts(raw_content):
+    address = raw_content.get('address') or {}
+    return (
+        normalize(raw_content.get('name')),
+        normalize_street(address.get('street')),
+        normalize(address.get('city')),
+        normalize_phone(raw_content.get('phone')),
+    )
+
+
+def identity_key(raw_content):
+    """Stable key of the practice behind a listing entry
+
+    Built from name, street, city and phone only, so moving to another
+    listing page or a markup change keeps the key.
+    """
+    return fast_digest('\x1f'.join(identity_parts(raw_content)))
+
+
+def content_hash(raw_content):
+    """Fingerprint of the entry's data, ignoring page number and markup"""
+    stable = {k: v for k, v in raw_content.items() if k not in VOLATILE_FIELDS}
+    return fast_digest(json.dumps(stable, sort_keys=True, ensure_ascii=False))
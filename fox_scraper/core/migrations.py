@@ -0,0 +1,87 @@
+# fox_scraper/core/migrations.py
+import importlib
+import logging
+import pkgutil
+import re
+from datetime import datetime
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_PACKAGE = 'fox_scraper.migrations'
+VERSION_NAME = re.compile(r'^m(\d{4})_\w+$')
+
+SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(255) PRIMARY KEY,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+INVALID_INDEXES_SQL = """
+    SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE pg_table_is_visible(c.oid) AND NOT i.indisvalid
+    ORDER BY c.relname
+"""
+
+
+def available_migrations():
+    """(version, module) of every migration in fox_scraper/migrations, in order
+
+    A migration is a module named mNNNN_description with an
+    upgrade(connection) function. Modules setting TRANSACTIONAL = False run
+    in autocommit mode, e.g. for CREATE INDEX CONCURRENTLY.
+    """
+    package = importlib.import_module(MIGRATIONS_PACKAGE)
+    names = sorted(
+        info.name for info in pkgutil.iter_modules(package.__path__)
+        if VERSION_NAME.match(info.name)
+    )
+    return [(name, importlib.import_module(f"{MIGRATIONS_PACKAGE}.{name}")) for name in names]
+
+
+def applied_versions(connection):
+    connection.execute(text(SCHEMA_MIGRATIONS_DDL))
+    connection.commit()
+    return set(connection.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def migrate(engine):
+    """Apply pending migrations in order, returns the versions applied"""
+    applied = []
+    with engine.connect() as connection:
+        done = applied_versions(connection)
+    for version, module in available_migrations():
+        if version in done:
+            continue
+        logger.info(f"Applying migration {version}")
+        with engine.connect() as connection:
+            if not getattr(module, 'TRANSACTIONAL', True):
+                connection = connection.execution_options(isolation_level='AUTOCOMMIT')
+            try:
+                module.upgrade(connection)
+                check_indexes_valid(connection, version)
+                record_version(connection, version)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        applied.append(version)
+    return applied
+
+
+def check_indexes_valid(connection, version):
+    """Refuse to record a migration while a failed concurrent build left an INVALID index"""
+    if connection.dialect.name != 'postgresql':
+        return
+    invalid = connection.execute(text(INVALID_INDEXES_SQL)).scalars().all()
+    if invalid:
+        raise RuntimeError(f"{version} left invalid indexes: {', '.join(invalid)}; run the migration again")
+
+
+def record_version(connection, version):
+    connection.execute(
+        text("INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :now)"),
+        {'version': version, 'now': datetime.utcnow()}
+    )
+
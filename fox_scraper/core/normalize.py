@@ -0,0 +1,130 @@
+# fox_scraper/core/normalize.py
+import numpy as np
+import pandas as pd
+
+# Canonical category labels, keyed by casefolded spelling with umlauts folded
+CATEGORY_LOOKUP = {
+    'tierarzt': 'Tierarzt',
+    'tierarzte': 'Tierarzt',
+    'tieraerzte': 'Tierarzt',
+    'tierarztpraxis': 'Tierarzt',
+    'tierarztpraxen': 'Tierarzt',
+    'tierklinik': 'Tierklinik',
+    'tierkliniken': 'Tierklinik',
+    'tierheilpraktiker': 'Tierheilpraktiker',
+    'tierheilpraktikerin': 'Tierheilpraktiker',
+    'tierphysiotherapie': 'Tierphysiotherapie',
+    'tierphysiotherapeut': 'Tierphysiotherapie',
+    'tierphysiotherapeuten': 'Tierphysiotherapie',
+    'kleintierpraxis': 'Kleintierpraxis',
+    'pferdeklinik': 'Pferdeklinik',
+    'pferdepraxis': 'Pferdepraxis',
+}
+UMLAUTS = {'ä': 'a', 'ö': 'o', 'ü': 'u', 'ß': 'ss'}
+
+COUNTRY_CODE = '49'
+# The trunk prefix some write after the country code, as in +49 (0) 30 ...
+TRUNK_AFTER_COUNTRY = rf'^\s*(?:\+|00)\s*{COUNTRY_CODE}\s*\(\s*0\s*\)'
+
+POSTCODE_CITY = r'(?P<postcode>\d{5})\s*(?P<city>.*)'
+STREET_NUMBER = r'^(?P<street>.*?\D)\s*(?P<house_number>\d+\s*[a-zA-Z]?(?:\s*[-/]\s*\d+\s*[a-zA-Z]?)?)$'
+
+
+def collapse(series):
+    """Trim and collapse whitespace of a string column"""
+    return series.fillna('').astype(str).str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def phones_e164(phones):
+    """German phone numbers in E.164 format, '' where none can be read"""
+    phones = phones.str.replace(TRUNK_AFTER_COUNTRY, '+' + COUNTRY_CODE, regex=True)
+    digits = phones.str.replace(r'[^\d+]', '', regex=True)
+    international = digits.str.startswith('+')
+    digits = digits.str.replace('+', '', regex=False)
+
+    e164 = np.select(
+        [
+            international,
+            digits.str.startswith('00'),
+            digits.str.startswith('0'),
+        ],
+        [
+            '+' + digits,
+            '+' + digits.str[2:],
+            '+' + COUNTRY_CODE + digits.str[1:],
+        ],
+        default=''
+    )
+    e164 = pd.Series(e164, index=phones.index)
+    # E.164 allows 8 to 15 digits after the plus sign
+    valid = e164.str.len().between(9, 16)
+    return e164.where(valid, '')
+
+
+def split_address(streets, cities):
+    """Street, house number, postcode and city columns from the raw address"""
+    streets = collapse(streets).str.rstrip(',').str.strip()
+    cities = collapse(cities)
+    # A single address line is the street, not the city
+    cities = cities.where(cities != streets, '')
+
+    located = cities.str.extract(POSTCODE_CITY)
+    # A postcode written into the street line, e.g. "Parkweg 1, 20001 Hamburg"
+    inline = streets.str.extract(r'^(?P<street>.*?),?\s*' + POSTCODE_CITY + '$')
+    has_inline = inline['postcode'].notna()
+    streets = streets.where(~has_inline, inline['street'])
+    postcodes = located['postcode'].fillna(inline['postcode']).fillna('')
+    cities = located['city'].where(located['postcode'].notna(), inline['city'].where(has_inline, cities))
+
+    # "Hauptstr." / "Hauptstrasse" -> "Hauptstraße", "Str. des 17. Juni" -> "Straße des 17. Juni"
+    streets = streets.str.replace(r'(?<=[a-zäöüß])str(\.|asse\b)', 'straße', regex=True)
+    streets = streets.str.replace(r'\b[Ss]tr(\.|asse\b)', 'Straße', regex=True)
+    numbered = streets.str.extract(STREET_NUMBER)
+    street_names = numbered['street'].str.strip().fillna(streets)
+    house_numbers = numbered['house_number'].str.replace(r'\s+', '', regex=True).fillna('')
+
+    return pd.DataFrame({
+        'street': street_names,
+        'house_number': house_numbers,
+        'postcode': postcodes,
+        'city': collapse(cities),
+    })
+
+
+def standardize_categories(categories):
+    """Map category spellings to canonical labels, keep unknown ones trimmed"""
+    categories = collapse(categories)
+    keys = categories.str.casefold()
+    for umlaut, plain in UMLAUTS.items():
+        keys = keys.str.replace(umlaut, plain, regex=False)
+    keys = keys.str.replace(r'[^a-z]', '', regex=True)
+    return keys.map(CATEGORY_LOOKUP).fillna(categories)
+
+
+def normalize_hours(hours):
+    """Uniform dashes and spacing in opening hours text"""
+    hours = collapse(hours)
+    hours = hours.str.replace(r'\s*[–—-]\s*', '-', regex=True)
+    return hours.str.replace(r'\s*Uhr\b', '', regex=True)
+
+
+def normalize_frame(frame):
+    """Normalize a chunk of records given as columns
+
+    Expects name, category, street, city, phone and opening_hours columns
+    and returns a frame with the normalized fields and a validation status.
+    """
+    address = split_address(frame['street'], frame['city'])
+    result = pd.DataFrame({
+        'name': collapse(frame['name']),
+        'category': standardize_categories(frame['category']),
+        'phone': collapse(frame['phone']),
+        'opening_hours': normalize_hours(frame['opening_hours']),
+    }, index=frame.index)
+    result['phone_e164'] = phones_e164(result['phone'])
+    result = result.join(address.set_index(frame.index))
+
+    has_name = result['name'] != ''
+    complete = has_name & (result['postcode'] != '') & (result['phone_e164'] != '')
+    result['validation_status'] = np.select([complete, has_name], ['valid', 'partial'], default='invalid')
+    return result
@@ -0,0 +1,206 @@
+# fox_scraper/core/partitions.py
+import logging
+import re
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TABLE = 'raw_data_history'
+PARTITION_NAME = re.compile(r'^raw_data_history_p(\d{4})(\d{2})$')
+
+# Superseded raw_data versions, one partition per month of superseded_at.
+# Rows always land in the current month, so partitions created ahead of
+# time are never back-filled and old months can be dropped whole.
+HISTORY_DDL = """
+    CREATE TABLE IF NOT EXISTS raw_data_history (
+        raw_data_id INTEGER NOT NULL,
+        source_id INTEGER,
+        run_id INTEGER,
+        url TEXT,
+        raw_content JSONB,
+        hash TEXT,
+        identity_key TEXT,
+        processing_status VARCHAR(50),
+        scraped_at TIMESTAMP,
+        superseded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        reason VARCHAR(50)
+    ) PARTITION BY RANGE (superseded_at);
+    CREATE INDEX IF NOT EXISTS ix_raw_data_history_identity ON raw_data_history(source_id, identity_key);
+    CREATE INDEX IF NOT EXISTS ix_raw_data_history_raw_data_id ON raw_data_history(raw_data_id)
+"""
+
+HISTORY_COLUMNS = (
+    "raw_data_id, source_id, run_id, url, raw_content, hash, identity_key, "
+    "processing_status, scraped_at, superseded_at, reason"
+)
+
+# Current versions of practices that are about to be overwritten
+ARCHIVE_CHANGED_SQL = text(f"""
+    INSERT INTO raw_data_history ({HISTORY_COLUMNS})
+    SELECT id, source_id, run_id, url, raw_content, hash, identity_key,
+           processing_status, scraped_at, :now, 'changed'
+    FROM raw_data
+    WHERE source_id = :source_id AND identity_key = ANY(:keys)
+""")
+
+# Older copies left without an identity key and failed rows; their cleaned
+# and enriched rows go with them
+SUPERSEDED_SQL = text("""
+    SELECT id
+    FROM raw_data
+    WHERE identity_key IS NULL AND scraped_at < :cutoff
+    ORDER BY id
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+""")
+
+MOVE_SUPERSEDED_SQL = text(f"""
+    WITH moved AS (
+        DELETE FROM raw_data WHERE id = ANY(:ids)
+        RETURNING id, source_id, run_id, url, raw_content, hash, identity_key, processing_status, scraped_at
+    )
+    INSERT INTO raw_data_history ({HISTORY_COLUMNS})
+    SELECT id, source_id, run_id, url, raw_content, hash, identity_key, processing_status, scraped_at, :now,
+           CASE WHEN processing_status = 'failed' THEN 'failed' ELSE 'superseded' END
+    FROM moved
+""")
+
+
+# Master records with a member among the rows about to be compacted
+MEMBER_MASTERS_SQL = text("""
+    SELECT DISTINCT m.master_record_id
+    FROM master_record_members m
+    JOIN cleaned_data c ON c.id = m.cleaned_data_id
+    WHERE c.raw_data_id = ANY(:ids)
+""")
+
+# The remaining members are consolidated again, which rebuilds the master
+# record from them; one left without members goes
+REQUEUE_MASTERS_SQL = text("""
+    UPDATE master_record_members SET consolidated_at = NULL
+    WHERE master_record_id = ANY(:masters)
+""")
+
+DELETE_EMPTY_MASTERS_SQL = text("""
+    DELETE FROM master_records r
+    WHERE r.id = ANY(:masters)
+      AND NOT EXISTS (SELECT 1 FROM master_record_members m WHERE m.master_record_id = r.id)
+""")
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{HISTORY_TABLE}_p{month.year:04d}{month.month:02d}"
+
+
+def ensure_history(connection, months_ahead=2):
+    """Create raw_data_history and its partitions up to months_ahead from now
+
+    Works on a session or a connection; called by the schema setup, so
+    every crawl and tool run keeps the partitions ahead of time.
+    """
+    connection.execute(text(HISTORY_DDL))
+    this_month = month_start(datetime.utcnow())
+    for offset in range(months_ahead + 1):
+        month = add_months(this_month, offset)
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {HISTORY_TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+    connection.commit()
+
+
+def history_partitions(connection):
+    """(name, month) of every attached raw_data_history partition, oldest first"""
+    rows = connection.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+    """), {'table': HISTORY_TABLE}).scalars()
+    partitions = []
+    for name in rows:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def expired_partitions(partitions, keep_months, today=None):
+    """Partitions whose whole month lies before the retention window"""
+    cutoff = add_months(month_start(today or datetime.utcnow()), -keep_months)
+    return [(name, month) for name, month in partitions if add_months(month, 1) <= cutoff]
+
+
+def archive_changed(session, source_id, keys, now):
+    """Copy the stored versions of practices about to be overwritten into history"""
+    if keys:
+        session.execute(ARCHIVE_CHANGED_SQL, {'source_id': source_id, 'keys': list(keys), 'now': now})
+
+
+def compact_raw_data(session, older_than_days=30, batch_size=5000):
+    """Move superseded raw_data rows into history in short transactions
+
+    Returns the number of rows moved. Each batch only locks its own rows,
+    so the job can run next to a crawl. Master records that lose rows are
+    queued for the consolidator, which rebuilds them from what is left.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    moved = 0
+    while True:
+        try:
+            ids = session.execute(SUPERSEDED_SQL, {'cutoff': cutoff, 'limit': batch_size}).scalars().all()
+            if not ids:
+                session.rollback()
+                return moved
+            masters = session.execute(MEMBER_MASTERS_SQL, {'ids': ids}).scalars().all()
+            session.execute(text("""
+                DELETE FROM enriched_data
+                WHERE cleaned_data_id IN (SELECT id FROM cleaned_data WHERE raw_data_id = ANY(:ids))
+            """), {'ids': ids})
+            session.execute(text("DELETE FROM cleaned_data WHERE raw_data_id = ANY(:ids)"), {'ids': ids})
+            if masters:
+                session.execute(REQUEUE_MASTERS_SQL, {'masters': masters})
+                session.execute(DELETE_EMPTY_MASTERS_SQL, {'masters': masters})
+            session.execute(MOVE_SUPERSEDED_SQL, {'ids': ids, 'now': datetime.utcnow()})
+            session.commit()
+            moved += len(ids)
+            logger.info(f"Moved {moved} superseded raw_data rows into {HISTORY_TABLE}")
+        except Exception:
+            session.rollback()
+            raise
+
+
+def apply_retention(session, keep_months=12, archive_schema=None):
+    """Detach history partitions older than keep_months, then drop or archive them
+
+    Archived partitions are moved into archive_schema as plain tables, out
+    of every query on raw_data_history. Either way no rows are deleted one
+    by one, so nothing is left for VACUUM. Returns the partition names.
+    """
+    handled = []
+    for name, month in expired_partitions(history_partitions(session), keep_months):
+        try:
+            session.execute(text(f"ALTER TABLE {HISTORY_TABLE} DETACH PARTITION {name}"))
+            if archive_schema:
+                session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+                session.execute(text(f"ALTER TABLE {name} SET SCHEMA {archive_schema}"))
+            else:
+                session.execute(text(f"DROP TABLE {name}"))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        handled.append(name)
+        logger.info(f"{'Archived' if archive_schema else 'Dropped'} {name} ({month:%Y-%m})")
+    return handled
@@ -0,0 +1,194 @@
+# fox_scraper/core/rollups.py
+import logging
+from datetime import datetime
+from sqlalchemy import bindparam, text
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMNS = ('source_id', 'day', 'run_id', 'status')
+
+# Column of each counted table behind every rollup key; None when the
+# table has no such column and the key takes its default
+ROLLUPS = {
+    'raw_data': {'source_id': 'source_id', 'day': 'scraped_at', 'run_id': 'run_id', 'status': 'processing_status'},
+    'cleaned_data': {'source_id': 'source_id', 'day': 'cleaned_at', 'run_id': None, 'status': 'validation_status'},
+    'master_records': {'source_id': None, 'day': 'created_at', 'run_id': None, 'status': 'status'},
+}
+
+KEY_DEFAULTS = {'source_id': '0', 'day': "DATE('1970-01-01')", 'run_id': '0', 'status': "''"}
+
+# Serializes refreshes so two of them never upsert the same counts
+ADVISORY_LOCK_ID = 7310025
+
+# Folded counts plus the deltas not folded yet, always exact
+TOTALS_SELECT = """
+    SELECT table_name, source_id, day, run_id, status, records FROM rollup_counts
+    UNION ALL
+    SELECT table_name, source_id, day, run_id, status, records FROM rollup_deltas
+"""
+
+TOTALS_VIEW_DDL = f"CREATE OR REPLACE VIEW rollup_totals AS {TOTALS_SELECT}"
+
+NEXT_DELTAS_SQL = text("SELECT id FROM rollup_deltas ORDER BY id LIMIT :limit")
+
+FOLD_SQL = text("""
+    INSERT INTO rollup_counts (table_name, source_id, day, run_id, status, records, updated_at)
+    SELECT table_name, source_id, day, run_id, status, SUM(records), :now
+    FROM rollup_deltas
+    WHERE id IN :ids
+    GROUP BY table_name, source_id, day, run_id, status
+    ON CONFLICT (table_name, source_id, day, run_id, status) DO UPDATE
+    SET records = rollup_counts.records + EXCLUDED.records, updated_at = EXCLUDED.updated_at
+""").bindparams(bindparam('ids', expanding=True))
+
+DELETE_DELTAS_SQL = text("DELETE FROM rollup_deltas WHERE id IN :ids").bindparams(
+    bindparam('ids', expanding=True)
+)
+
+
+def key_select(table, rows, sign):
+    """SELECT of the rollup key and a +1/-1 count of each row in rows"""
+    spec = ROLLUPS[table]
+    columns = [f"'{table}' AS table_name"]
+    for key in KEY_COLUMNS:
+        column = spec[key]
+        if column is None:
+            value = KEY_DEFAULTS[key]
+        elif key == 'day':
+            value = f"COALESCE(DATE(r.{column}), {KEY_DEFAULTS[key]})"
+        else:
+            value = f"COALESCE(r.{column}, {KEY_DEFAULTS[key]})"
+        columns.append(f"{value} AS {key}")
+    columns.append(f"{sign} AS records")
+    return f"SELECT {', '.join(columns)} FROM {rows} r"
+
+
+def delta_insert(selects, net=False):
+    """INSERT of one delta row per rollup key of the selected rows"""
+    keys = ', '.join(('table_name',) + KEY_COLUMNS)
+    having = " HAVING SUM(records) <> 0" if net else ""
+    return (
+        f"INSERT INTO rollup_deltas ({keys}, records) "
+        f"SELECT {keys}, SUM(records) FROM ({' UNION ALL '.join(selects)}) d "
+        f"GROUP BY {keys}{having}"
+    )
+
+
+def delta_sql(table, event):
+    """Deltas of one INSERT, UPDATE or DELETE statement, read from its transition tables
+
+    Updates count the old rows out and the new ones in; keys whose count
+    does not change, e.g. touching last_seen_at, leave no delta.
+    """
+    if event == 'INSERT':
+        return delta_insert([key_select(table, 'new_rows', 1)])
+    if event == 'DELETE':
+        return delta_insert([key_select(table, 'old_rows', -1)])
+    return delta_insert([key_select(table, 'new_rows', 1), key_select(table, 'old_rows', -1)], net=True)
+
+
+def trigger_function_ddl(table):
+    """plpgsql function turning a statement's transition tables into deltas"""
+    return f"""
+        CREATE OR REPLACE FUNCTION rollup_{table}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {delta_sql(table, 'INSERT')};
+            ELSIF TG_OP = 'DELETE' THEN
+                {delta_sql(table, 'DELETE')};
+            ELSE
+                {delta_sql(table, 'UPDATE')};
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """
+
+
+def trigger_ddl(table):
+    """Statement-level triggers of a table; one per event, as transition tables require"""
+    statements = []
+    for event, referencing in (
+        ('INSERT', 'NEW TABLE AS new_rows'),
+        ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+        ('DELETE', 'OLD TABLE AS old_rows'),
+    ):
+        name = f"rollup_{table}_{event.lower()}"
+        statements.append(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+        statements.append(
+            f"CREATE TRIGGER {name} AFTER {event} ON {table} REFERENCING {referencing} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION rollup_{table}()"
+        )
+    return statements
+
+
+def install_rollups(connection):
+    """Create the rollup triggers and the rollup_totals view; the caller commits"""
+    for table in ROLLUPS:
+        connection.execute(text(trigger_function_ddl(table)))
+        for statement in trigger_ddl(table):
+            connection.execute(text(statement))
+    connection.execute(text(TOTALS_VIEW_DDL))
+
+
+def rebuild_rollups(connection):
+    """Recount every rollup from the tables themselves; the caller commits
+
+    Writers are locked out until the caller commits, so no change lands
+    between the count and the triggers. Scans every counted table once.
+    """
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text(f"LOCK TABLE {', '.join(ROLLUPS)} IN SHARE MODE"))
+    connection.execute(text("DELETE FROM rollup_deltas"))
+    connection.execute(text("DELETE FROM rollup_counts"))
+    keys = ', '.join(('table_name',) + KEY_COLUMNS)
+    for table in ROLLUPS:
+        connection.execute(text(
+            f"INSERT INTO rollup_counts ({keys}, records, updated_at) "
+            f"SELECT {keys}, SUM(records), :now FROM ({key_select(table, table, 1)}) d GROUP BY {keys}"
+        ), {'now': datetime.utcnow()})
+
+
+def refresh_rollups(session, batch_size=10000):
+    """Fold pending deltas into rollup_counts, returns the counts updated
+
+    Deltas are consumed by deleting them rather than by an id watermark,
+    since ids commit out of order and a watermark could skip a late commit.
+    The caller commits.
+    """
+    if session.get_bind().dialect.name == 'postgresql':
+        session.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {'lock_id': ADVISORY_LOCK_ID})
+    updated = 0
+    while True:
+        ids = session.execute(NEXT_DELTAS_SQL, {'limit': batch_size}).scalars().all()
+        if not ids:
+            break
+        updated += session.execute(FOLD_SQL, {'ids': ids, 'now': datetime.utcnow()}).rowcount
+        session.execute(DELETE_DELTAS_SQL, {'ids': ids})
+    session.execute(text("DELETE FROM rollup_counts WHERE records = 0"))
+    logger.info(f"Folded rollup deltas into {updated} counts")
+    return updated
+
+
+def rollup_totals(session, table, by=(), run_id=None):
+    """Row counts of a table from the rollups, grouped by some of the key columns
+
+    Reads O(sources x days x statuses) rows instead of the table itself.
+    """
+    if table not in ROLLUPS:
+        raise ValueError(f"No rollups for {table}")
+    unknown = set(by) - set(KEY_COLUMNS)
+    if unknown:
+        raise ValueError(f"Rollups cannot be grouped by {', '.join(sorted(unknown))}")
+    columns = ''.join(f"{column}, " for column in by)
+    group = f" GROUP BY {', '.join(by)} ORDER BY {', '.join(by)}" if by else ""
+    condition = " AND run_id = :run_id" if run_id is not None else ""
+    return session.execute(text(
+        f"SELECT {columns}COALESCE(SUM(records), 0) AS records FROM rollup_totals "
+        f"WHERE table_name = :table{condition}{group}"
+    ), {'table': table, 'run_id': run_id}).all()
+
+
+def table_counts(session, tables):
+    """Exact row count of each table, read from the rollups"""
+    return {table: rollup_totals(session, table)[0].records for table in tables}
@@ -0,0 +1,40 @@
+# fox_scraper/core/runstats.py
+import threading
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert
+from .database import RunError
+
+
+class RunErrorLog:
+    """Errors of a run, buffered in memory and appended to run_errors in batches"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = []
+        self.count = 0
+
+    def add(self, run_id, message, url=None):
+        with self.lock:
+            self.pending.append({
+                'run_id': run_id,
+                'occurred_at': datetime.utcnow(),
+                'url': url,
+                'error': message
+            })
+            self.count += 1
+
+    def flush(self, session, run_id):
+        """Insert buffered errors in one statement; the caller commits"""
+        with self.lock:
+            rows, self.pending = self.pending, []
+        for row in rows:
+            # Errors raised before the run existed belong to it as well
+            row['run_id'] = row['run_id'] or run_id
+        if rows:
+            session.execute(insert(RunError).values(rows))
+        return rows
+
+    def restore(self, rows):
+        """Put rows back after a failed commit so the next flush retries them"""
+        with self.lock:
+            self.pending = rows + self.pending
@@ -0,0 +1,112 @@
+# fox_scraper/core/validators.py
+import hashlib
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert
+from .database import PageValidator, ScrapingRun
+
+
+def page_digest(fragments):
+    """Digest of page fragments with whitespace normalized away"""
+    normalized = ' '.join(' '.join(fragments).split())
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class PageValidatorStore:
+    """ETag, Last-Modified and body digest per listing URL
+
+    Only validators written by a completed run are loaded, so a page is never
+    skipped on the strength of a run whose items may not have been saved.
+    Each validator keeps the identity keys of the page's entries, so a
+    skipped page can still mark its practices as seen.
+    """
+
+    def __init__(self):
+        self.validators = {}  # url -> dict of validator fields
+        self.updated = {}
+
+    def load(self, session, source_id):
+        """Load validators for a source from the last successful runs"""
+        rows = session.query(PageValidator).join(
+            ScrapingRun, PageValidator.run_id == ScrapingRun.id
+        ).filter(
+            PageValidator.source_id == source_id,
+            ScrapingRun.status == 'completed'
+        ).all()
+        for row in rows:
+            self.validators[row.url] = {
+                'etag': row.etag,
+                'last_modified': row.last_modified,
+                'body_digest': row.body_digest,
+                'entry_count': row.entry_count,
+                'identity_keys': row.identity_keys
+            }
+        return len(self.validators)
+
+    def headers_for(self, url):
+        """Conditional request headers for a URL, if validators are known"""
+        validator = self.validators.get(url)
+        headers = {}
+        # Without its identity keys a skipped page could not be marked seen
+        if validator and validator.get('identity_keys') is not None:
+            if validator['etag']:
+                headers['If-None-Match'] = validator['etag']
+            if validator['last_modified']:
+                headers['If-Modified-Since'] = validator['last_modified']
+        return headers
+
+    def get(self, url):
+        return self.validators.get(url)
+
+    def is_unchanged(self, url, digest):
+        """Whether the body digest matches the stored one"""
+        validator = self.validators.get(url)
+        return (
+            bool(validator) and validator.get('identity_keys') is not None
+            and validator['body_digest'] == digest
+        )
+
+    def identity_keys(self, url):
+        """Identity keys of the entries last stored for a page"""
+        validator = self.validators.get(url) or {}
+        return validator.get('identity_keys') or []
+
+    def update(self, url, etag, last_modified, digest, entry_count, identity_keys=()):
+        """Remember the validators seen for a URL in this run"""
+        validator = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'body_digest': digest,
+            'entry_count': entry_count,
+            'identity_keys': list(identity_keys)
+        }
+        self.validators[url] = validator
+        self.updated[url] = validator
+
+    def save(self, session, source_id, run_id):
+        """Upsert the validators updated in this run"""
+        if not self.updated:
+            return 0
+        now = datetime.utcnow()
+        rows = [
+            dict(url=url, source_id=source_id, run_id=run_id, checked_at=now, **validator)
+            for url, validator in self.updated.items()
+        ]
+        stmt = insert(PageValidator).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PageValidator.url],
+            set_={
+                'source_id': stmt.excluded.source_id,
+                'run_id': stmt.excluded.run_id,
+                'etag': stmt.excluded.etag,
+                'last_modified': stmt.excluded.last_modified,
+                'body_digest': stmt.excluded.body_digest,
+                'entry_count': stmt.excluded.entry_count,
+                'identity_keys': stmt.excluded.identity_keys,
+                'checked_at': stmt.excluded.checked_at
+            }
+        )
+        session.execute(stmt)
+        session.commit()
+        saved = len(self.updated)
+        self.updated = {}
+        return saved
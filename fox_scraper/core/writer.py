@@ -0,0 +1,50 @@
+# fox_scraper/core/writer.py
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """Runs database writes on a dedicated thread, fed by a bounded queue
+
+    The reactor thread only enqueues batches. When `max_batches` are already
+    waiting, `full()` is true and the caller has to hold further work back
+    until `on_taken` reports that the writer picked a batch up.
+    """
+
+    def __init__(self, write, max_batches=4, on_taken=None):
+        self.write = write
+        self.queue = queue.Queue(maxsize=max(1, max_batches))
+        self.on_taken = on_taken
+        self.thread = threading.Thread(target=self.run, name='db-writer', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def full(self):
+        return self.queue.full()
+
+    def submit(self, batch):
+        """Enqueue a batch without blocking; check full() first"""
+        self.queue.put_nowait(batch)
+
+    def run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                break
+            if self.on_taken:
+                self.on_taken()
+            try:
+                self.write(*batch)
+            except Exception as e:
+                logger.error(f"Writer thread failed on a batch: {str(e)}")
+
+    def close(self, batch=None):
+        """Write a final batch, then stop the thread once the queue is drained"""
+        if batch:
+            self.queue.put(batch)
+        self.queue.put(None)
+        self.thread.join()
@@ -3,11 +3,22 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
 from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import HtmlResponse
+from scrapy.utils.defer import maybe_deferred_to_future
+from scrapy.utils.httpobj import urlparse_cached
+from twisted.internet.task import deferLater
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
 
+from ..core.archive import ResponseArchive
+
 
 class ScraperSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
@@ -56,48 +67,235 @@ class ScraperSpiderMiddleware:
         spider.logger.info("Spider opened: %s" % spider.name)
 
 
-class ScraperDownloaderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the downloader middleware does not modify the
-    # passed objects.
+class HostBucket:
+    # Token bucket state for one host. Instead of counting tokens, it keeps
+    # the time the next request may start; with `burst` > 1 that time may lag
+    # behind now, which lets a few requests through back to back.
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.next_free = 0.0
+        self.blocked_until = 0.0
+        self.backoffs = 0
+
+    def reserve(self, now, burst):
+        """Reserve the next slot and return how long to wait for it"""
+        start = max(self.next_free, now - (burst - 1) / self.rate, self.blocked_until)
+        self.next_free = start + 1.0 / self.rate
+        return max(0.0, start - now)
+
+
+class AdaptiveRateLimiter:
+    # Per-host AIMD rate control: the rate grows additively on fast 200s and
+    # is cut multiplicatively on throttling responses, never leaving
+    # [min_rate, max_rate]. Retry-After blocks the host for the given time.
+
+    def __init__(self, start_rate=0.5, min_rate=0.05, max_rate=4.0, burst=1,
+                 increase=0.05, decrease=0.5, fast_latency=1.0, backoff_codes=(403, 429, 503)):
+        self.start_rate = start_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.fast_latency = fast_latency
+        self.backoff_codes = set(backoff_codes)
+        self.buckets = {}
+
+    def bucket(self, host):
+        if host not in self.buckets:
+            self.buckets[host] = HostBucket(self.start_rate)
+        return self.buckets[host]
+
+    def delay(self, host, now):
+        """Seconds to wait before the next request to `host` may start"""
+        return self.bucket(host).reserve(now, self.burst)
+
+    def record(self, host, now, status, latency, retry_after=None):
+        """Adapt the host's rate to a response; returns True on backoff"""
+        bucket = self.bucket(host)
+        if status in self.backoff_codes:
+            self.back_off(bucket, now, retry_after)
+            return True
+        if status == 200 and latency <= self.fast_latency:
+            bucket.rate = min(self.max_rate, bucket.rate + self.increase)
+        return False
+
+    def back_off(self, bucket, now, retry_after=None):
+        bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+        bucket.backoffs += 1
+        if retry_after:
+            bucket.blocked_until = max(bucket.blocked_until, now + retry_after)
+        # Requests already reserved at the old rate must not run ahead
+        bucket.next_free = max(bucket.next_free, now + 1.0 / bucket.rate)
+
+    def snapshot(self):
+        """Current rate and backoff count per host"""
+        return {
+            host: {'rate': round(bucket.rate, 3), 'backoffs': bucket.backoffs}
+            for host, bucket in self.buckets.items()
+        }
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)"""
+    if not value:
+        return None
+    value = value.decode('latin-1') if isinstance(value, bytes) else value
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = now or datetime.now(timezone.utc)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+class AdaptiveRateLimitMiddleware:
+    # Replaces the fixed DOWNLOAD_DELAY with a per-host token bucket whose
+    # rate adapts to how the site responds.
+    #
+    # Sits above RetryMiddleware so it sees 429/503 responses before they
+    # are turned into retries; retried requests wait for the host's
+    # Retry-After block like any other request.
+
+    def __init__(self, limiter, stats=None):
+        self.limiter = limiter
+        self.stats = stats
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your spiders.
-        s = cls()
+        settings = crawler.settings
+        if not settings.getbool('RATE_LIMIT_ENABLED', True):
+            raise NotConfigured
+        limiter = AdaptiveRateLimiter(
+            start_rate=settings.getfloat('RATE_LIMIT_START', 0.5),
+            min_rate=settings.getfloat('RATE_LIMIT_MIN', 0.05),
+            max_rate=settings.getfloat('RATE_LIMIT_MAX', 4.0),
+            burst=settings.getint('RATE_LIMIT_BURST', 1),
+            increase=settings.getfloat('RATE_LIMIT_INCREASE', 0.05),
+            decrease=settings.getfloat('RATE_LIMIT_DECREASE', 0.5),
+            fast_latency=settings.getfloat('RATE_LIMIT_FAST_LATENCY', 1.0),
+            backoff_codes=settings.getlist('RATE_LIMIT_BACKOFF_CODES', [403, 429, 503])
+        )
+        s = cls(limiter, crawler.stats)
         crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
         return s
 
-    def process_request(self, request, spider):
-        # Called for each request that goes through the downloader
-        # middleware.
-
-        # Must either:
-        # - return None: continue processing this request
-        # - or return a Response object
-        # - or return a Request object
-        # - or raise IgnoreRequest: process_exception() methods of
-        #   installed downloader middleware will be called
+    def host(self, request):
+        return request.meta.get('download_slot') or urlparse_cached(request).hostname
+
+    async def process_request(self, request, spider):
+        # Archived responses in replay mode never reach the network
+        if request.meta.get('archive_record'):
+            return None
+        wait = self.limiter.delay(self.host(request), time.monotonic())
+        if wait > 0:
+            from twisted.internet import reactor
+            await maybe_deferred_to_future(deferLater(reactor, wait, lambda: None))
+        request.meta['rate_limit_sent'] = time.monotonic()
         return None
 
     def process_response(self, request, response, spider):
-        # Called with the response returned from the downloader.
-
-        # Must either;
-        # - return a Response object
-        # - return a Request object
-        # - or raise IgnoreRequest
+        sent = request.meta.get('rate_limit_sent')
+        if sent is None or 'archived' in response.flags:
+            return response
+        host = self.host(request)
+        now = time.monotonic()
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if self.limiter.record(host, now, response.status, now - sent, retry_after):
+            spider.logger.info(
+                f"Backing off {host} after {response.status}: "
+                f"{self.limiter.bucket(host).rate:.2f} req/s"
+                + (f", blocked for {retry_after:.0f}s" if retry_after else "")
+            )
+            if self.stats:
+                self.stats.inc_value('ratelimit/backoff_events', spider=spider)
+        if self.stats:
+            self.stats.set_value(f'ratelimit/{host}/rate', round(self.limiter.bucket(host).rate, 3), spider=spider)
         return response
 
     def process_exception(self, request, exception, spider):
-        # Called when a download handler or a process_request()
-        # (from other downloader middleware) raises an exception.
+        # Timeouts and dropped connections are treated like throttling
+        if request.meta.get('rate_limit_sent') is not None:
+            self.limiter.back_off(self.limiter.bucket(self.host(request)), time.monotonic())
+            if self.stats:
+                self.stats.inc_value('ratelimit/backoff_events', spider=spider)
+        return None
 
-        # Must either:
-        # - return None: continue processing this exception
-        # - return a Response object: stops process_exception() chain
-        # - return a Request object: stops process_exception() chain
-        pass
+    def spider_opened(self, spider):
+        spider.rate_limiter = self.limiter
+        spider.logger.info(
+            f"Adaptive rate limit: start {self.limiter.start_rate} req/s, "
+            f"range {self.limiter.min_rate}-{self.limiter.max_rate} req/s per host"
+        )
+
+
+class ResponseArchiveMiddleware:
+    # Writes every fetched response to the on-disk archive and, in replay
+    # mode, serves archived responses without touching the network.
+    #
+    # Sits below HttpCompressionMiddleware so archived bodies are already
+    # decoded, and above RedirectMiddleware so redirects are not archived.
+
+    def __init__(self, archive_dir, segment_size, enabled):
+        self.archive_dir = archive_dir
+        self.segment_size = segment_size
+        self.enabled = enabled
+        self.archive = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        s = cls(
+            archive_dir=crawler.settings.get('ARCHIVE_DIR', 'archive'),
+            segment_size=crawler.settings.getint('ARCHIVE_SEGMENT_SIZE', 64 * 1024 * 1024),
+            enabled=crawler.settings.getbool('ARCHIVE_ENABLED', False)
+        )
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def process_request(self, request, spider):
+        # Replayed requests carry the location of their archived response
+        location = request.meta.get('archive_record')
+        if not location:
+            return None
+        archive = ResponseArchive(request.meta.get('archive_dir', self.archive_dir))
+        header, body = archive.read(*location)
+        headers = {
+            name: values for name, values in header['headers'].items()
+            if name.lower() not in ('content-encoding', 'transfer-encoding')
+        }
+        return HtmlResponse(
+            url=header['url'],
+            status=header['status'],
+            headers=headers,
+            body=body,
+            request=request,
+            flags=['archived']
+        )
+
+    def process_response(self, request, response, spider):
+        if not self.enabled or 'archived' in response.flags or response.status == 304:
+            return response
+        headers = {
+            name.decode('latin-1'): [value.decode('latin-1') for value in values]
+            for name, values in response.headers.items()
+        }
+        meta = {'page': request.meta.get('page'), 'run_id': getattr(spider, 'run_id', None)}
+        self.archive.write(response.url, response.status, headers, response.body, meta)
+        return response
 
     def spider_opened(self, spider):
-        spider.logger.info("Spider opened: %s" % spider.name)
+        if self.enabled:
+            self.archive = ResponseArchive(self.archive_dir, self.segment_size)
+            spider.logger.info(f"Archiving responses to {self.archive_dir}")
+
+    def spider_closed(self, spider):
+        if self.archive:
+            self.archive.close()
+            spider.logger.info(f"Archived {self.archive.records_written} responses")
@@ -0,0 +1 @@
+# fox_scraper/migrations/__init__.py
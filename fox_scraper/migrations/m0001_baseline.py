@@ -0,0 +1,96 @@
+# fox_scraper/migrations/m0001_baseline.py
+"""The tables of the original schema
+
+Tables that already exist are left as they are; later migrations alter
+them. Timestamps are UTC without time zone, as the code writes them.
+"""
+
+STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS data_sources (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        url TEXT NOT NULL,
+        description TEXT,
+        config JSONB,
+        is_active BOOLEAN DEFAULT true,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS scraping_runs (
+        id SERIAL PRIMARY KEY,
+        source_id INTEGER REFERENCES data_sources(id),
+        start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        end_time TIMESTAMP,
+        status VARCHAR(50),
+        items_processed INTEGER DEFAULT 0,
+        errors JSONB,
+        stats JSONB,
+        config_snapshot JSONB
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS raw_data (
+        id SERIAL PRIMARY KEY,
+        source_id INTEGER REFERENCES data_sources(id),
+        run_id INTEGER REFERENCES scraping_runs(id),
+        url TEXT,
+        raw_content JSONB,
+        hash TEXT,
+        scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        processing_status VARCHAR(50) DEFAULT 'pending'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS cleaned_data (
+        id SERIAL PRIMARY KEY,
+        raw_data_id INTEGER REFERENCES raw_data(id),
+        source_id INTEGER REFERENCES data_sources(id),
+        name VARCHAR(255),
+        category VARCHAR(255),
+        address JSONB,
+        contact JSONB,
+        data_json JSONB,
+        cleaned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        validation_status VARCHAR(50),
+        validation_errors JSONB
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS enriched_data (
+        id SERIAL PRIMARY KEY,
+        cleaned_data_id INTEGER REFERENCES cleaned_data(id),
+        enrichment_type VARCHAR(255),
+        data JSONB,
+        source VARCHAR(255),
+        enriched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        confidence_score FLOAT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS master_records (
+        id SERIAL PRIMARY KEY,
+        external_id VARCHAR(255),
+        name VARCHAR(255),
+        type VARCHAR(255),
+        status VARCHAR(50),
+        primary_data JSONB,
+        address JSONB,
+        contact JSONB,
+        data_json JSONB,
+        sources JSONB,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        confidence_score FLOAT
+    )
+    """,
+)
+
+
+def upgrade(connection):
+    if connection.dialect.name != 'postgresql':
+        return
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
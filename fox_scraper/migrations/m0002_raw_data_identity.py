@@ -0,0 +1,20 @@
+# fox_scraper/migrations/m0002_raw_data_identity.py
+"""Practice identity and last-seen columns on raw_data
+
+Existing rows keep a NULL identity_key, which the unique index allows;
+maintenance/backfill_identity_keys.py fills the keys in afterwards.
+"""
+
+STATEMENTS = (
+    "ALTER TABLE raw_data ADD COLUMN IF NOT EXISTS identity_key TEXT",
+    "ALTER TABLE raw_data ADD COLUMN IF NOT EXISTS last_seen_run_id INTEGER REFERENCES scraping_runs(id)",
+    "ALTER TABLE raw_data ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_raw_data_identity ON raw_data (source_id, identity_key)",
+)
+
+
+def upgrade(connection):
+    if connection.dialect.name != 'postgresql':
+        return
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
@@ -0,0 +1,101 @@
+# fox_scraper/migrations/m0003_pipeline_tables.py
+"""Tables of the crawler, pipeline and consolidation stages
+
+Page validators, entry HTML blobs, the shared frontier, dead letters, the
+run error log and the consolidation tables. raw_data_history is created,
+with its partitions, by DatabaseManager.create_tables on every start.
+"""
+
+STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS page_validators (
+        url TEXT PRIMARY KEY,
+        source_id INTEGER REFERENCES data_sources(id),
+        run_id INTEGER REFERENCES scraping_runs(id),
+        etag TEXT,
+        last_modified TEXT,
+        body_digest VARCHAR(64),
+        entry_count INTEGER,
+        checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS content_blobs (
+        digest VARCHAR(64) PRIMARY KEY,
+        encoding VARCHAR(16) NOT NULL,
+        data BYTEA NOT NULL,
+        size INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS crawl_frontier (
+        id SERIAL PRIMARY KEY,
+        run_id INTEGER NOT NULL REFERENCES scraping_runs(id),
+        url TEXT NOT NULL,
+        kind VARCHAR(50) DEFAULT 'listing',
+        page INTEGER,
+        meta JSONB,
+        priority INTEGER DEFAULT 0,
+        status VARCHAR(50) DEFAULT 'pending',
+        worker VARCHAR(255),
+        lease_expires_at TIMESTAMP,
+        attempts INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        CONSTRAINT uq_crawl_frontier_run_url UNIQUE (run_id, url)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_crawl_frontier_claim ON crawl_frontier (run_id, status, priority)",
+    """
+    CREATE TABLE IF NOT EXISTS dead_letters (
+        id SERIAL PRIMARY KEY,
+        run_id INTEGER NOT NULL REFERENCES scraping_runs(id),
+        source_id INTEGER REFERENCES data_sources(id),
+        url TEXT NOT NULL,
+        page INTEGER,
+        callback VARCHAR(255),
+        meta JSONB,
+        failure_class VARCHAR(255),
+        failure_message TEXT,
+        attempts INTEGER DEFAULT 1,
+        status VARCHAR(50) DEFAULT 'dead',
+        first_failed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_failed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        CONSTRAINT uq_dead_letters_run_url UNIQUE (run_id, url)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS run_errors (
+        id SERIAL PRIMARY KEY,
+        run_id INTEGER NOT NULL REFERENCES scraping_runs(id),
+        occurred_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        url TEXT,
+        error TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_run_errors_run_id ON run_errors (run_id)",
+    """
+    CREATE TABLE IF NOT EXISTS master_record_members (
+        cleaned_data_id INTEGER PRIMARY KEY REFERENCES cleaned_data(id) ON DELETE CASCADE,
+        master_record_id INTEGER NOT NULL REFERENCES master_records(id) ON DELETE CASCADE,
+        consolidated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_master_record_members_master_record_id ON master_record_members (master_record_id)",
+    """
+    CREATE TABLE IF NOT EXISTS record_blocks (
+        block_key TEXT,
+        cleaned_data_id INTEGER REFERENCES cleaned_data(id) ON DELETE CASCADE,
+        PRIMARY KEY (block_key, cleaned_data_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_record_blocks_cleaned_data_id ON record_blocks (cleaned_data_id)",
+)
+
+
+def upgrade(connection):
+    if connection.dialect.name != 'postgresql':
+        return
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
@@ -0,0 +1,32 @@
+# fox_scraper/migrations/m0004_unique_keys.py
+"""Unique keys the pipeline's and workers' ON CONFLICT upserts rely on
+
+raw_data.hash becomes unique. Later copies of a duplicated hash keep their
+data but lose the hash, so no row is deleted. This replaces the plain
+idx_raw_data_hash index of the original schema.
+"""
+
+STATEMENTS = (
+    """
+    UPDATE raw_data SET hash = NULL
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY hash ORDER BY id) AS copy
+            FROM raw_data
+            WHERE hash IS NOT NULL
+        ) copies
+        WHERE copy > 1
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS raw_data_hash_key ON raw_data (hash)",
+    "DROP INDEX IF EXISTS idx_raw_data_hash",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_cleaned_data_raw_data ON cleaned_data (raw_data_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_enriched_data_type ON enriched_data (cleaned_data_id, enrichment_type)",
+)
+
+
+def upgrade(connection):
+    if connection.dialect.name != 'postgresql':
+        return
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
@@ -0,0 +1,57 @@
+# fox_scraper/migrations/m0005_query_indexes.py
+"""Replace the hand-built indexes of the original schema with query-driven ones
+
+The indexes follow the queries that run: the pending slice for the
+cleaning claim, the detail_fetched_at path for fresh detail pages, the
+latest row per URL for detail merges and foreign key lookups. The general
+GIN indexes over raw_content and master_records.data_json served no query
+and slowed every write, so they go.
+"""
+
+# Built concurrently so a running crawl keeps writing
+TRANSACTIONAL = False
+
+INDEXES = (
+    "ix_scraping_runs_source_start ON scraping_runs (source_id, start_time)",
+    "ix_raw_data_run_id ON raw_data (run_id)",
+    "ix_raw_data_source_url ON raw_data (source_id, url, id)",
+    "ix_raw_data_pending ON raw_data (id) WHERE processing_status = 'pending'",
+    "ix_raw_data_detail_fetched ON raw_data (source_id, (raw_content ->> 'detail_fetched_at')) "
+    "WHERE (raw_content ->> 'detail_fetched_at') IS NOT NULL",
+    "ix_raw_data_superseded ON raw_data (scraped_at) WHERE identity_key IS NULL",
+    "ix_cleaned_data_source_validation ON cleaned_data (source_id, validation_status)",
+    "ix_page_validators_source_id ON page_validators (source_id)",
+    "ix_page_validators_run_id ON page_validators (run_id)",
+    "ix_dead_letters_source_id ON dead_letters (source_id)",
+    "ix_master_records_external_id ON master_records (external_id)",
+    "ix_master_records_name ON master_records (name)",
+    "ix_master_records_updated_at ON master_records (updated_at)",
+)
+
+# An interrupted concurrent build leaves an INVALID index that IF NOT EXISTS
+# would keep; it is dropped and built again
+INVALID_INDEX_SQL = """
+    SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.relname = %(name)s AND pg_table_is_visible(c.oid) AND NOT i.indisvalid
+"""
+
+LEGACY_INDEXES = (
+    'idx_raw_data_content',
+    'idx_raw_data_status',
+    'idx_master_records_data',
+    'idx_master_records_external_id',
+    'idx_master_records_name',
+    'idx_cleaned_data_validation',
+)
+
+
+def upgrade(connection):
+    if connection.dialect.name != 'postgresql':
+        return
+    for index in INDEXES:
+        name = index.split()[0]
+        if connection.exec_driver_sql(INVALID_INDEX_SQL, {'name': name}).first():
+            connection.exec_driver_sql(f"DROP INDEX CONCURRENTLY {name}")
+        connection.exec_driver_sql(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index}")
+    for name in LEGACY_INDEXES:
+        connection.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
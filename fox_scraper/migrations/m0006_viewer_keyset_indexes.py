@@ -0,0 +1,39 @@
+# fox_scraper/migrations/m0006_viewer_keyset_indexes.py
+"""Indexes matching the data viewer's keyset pages
+
+Each page is "newest rows of a source (and status) before a cursor", so the
+indexes end in the cursor column and a page is a short index range scan.
+"""
+
+TRANSACTIONAL = False
+
+INDEXES = (
+    "ix_raw_data_source_status_id ON raw_data (source_id, processing_status, id)",
+    "ix_cleaned_data_source_id ON cleaned_data (source_id, id)",
+    "ix_cleaned_data_source_validation_id ON cleaned_data (source_id, validation_status, id)",
+    "ix_master_records_updated_id ON master_records (updated_at, id)",
+)
+
+# An interrupted concurrent build leaves an INVALID index that IF NOT EXISTS
+# would keep; it is dropped and built again
+INVALID_INDEX_SQL = """
+    SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.relname = %(name)s AND pg_table_is_visible(c.oid) AND NOT i.indisvalid
+"""
+
+REPLACED_INDEXES = (
+    'ix_cleaned_data_source_validation',
+    'ix_master_records_updated_at',
+)
+
+
+def upgrade(connection):
+    if connection.dialect.name != 'postgresql':
+        return
+    for index in INDEXES:
+        name = index.split()[0]
+        if connection.exec_driver_sql(INVALID_INDEX_SQL, {'name': name}).first():
+            connection.exec_driver_sql(f"DROP INDEX CONCURRENTLY {name}")
+        connection.exec_driver_sql(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index}")
+    for name in REPLACED_INDEXES:
+        connection.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,269 @@
+# fox_scraper/migrations/m0007_rollups.py
+"""Rollup counts per source, day, run and status, kept current by triggers
+
+The existing rows are counted once here; from then on every write to
+raw_data, cleaned_data and master_records adds its delta. The trigger
+functions mirror fox_scraper.core.rollups as of this migration; a change
+to the rollup keys ships as a new migration.
+"""
+
+STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS rollup_counts (
+        table_name VARCHAR(64),
+        source_id INTEGER,
+        day DATE,
+        run_id INTEGER,
+        status VARCHAR(50),
+        records BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (table_name, source_id, day, run_id, status)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rollup_deltas (
+        id BIGSERIAL PRIMARY KEY,
+        table_name VARCHAR(64) NOT NULL,
+        source_id INTEGER NOT NULL,
+        day DATE NOT NULL,
+        run_id INTEGER NOT NULL,
+        status VARCHAR(50) NOT NULL,
+        records BIGINT NOT NULL
+    )
+    """,
+)
+
+# One delta row per rollup key of a statement's transition tables; updates
+# count the old rows out and the new ones in
+TRIGGER_FUNCTIONS = (
+    """
+    CREATE OR REPLACE FUNCTION rollup_raw_data() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO rollup_deltas (table_name, source_id, day, run_id, status, records)
+            SELECT table_name, source_id, day, run_id, status, SUM(records) FROM (
+                SELECT 'raw_data' AS table_name, COALESCE(r.source_id, 0) AS source_id,
+                       COALESCE(DATE(r.scraped_at), DATE '1970-01-01') AS day,
+                       COALESCE(r.run_id, 0) AS run_id, COALESCE(r.processing_status, '') AS status,
+                       1 AS records
+                FROM new_rows r
+            ) d
+            GROUP BY table_name, source_id, day, run_id, status;
+        ELSIF TG_OP = 'DELETE' THEN
+            INSERT INTO rollup_deltas (table_name, source_id, day, run_id, status, records)
+            SELECT table_name, source_id, day, run_id, status, SUM(records) FROM (
+                SELECT 'raw_data' AS table_name, COALESCE(r.source_id, 0) AS source_id,
+                       COALESCE(DATE(r.scraped_at), DATE '1970-01-01') AS day,
+                       COALESCE(r.run_id, 0) AS run_id, COALESCE(r.processing_status, '') AS status,
+                       -1 AS records
+                FROM old_rows r
+            ) d
+            GROUP BY table_name, source_id, day, run_id, status;
+        ELSE
+            INSERT INTO rollup_deltas (table_name, source_id, day, run_id, status, records)
+            SELECT table_name, source_id, day, run_id, status, SUM(records) FROM (
+                SELECT 'raw_data' AS table_name, COALESCE(r.source_id, 0) AS source_id,
+                       COALESCE(DATE(r.scraped_at), DATE '1970-01-01') AS day,
+                       COALESCE(r.run_id, 0) AS run_id, COALESCE(r.processing_status, '') AS status,
+                       1 AS records
+                FROM new_rows r
+                UNION ALL
+                SELECT 'raw_data' AS table_name, COALESCE(r.source_id, 0) AS source_id,
+                       COALESCE(DATE(r.scraped_at), DATE '1970-01-01') AS day,
+                       COALESCE(r.run_id, 0) AS run_id, COALESCE(r.processing_status, '') AS status,
+                       -1 AS records
+                FROM old_rows r
+            ) d
+            GROUP BY table_name, source_id, day, run_id, status
+            HAVING SUM(records) <> 0;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION rollup_cleaned_data() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO rollup_deltas (table_name, source_id, day, run_id, status, records)
+            SELECT table_name, source_id, day, run_id, status, SUM(records) FROM (
+                SELECT 'cleaned_data' AS table_name, COALESCE(r.source_id, 0) AS source_id,
+                       COALESCE(DATE(r.cleaned_at), DATE '1970-01-01') AS day,
+                       0 AS run_id, COALESCE(r.validation_status, '') AS status,
+                       1 AS records
+                FROM new_rows r
+            ) d
+            GROUP BY table_name, source_id, day, run_id, status;
+        ELSIF TG_OP = 'DELETE' THEN
+            INSERT INTO rollup_deltas (table_name, source_id, day, run_id, status, records)
+            SELECT table_name, source_id, day, run_id, status, SUM(records) FROM (
+                SELECT 'cleaned_data' AS table_name, COALESCE(r.source_id, 0) AS source_id,
+                       COALESCE(DATE(r.cleaned_at), DATE '1970-01-01') AS day,
+                       0 AS run_id, COALESCE(r.validation_status, '') AS status,
+                       -1 AS records
+                FROM old_rows r
+            ) d
+            GROUP BY table_name, source_id, day, run_id, status;
+        ELSE
+            INSERT INTO rollup_deltas (table_name, source_id, day, run_id, status, records)
+            SELECT table_name, source_id, day, run_id, status, SUM(records) FROM (
+                SELECT 'cleaned_data' AS table_name, COALESCE(r.source_id, 0) AS source_id,
+                       COALESCE(DATE(r.cleaned_at), DATE '1970-01-01') AS day,
+                       0 AS run_id, COALESCE(r.validation_status, '') AS status,
+                       1 AS records
+                FROM new_rows r
+                UNION ALL
+                SELECT 'cleaned_data' AS table_name, COALESCE(r.source_id, 0) AS source_id,
+                       COALESCE(DATE(r.cleaned_at), DATE '1970-01-01') AS day,
+                       0 AS run_id, COALESCE(r.validation_status, '') AS status,
+                       -1 AS records
+                FROM old_rows r
+            ) d
+            GROUP BY table_name, source_id, day, run_id, status
+            HAVING SUM(records) <> 0;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION rollup_master_records() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO rollup_deltas (table_name, source_id, day, run_id, status, records)
+            SELECT table_name, source_id, day, run_id, status, SUM(records) FROM (
+                SELECT 'master_records' AS table_name, 0 AS source_id,
+                       COALESCE(DATE(r.created_at), DATE '1970-01-01') AS day,
+                       0 AS run_id, COALESCE(r.status, '') AS status,
+                       1 AS records
+                FROM new_rows r
+            ) d
+            GROUP BY table_name, source_id, day, run_id, status;
+        ELSIF TG_OP = 'DELETE' THEN
+            INSERT INTO rollup_deltas (table_name, source_id, day, run_id, status, records)
+            SELECT table_name, source_id, day, run_id, status, SUM(records) FROM (
+                SELECT 'master_records' AS table_name, 0 AS source_id,
+                       COALESCE(DATE(r.created_at), DATE '1970-01-01') AS day,
+                       0 AS run_id, COALESCE(r.status, '') AS status,
+                       -1 AS records
+                FROM old_rows r
+            ) d
+            GROUP BY table_name, source_id, day, run_id, status;
+        ELSE
+            INSERT INTO rollup_deltas (table_name, source_id, day, run_id, status, records)
+            SELECT table_name, source_id, day, run_id, status, SUM(records) FROM (
+                SELECT 'master_records' AS table_name, 0 AS source_id,
+                       COALESCE(DATE(r.created_at), DATE '1970-01-01') AS day,
+                       0 AS run_id, COALESCE(r.status, '') AS status,
+                       1 AS records
+                FROM new_rows r
+                UNION ALL
+                SELECT 'master_records' AS table_name, 0 AS source_id,
+                       COALESCE(DATE(r.created_at), DATE '1970-01-01') AS day,
+                       0 AS run_id, COALESCE(r.status, '') AS status,
+                       -1 AS records
+                FROM old_rows r
+            ) d
+            GROUP BY table_name, source_id, day, run_id, status
+            HAVING SUM(records) <> 0;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+)
+
+# Statement-level, one per event, as transition tables require
+TRIGGERS = (
+    "DROP TRIGGER IF EXISTS rollup_raw_data_insert ON raw_data",
+    "CREATE TRIGGER rollup_raw_data_insert AFTER INSERT ON raw_data "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION rollup_raw_data()",
+    "DROP TRIGGER IF EXISTS rollup_raw_data_update ON raw_data",
+    "CREATE TRIGGER rollup_raw_data_update AFTER UPDATE ON raw_data "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION rollup_raw_data()",
+    "DROP TRIGGER IF EXISTS rollup_raw_data_delete ON raw_data",
+    "CREATE TRIGGER rollup_raw_data_delete AFTER DELETE ON raw_data "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION rollup_raw_data()",
+    "DROP TRIGGER IF EXISTS rollup_cleaned_data_insert ON cleaned_data",
+    "CREATE TRIGGER rollup_cleaned_data_insert AFTER INSERT ON cleaned_data "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION rollup_cleaned_data()",
+    "DROP TRIGGER IF EXISTS rollup_cleaned_data_update ON cleaned_data",
+    "CREATE TRIGGER rollup_cleaned_data_update AFTER UPDATE ON cleaned_data "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION rollup_cleaned_data()",
+    "DROP TRIGGER IF EXISTS rollup_cleaned_data_delete ON cleaned_data",
+    "CREATE TRIGGER rollup_cleaned_data_delete AFTER DELETE ON cleaned_data "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION rollup_cleaned_data()",
+    "DROP TRIGGER IF EXISTS rollup_master_records_insert ON master_records",
+    "CREATE TRIGGER rollup_master_records_insert AFTER INSERT ON master_records "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION rollup_master_records()",
+    "DROP TRIGGER IF EXISTS rollup_master_records_update ON master_records",
+    "CREATE TRIGGER rollup_master_records_update AFTER UPDATE ON master_records "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION rollup_master_records()",
+    "DROP TRIGGER IF EXISTS rollup_master_records_delete ON master_records",
+    "CREATE TRIGGER rollup_master_records_delete AFTER DELETE ON master_records "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION rollup_master_records()",
+)
+
+TOTALS_VIEW = """
+    CREATE OR REPLACE VIEW rollup_totals AS
+    SELECT table_name, source_id, day, run_id, status, records FROM rollup_counts
+    UNION ALL
+    SELECT table_name, source_id, day, run_id, status, records FROM rollup_deltas
+"""
+
+# Writers are locked out until the migration commits, so no row lands
+# between the count and the triggers
+BACKFILL = (
+    "LOCK TABLE raw_data, cleaned_data, master_records IN SHARE MODE",
+    "DELETE FROM rollup_deltas",
+    "DELETE FROM rollup_counts",
+    """
+    INSERT INTO rollup_counts (table_name, source_id, day, run_id, status, records, updated_at)
+    SELECT table_name, source_id, day, run_id, status, SUM(records), NOW() AT TIME ZONE 'UTC' FROM (
+        SELECT 'raw_data' AS table_name, COALESCE(r.source_id, 0) AS source_id,
+               COALESCE(DATE(r.scraped_at), DATE '1970-01-01') AS day,
+               COALESCE(r.run_id, 0) AS run_id, COALESCE(r.processing_status, '') AS status,
+               1 AS records
+        FROM raw_data r
+    ) d
+    GROUP BY table_name, source_id, day, run_id, status
+    """,
+    """
+    INSERT INTO rollup_counts (table_name, source_id, day, run_id, status, records, updated_at)
+    SELECT table_name, source_id, day, run_id, status, SUM(records), NOW() AT TIME ZONE 'UTC' FROM (
+        SELECT 'cleaned_data' AS table_name, COALESCE(r.source_id, 0) AS source_id,
+               COALESCE(DATE(r.cleaned_at), DATE '1970-01-01') AS day,
+               0 AS run_id, COALESCE(r.validation_status, '') AS status,
+               1 AS records
+        FROM cleaned_data r
+    ) d
+    GROUP BY table_name, source_id, day, run_id, status
+    """,
+    """
+    INSERT INTO rollup_counts (table_name, source_id, day, run_id, status, records, updated_at)
+    SELECT table_name, source_id, day, run_id, status, SUM(records), NOW() AT TIME ZONE 'UTC' FROM (
+        SELECT 'master_records' AS table_name, 0 AS source_id,
+               COALESCE(DATE(r.created_at), DATE '1970-01-01') AS day,
+               0 AS run_id, COALESCE(r.status, '') AS status,
+               1 AS records
+        FROM master_records r
+    ) d
+    GROUP BY table_name, source_id, day, run_id, status
+    """,
+)
+
+
+def upgrade(connection):
+    if connection.dialect.name != 'postgresql':
+        return
+    for statement in STATEMENTS + TRIGGER_FUNCTIONS + TRIGGERS + (TOTALS_VIEW,) + BACKFILL:
+        connection.exec_driver_sql(statement)
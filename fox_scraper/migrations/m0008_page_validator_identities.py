@@ -0,0 +1,17 @@
+# fox_scraper/migrations/m0008_page_validator_identities.py
+"""Identity keys of each listing page's entries, stored with its validators
+
+Pages skipped as unchanged touch these keys' last_seen columns. Validators
+stored before this column existed are not trusted to skip a page.
+"""
+
+STATEMENTS = (
+    "ALTER TABLE page_validators ADD COLUMN IF NOT EXISTS identity_keys JSONB",
+)
+
+
+def upgrade(connection):
+    if connection.dialect.name != 'postgresql':
+        return
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
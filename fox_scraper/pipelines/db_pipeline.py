@@ -1,24 +1,93 @@
 # fox_scraper/pipelines/db_pipeline.py
+from sqlalchemy import text, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import SQLAlchemyError
+from twisted.internet import defer, task, threads
+from datetime import datetime
 import logging
 import json
-import hashlib
+import time
 from ..core.database import (
     DatabaseManager, 
     RawData, 
     CleanedData,
-    DataSource,
-    ScrapingRun
+    DataSource
 )
+from ..core.blobs import BlobStore
+from ..core.config import pool_stats
+from ..core.dedup import HashIndex
+from ..core.identity import identity_key, content_hash
+from ..core.cleaning import clean_batch, upsert_cleaned
+from ..core.writer import BatchWriter
+from ..core.partitions import archive_changed
+from ..core.rollups import refresh_rollups, rollup_totals, table_counts
+
+# Patch the latest raw_data row per (source_id, url) in one statement
+MERGE_DETAILS = text("""
+    WITH details AS (
+        SELECT * FROM jsonb_to_recordset(CAST(:details AS jsonb))
+            AS d(source_id INTEGER, url TEXT, patch JSONB)
+    ), latest AS (
+        SELECT details.url, details.patch,
+               (SELECT MAX(id) FROM raw_data
+                WHERE raw_data.source_id = details.source_id AND raw_data.url = details.url) AS id
+        FROM details
+    )
+    UPDATE raw_data
+    SET raw_content = COALESCE(raw_data.raw_content, '{}'::jsonb) || latest.patch
+    FROM latest
+    WHERE raw_data.id = latest.id
+    RETURNING latest.url
+""")
 
 class DatabasePipeline:
-    def __init__(self):
+    def __init__(self, batch_size=500, flush_interval=5.0, stats=None,
+                 threaded=True, max_queued_batches=4, clean_inline=True, keep_history=True):
         self.items_count = 0
         self.logger = logging.getLogger(__name__)
         self.db = DatabaseManager()
+        self.blobs = BlobStore()
+        self.known_hashes = HashIndex()
+        self.clean_inline = clean_inline  # Off: rows stay pending for the cleaning worker
+        self.keep_history = keep_history  # Copy overwritten versions into raw_data_history
+
+        # Items are buffered and written by size or age, whichever comes first
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.detail_buffer = []
+        self.last_flush = time.monotonic()
+        self.flush_loop = None
+
+        # Writes run on a BatchWriter thread once the spider is open; items
+        # wait on `waiters` while its queue is full
+        self.threaded = threaded
+        self.max_queued_batches = max_queued_batches
+        self.writer = None
+        self.waiters = []
+
+        self.spider = None  # Its journal learns which pages were committed
+
+        self.stats = stats
+        self.flushes = 0
+        self.rows_written = 0
+        self.flush_seconds = 0.0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            batch_size=crawler.settings.getint('DB_BATCH_SIZE', 500),
+            flush_interval=crawler.settings.getfloat('DB_FLUSH_INTERVAL', 5.0),
+            stats=crawler.stats,
+            threaded=crawler.settings.getbool('DB_WRITER_THREAD', True),
+            max_queued_batches=crawler.settings.getint('DB_WRITE_QUEUE_BATCHES', 4),
+            clean_inline=crawler.settings.getbool('CLEAN_INLINE', True),
+            keep_history=crawler.settings.getbool('RAW_HISTORY', True)
+        )
 
     def open_spider(self, spider):
         """Initialize database when spider starts"""
+        self.spider = spider
         try:
             self.db.create_tables()
             session = self.db.get_session()
@@ -36,11 +105,32 @@ class DatabasePipeline:
                 session.commit()
             
             # Get current record counts
-            raw_count = session.query(RawData).count()
-            cleaned_count = session.query(CleanedData).count()
+            counts = table_counts(session, ('raw_data', 'cleaned_data'))
             
-            self.logger.info(f"Connected to database. Raw records: {raw_count}, Cleaned records: {cleaned_count}")
+            self.logger.info(f"Connected to database. Raw records: {counts['raw_data']}, Cleaned records: {counts['cleaned_data']}")
+
+            # Duplicates are rejected against this set instead of a query per item
+            loaded = self.known_hashes.load(session, source.id)
+            self.logger.info(
+                f"Preloaded {loaded} content hashes, "
+                f"{self.known_hashes.memory_bytes() / 1024 / 1024:.1f} MB "
+                f"({self.known_hashes.bytes_per_million() / 1024 / 1024:.1f} MB per million)"
+            )
             session.close()
+
+            if self.threaded:
+                from twisted.internet import reactor
+                self.writer = BatchWriter(
+                    self.write_buffered,
+                    max_batches=self.max_queued_batches,
+                    on_taken=lambda: reactor.callFromThread(self.batch_taken)
+                )
+                self.writer.start()
+
+            # Flush items that sit in the buffer while the crawl is quiet
+            if self.flush_interval > 0:
+                self.flush_loop = task.LoopingCall(self.flush)
+                self.flush_loop.start(self.flush_interval, now=False)
             
         except Exception as e:
             self.logger.error(f"Error connecting to database: {str(e)}")
@@ -48,117 +138,363 @@ class DatabasePipeline:
 
     def close_spider(self, spider):
         """Update final stats when spider closes"""
+        if self.flush_loop and self.flush_loop.running:
+            self.flush_loop.stop()
+
+        if not self.writer:
+            self.flush()
+            self.finish_spider(spider)
+            return
+
+        # Drain the writer thread without blocking the reactor
+        batch = self.take_buffers()
+        d = threads.deferToThread(self.writer.close, batch)
+        d.addCallback(lambda _: self.finish_spider(spider))
+        return d
+
+    def finish_spider(self, spider):
+        """Log write stats and final counts once every item is written"""
+        self.release_waiters()
+        stats = self.write_stats()
+        self.logger.info(
+            f"Wrote {stats['rows_written']} rows in {stats['flushes']} flushes, "
+            f"{stats['avg_flush_ms']:.1f} ms per flush, {stats['rows_per_sec']:.0f} rows/sec"
+        )
+        pool = pool_stats()
+        self.logger.info(
+            f"DB pool: {pool['checkouts']} checkouts over {pool['connects']} connections, "
+            f"{pool['avg_wait_ms']:.1f} ms average wait, {pool['max_wait_ms']:.1f} ms max, "
+            f"{pool['timeouts']} timeouts"
+        )
+
+        # The run's status and item count are the spider's to set in closed()
+        session = self.db.get_session()
         try:
-            session = self.db.get_session()
-            
-            # Update run status
-            run = session.query(ScrapingRun).filter_by(id=spider.run.id).first()
-            if run:
-                run.status = 'completed'
-                run.items_processed = self.items_count
-                session.commit()
-            
-            # Get final counts
-            raw_count = session.query(RawData).count()
-            cleaned_count = session.query(CleanedData).count()
+            # Fold pending rollup deltas, then get final counts
+            refresh_rollups(session)
+            session.commit()
+            counts = table_counts(session, ('raw_data', 'cleaned_data'))
+            by_status = rollup_totals(session, 'raw_data', by=('status',), run_id=spider.run_id)
+            run_rows = ', '.join(f"{row.status}: {row.records}" for row in by_status) or 'none'
             
-            self.logger.info(f"Spider finished. Raw records: {raw_count}, Cleaned records: {cleaned_count}")
-            session.close()
+            self.logger.info(f"Spider finished. Raw records: {counts['raw_data']}, Cleaned records: {counts['cleaned_data']}")
+            self.logger.info(f"Raw records of run {spider.run_id} by status: {run_rows}")
             
         except Exception as e:
+            session.rollback()
             self.logger.error(f"Error closing spider: {str(e)}")
+        finally:
+            session.close()
 
     def process_item(self, item, spider):
-        """Process and save scraped items"""
+        """Buffer scraped items; they are written in batches by flush()"""
+        if 'detail' in item:
+            self.detail_buffer.append(item)
+        else:
+            self.buffer.append(item)
+
+        if (len(self.buffer) + len(self.detail_buffer) >= self.batch_size
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            if not self.flush():
+                # The writer is behind: hold this item until it catches up,
+                # which in turn throttles how fast the crawler hands us more
+                d = defer.Deferred()
+                d.addCallback(lambda _: item)
+                self.waiters.append(d)
+                return d
+        return item
+
+    def take_buffers(self):
+        """Hand over the buffered items as one batch, or None if empty"""
+        self.last_flush = time.monotonic()
+        items, details = self.buffer, self.detail_buffer
+        self.buffer, self.detail_buffer = [], []
+        if not items and not details:
+            return None
+        return items, details
+
+    def flush(self):
+        """Send the buffered items to the writer, False if its queue is full"""
+        if self.writer and self.writer.full():
+            return False
+        batch = self.take_buffers()
+        if batch:
+            if self.writer:
+                self.writer.submit(batch)
+            else:
+                self.write_buffered(*batch)
+        return True
+
+    def batch_taken(self):
+        """Writer picked up a batch: flush what is waiting and release held items"""
+        if self.waiters and self.flush():
+            self.release_waiters()
+
+    def release_waiters(self):
+        waiters, self.waiters = self.waiters, []
+        for d in waiters:
+            d.callback(None)
+
+    def write_buffered(self, items, details):
+        """Write one batch in a single transaction, item by item if that fails
+
+        Listing pages whose completion markers ride in the batch are reported
+        to the spider's journal once the batch is committed. After a failed
+        batch they stay pending, so a resumed run fetches them again.
+        """
+        start = time.perf_counter()
+        pages = [(item['url'], item['completed_page']) for item in items if 'completed_page' in item]
+        items = [item for item in items if 'completed_page' not in item]
+        try:
+            rows = self.write_batch(items, details)
+        except Exception as e:
+            # One bad item must not cost the whole batch
+            self.logger.error(f"Batch of {len(items) + len(details)} items failed, writing them one by one: {str(e)}")
+            rows = self.write_singly(items, details)
+            pages = []
+        self.record_flush(rows, time.perf_counter() - start)
+        if pages:
+            if self.writer:
+                from twisted.internet import reactor
+                reactor.callFromThread(self.pages_written, pages)
+            else:
+                self.pages_written(pages)
+
+    def pages_written(self, pages):
+        """Mark listing pages completed in the journal once their items are committed"""
+        journal = getattr(self.spider, 'journal', None)
+        if not journal:
+            return
+        for url, page in pages:
+            journal.mark_completed(url, page)
+        journal.flush()
+
+    def write_batch(self, items, details):
+        """Write entry and detail items in a single transaction, return rows written"""
         session = self.db.get_session()
         try:
-            # Create content hash for deduplication
-            content_hash = hashlib.md5(
-                json.dumps(item['raw_content'], sort_keys=True).encode()
-            ).hexdigest()
-
-            # Check for existing record
-            existing_record = session.query(RawData).filter_by(
-                hash=content_hash
-            ).first()
-
-            if existing_record:
-                self.logger.info(f"Duplicate content found for URL: {item['url']}")
-                return item
-
-            # Save raw data
-            raw_data = RawData(
-                source_id=item['source_id'],
-                run_id=item['run_id'],
-                url=item['url'],
-                raw_content=item['raw_content'],
-                hash=content_hash,
-                processing_status='pending'
-            )
-            session.add(raw_data)
-            session.flush()  # Get ID without committing
+            rows = self.write_entries(session, items)
+            rows += self.write_details(session, details)
+            session.commit()
+            self.blobs.committed()
+            self.known_hashes.committed()
+            return rows
+        except Exception:
+            session.rollback()
+            self.blobs.rolled_back()
+            self.known_hashes.rolled_back()
+            raise
+        finally:
+            session.close()
 
-            # Process cleaned data
+    def write_singly(self, items, details):
+        """Fallback for a failed batch: one transaction per item"""
+        rows = 0
+        for item in items + details:
             try:
-                # Extract structured data from raw content
-                raw_content = item['raw_content']
-                cleaned_data = CleanedData(
-                    raw_data_id=raw_data.id,
-                    source_id=item['source_id'],
-                    name=raw_content.get('name', ''),
-                    category=raw_content.get('category', ''),
-                    address={
-                        'street': raw_content.get('address', {}).get('street', ''),
-                        'city': raw_content.get('address', {}).get('city', ''),
-                    },
-                    contact={
-                        'phone': raw_content.get('phone', ''),
-                        'hours': raw_content.get('opening_hours', '')
-                    },
-                    data_json={
-                        'page_number': raw_content.get('page_number'),
-                        'subtitle': raw_content.get('subtitle', ''),
-                        'raw_html': raw_content.get('html', '')
-                    },
-                    validation_status='valid'
-                )
-                session.add(cleaned_data)
-                
-                # Update raw data status
-                raw_data.processing_status = 'processed'
-                
+                if 'detail' in item:
+                    rows += self.write_batch([], [item])
+                else:
+                    rows += self.write_batch([item], [])
+            except SQLAlchemyError as e:
+                self.logger.error(f"Database error: {str(e)}")
             except Exception as e:
-                self.logger.error(f"Error cleaning data: {str(e)}")
-                raw_data.processing_status = 'failed'
-                session.add(RawData(
+                self.logger.error(f"Error processing item: {str(e)}")
+                self.logger.error(f"Failed item: {json.dumps(item, indent=2, ensure_ascii=False)}")
+        return rows
+
+    def write_entries(self, session, items):
+        """Upsert raw_data and cleaned_data rows for listing entries
+
+        Entries whose content hash is already stored only get their
+        last_seen columns touched, as do the practices of listing pages
+        skipped as unchanged. New practices are inserted; a practice whose
+        identity key exists but whose data changed is updated in place.
+        """
+        now = datetime.utcnow()
+        unchanged = {}
+        changed = {}
+        seen = {}
+        for item in items:
+            if 'seen' in item:
+                seen.setdefault((item['source_id'], item['run_id']), set()).update(item['seen'])
+                continue
+            entry_hash = content_hash(item['raw_content'])
+            if entry_hash in self.known_hashes:
+                unchanged[entry_hash] = item
+                continue
+            # A later entry of the same practice in one batch wins
+            changed[(item['source_id'], identity_key(item['raw_content']))] = (entry_hash, item)
+
+        rows = self.touch_entries(session, unchanged, now)
+        rows += self.touch_seen(session, seen, now)
+        if not changed:
+            return rows
+        entries = list(changed.items())
+        for _, (entry_hash, _) in entries:
+            self.known_hashes.add(entry_hash)
+
+        # Move entry HTML into the content store, keep only its digest
+        contents = [dict(item['raw_content']) for _, (_, item) in entries]
+        html = [raw_content.pop('html', None) for raw_content in contents]
+        refs = iter(self.blobs.put_many(session, [text for text in html if text]))
+        for raw_content, text in zip(contents, html):
+            if text:
+                raw_content['html_ref'] = next(refs)
+
+        # Clean the whole batch at once; without inline cleaning rows stay
+        # pending for tools/clean_worker.py
+        results = [(None, None, None)] * len(entries)
+        if self.clean_inline:
+            results = clean_batch([
+                (None, item['source_id'], raw_content)
+                for (_, (_, item)), raw_content in zip(entries, contents)
+            ])
+
+        raw_rows = []
+        cleaned_rows = {}
+        for ((_, key), (entry_hash, item)), raw_content, (_, cleaned, error) in zip(entries, contents, results):
+            if cleaned:
+                cleaned_rows[key] = cleaned
+                status = 'processed'
+            elif not error:
+                status = 'pending'
+            else:
+                self.logger.error(f"Error cleaning data: {error}")
+                status = 'failed'
+                raw_rows.append(dict(
                     source_id=item['source_id'],
                     run_id=item['run_id'],
                     url=item['url'],
-                    raw_content={'error': str(e)},
+                    raw_content={'error': error},
+                    hash=None,
+                    identity_key=None,
+                    last_seen_run_id=item['run_id'],
+                    last_seen_at=now,
                     processing_status='failed'
                 ))
+            raw_rows.append(dict(
+                source_id=item['source_id'],
+                run_id=item['run_id'],
+                url=item['url'],
+                raw_content=raw_content,
+                hash=entry_hash,
+                identity_key=key,
+                last_seen_run_id=item['run_id'],
+                last_seen_at=now,
+                processing_status=status
+            ))
 
-            session.commit()
-            self.items_count += 1
+        if self.keep_history:
+            by_source = {}
+            for source_id, key in changed:
+                by_source.setdefault(source_id, []).append(key)
+            for source_id, keys in by_source.items():
+                archive_changed(session, source_id, keys, now)
 
-            if self.items_count % 100 == 0:
-                self.logger.info(f"Processed {self.items_count} items")
+        # Multi-row upsert on the identity key. The merge keeps detail page
+        # fields of an updated row.
+        stmt = insert(RawData).values(raw_rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RawData.source_id, RawData.identity_key],
+            set_={
+                'raw_content': RawData.raw_content.op('||')(stmt.excluded.raw_content),
+                'hash': stmt.excluded.hash,
+                'url': stmt.excluded.url,
+                'last_seen_run_id': stmt.excluded.last_seen_run_id,
+                'last_seen_at': stmt.excluded.last_seen_at,
+                'processing_status': stmt.excluded.processing_status
+            }
+        ).returning(RawData.identity_key, RawData.id)
+        returned = session.execute(stmt).all()
 
-            return item
+        # A changed practice keeps its cleaned_data row, which is replaced
+        cleaned = []
+        for key, raw_data_id in returned:
+            if key in cleaned_rows:
+                cleaned_rows[key]['raw_data_id'] = raw_data_id
+                cleaned.append(cleaned_rows[key])
+        upsert_cleaned(session, cleaned)
 
-        except SQLAlchemyError as e:
-            self.logger.error(f"Database error: {str(e)}")
-            session.rollback()
-            return item
-            
-        except Exception as e:
-            self.logger.error(f"Error processing item: {str(e)}")
-            self.logger.error(f"Failed item: {json.dumps(item, indent=2, ensure_ascii=False)}")
-            session.rollback()
-            return item
-            
-        finally:
-            session.close()
+        self.logger.debug(f"{len(returned)} new or changed practices, {len(unchanged)} unchanged")
+        self.items_count += len(entries)
+        if self.items_count // 100 > (self.items_count - len(entries)) // 100:
+            self.logger.info(f"Processed {self.items_count} items")
+        return rows + len(returned) + len(cleaned)
+
+    def touch_entries(self, session, unchanged, now):
+        """Record that stored, unchanged entries were seen again in this run"""
+        by_run = {}
+        for entry_hash, item in unchanged.items():
+            by_run.setdefault(item['run_id'], []).append(entry_hash)
+        rows = 0
+        for run_id, hashes in by_run.items():
+            rows += session.execute(
+                update(RawData).where(RawData.hash.in_(hashes)).values(
+                    last_seen_run_id=run_id,
+                    last_seen_at=now
+                ).execution_options(synchronize_session=False)
+            ).rowcount
+        return rows
+
+    def touch_seen(self, session, seen, now):
+        """Record that the practices of skipped listing pages were seen again"""
+        rows = 0
+        for (source_id, run_id), keys in seen.items():
+            if not keys:
+                continue
+            rows += session.execute(
+                update(RawData).where(
+                    RawData.source_id == source_id,
+                    RawData.identity_key.in_(sorted(keys))
+                ).values(
+                    last_seen_run_id=run_id,
+                    last_seen_at=now
+                ).execution_options(synchronize_session=False)
+            ).rowcount
+        return rows
+
+    def write_details(self, session, details):
+        """Merge detail page fields into the latest raw_data row of each practice"""
+        if not details:
+            return 0
+        # A later detail for the same practice wins
+        patches = {
+            (item['source_id'], item['url']): {
+                'source_id': item['source_id'],
+                'url': item['url'],
+                'patch': {'detail': item['detail'], 'detail_fetched_at': item['detail_fetched_at']}
+            }
+            for item in details
+        }
+        merged = {
+            url for url, in
+            session.execute(MERGE_DETAILS, {'details': json.dumps(list(patches.values()))})
+        }
+        for source_id, url in patches:
+            if url not in merged:
+                self.logger.warning(f"No raw data to merge detail into for URL: {url}")
+        return len(merged)
+
+    def record_flush(self, rows, seconds):
+        """Track flush latency and write throughput"""
+        self.flushes += 1
+        self.rows_written += rows
+        self.flush_seconds += seconds
+        self.logger.debug(f"Flushed {rows} rows in {seconds * 1000:.1f} ms")
+        if self.stats:
+            self.stats.inc_value('db/flushes')
+            self.stats.inc_value('db/rows_written', rows)
+            self.stats.max_value('db/flush_seconds_max', seconds)
+
+    def write_stats(self):
+        """Summary of the batched writer's performance"""
+        return {
+            'flushes': self.flushes,
+            'rows_written': self.rows_written,
+            'avg_flush_ms': self.flush_seconds / self.flushes * 1000 if self.flushes else 0.0,
+            'rows_per_sec': self.rows_written / self.flush_seconds if self.flush_seconds else 0.0
+        }
 
     def handle_error(self, failure):
         """Handle pipeline errors"""
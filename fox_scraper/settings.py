@@ -9,9 +9,24 @@ ITEM_PIPELINES = {
     'fox_scraper.pipelines.db_pipeline.DatabasePipeline': 300,
 }
 
+# DatabasePipeline buffers items and writes them in one transaction once
+# DB_BATCH_SIZE items are waiting or DB_FLUSH_INTERVAL seconds have passed
+DB_BATCH_SIZE = 500
+DB_FLUSH_INTERVAL = 5.0
+# Batches are written by a background thread; with this many batches queued,
+# items wait for the writer, which slows the crawl instead of the reactor
+DB_WRITER_THREAD = True
+DB_WRITE_QUEUE_BATCHES = 4
+# Clean entries into cleaned_data while crawling; with False raw rows stay
+# 'pending' for tools/clean_worker.py
+CLEAN_INLINE = True
+# Copy the stored version of a changed practice into the monthly partitions
+# of raw_data_history before it is overwritten
+RAW_HISTORY = True
+
 # Request settings
-CONCURRENT_REQUESTS = 1
-DOWNLOAD_DELAY = 2
+CONCURRENT_REQUESTS = 8
+DOWNLOAD_DELAY = 0  # Pacing is done by AdaptiveRateLimitMiddleware
 COOKIES_ENABLED = False
 DOWNLOAD_TIMEOUT = 60
 
@@ -20,6 +35,53 @@ RETRY_ENABLED = True
 RETRY_TIMES = 5
 RETRY_HTTP_CODES = [500, 502, 503, 504, 400, 403, 408, 429]
 
+# Checkpoint journals for resuming runs (-a resume_run=<id|latest>)
+CHECKPOINT_DIR = 'checkpoints'
+
+# Send If-None-Match/If-Modified-Since and skip listing pages whose
+# fingerprint matches the last successful run
+CONDITIONAL_REQUESTS = True
+
+# Downloader middlewares
+DOWNLOADER_MIDDLEWARES = {
+    'fox_scraper.middlewares.middlewares.AdaptiveRateLimitMiddleware': 560,
+    'fox_scraper.middlewares.middlewares.ResponseArchiveMiddleware': 580,
+}
+
+# Adaptive per-host rate limit (requests/sec). Starts at the old 2s delay,
+# ramps up on fast 200s, halves on 403/429/503 and honours Retry-After.
+RATE_LIMIT_ENABLED = True
+RATE_LIMIT_START = 0.5
+RATE_LIMIT_MIN = 0.05
+RATE_LIMIT_MAX = 4.0
+RATE_LIMIT_BURST = 1
+RATE_LIMIT_INCREASE = 0.05
+RATE_LIMIT_DECREASE = 0.5
+RATE_LIMIT_FAST_LATENCY = 1.0
+RATE_LIMIT_BACKOFF_CODES = [403, 429, 503]
+
+# Compressed on-disk archive of fetched responses (replay with -a replay=<dir>)
+ARCHIVE_ENABLED = True
+ARCHIVE_DIR = 'archive'
+ARCHIVE_SEGMENT_SIZE = 64 * 1024 * 1024
+
+# Detail page stage (-a details=1): own concurrency cap, and practices whose
+# detail page was fetched within the freshness window are not revisited
+DETAIL_CONCURRENCY = 2
+DETAIL_FRESHNESS_DAYS = 30
+
+# Shared crawl frontier (-a frontier=shared, -a join_run=<id|latest>)
+FRONTIER_LEASE_SECONDS = 300
+FRONTIER_MAX_ATTEMPTS = 5
+
+# Run stats and errors (run_errors table) are flushed on this interval
+# instead of after every page
+RUN_STATS_INTERVAL = 30
+
+# Requests that exhaust their retries go to dead_letters; re-drive them
+# into their original run with -a redrive_run=<id>
+REDRIVE_CONCURRENCY = 2
+
 # Obey robots.txt rules
 ROBOTSTXT_OBEY = True
 
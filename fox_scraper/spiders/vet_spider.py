@@ -1,17 +1,54 @@
 # fox_scraper/spiders/vet_spider.py
 import scrapy
-from datetime import datetime
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from twisted.internet import defer, task, threads
+from collections import deque
+from datetime import datetime, timedelta
 import logging
-from ..core.database import DatabaseManager, DataSource, ScrapingRun
+import re
+import threading
+from ..core.database import DatabaseManager, DataSource, ScrapingRun, RawData
+from ..core.config import pool_stats
+from ..core.checkpoint import CheckpointJournal
+from ..core.validators import PageValidatorStore, page_digest
+from ..core.identity import identity_key
+from ..core.archive import ResponseArchive
+from ..core.extractor import HitExtractor
+from ..core.frontier import SharedFrontier
+from ..core.deadletters import DeadLetterQueue
+from ..core.runstats import RunErrorLog
 
 class VetSpider(scrapy.Spider):
     name = 'vet_spider'
     allowed_domains = ['dasoertliche.de']
     start_urls = ['https://www.dasoertliche.de/Themen/Tierarzt.html']
+    page_url_template = 'https://www.dasoertliche.de/Themen/Tierarzt-Seite-{page}.html'
+    page_link_pattern = re.compile(r'Seite-(\d+)\.html')
+
+    # Listing pages always win over detail pages in the scheduler
+    listing_priority = 10
+    detail_priority = 0
+
+    # Detail page selectors, tried in order
+    detail_selectors = {
+        'website': [
+            'a.hitlnk_url::attr(href)',
+            'a[title*="Homepage"]::attr(href)',
+            'a[title*="Webseite"]::attr(href)',
+        ],
+        'email': [
+            'a[href^="mailto:"]::attr(href)',
+        ],
+    }
+    detail_hours_rows = 'table.opening_hours tr, div.opening_hours tr, div.hours li'
     
     custom_settings = {
-        'CONCURRENT_REQUESTS': 1,
-        'DOWNLOAD_DELAY': 2,
+        # Sequential pagination only ever has one request in flight; the
+        # window mode relies on this to run several pages concurrently.
+        'CONCURRENT_REQUESTS': 8,
+        # Requests are paced per host by AdaptiveRateLimitMiddleware
+        'DOWNLOAD_DELAY': 0,
         'COOKIES_ENABLED': False,
         'DOWNLOAD_TIMEOUT': 60,
         'RETRY_TIMES': 5,
@@ -19,14 +56,103 @@ class VetSpider(scrapy.Spider):
         'USER_AGENT': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
     }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, pagination='sequential', window=4, resume_run=None, replay=None,
+                 details='0', frontier='local', join_run=None, redrive_run=None, *args, **kwargs):
         super(VetSpider, self).__init__(*args, **kwargs)
         self.items_processed = 0
-        self.current_page = 1
         self.db = DatabaseManager()
+        self.extractor = HitExtractor()
+
+        # Pagination: 'sequential' follows page n+1 after page n has parsed,
+        # 'window' keeps up to `window` listing pages in flight at once.
+        if pagination not in ('sequential', 'window'):
+            raise ValueError(f"Unknown pagination mode: {pagination}")
+        self.pagination = pagination
+        self.window = max(1, int(window))
+        self.last_page = None  # Highest page seen in pagination links so far
+        self.end_seen = False  # Set once an empty page fixes last_page
+        self.next_page = 2
+        self.pages_in_flight = set()
         self.source_id = None
         self.run_id = None
 
+        # Checkpointing: `resume_run` is a ScrapingRun id or 'latest'
+        self.resume_run = resume_run
+        self.journal = None
+
+        # Conditional GETs and page fingerprints for unchanged listing pages
+        self.conditional = False
+        self.validators = PageValidatorStore()
+        self.pages_parsed = 0
+        self.pages_unchanged = 0
+
+        # Replay: feed archived responses from this directory through parse
+        self.replay = replay
+
+        # Detail stage: visit each practice's page alongside the listing crawl
+        self.details = str(details).lower() in ('1', 'true', 'yes') and not replay
+        self.detail_concurrency = 2
+        self.detail_queue = deque()
+        self.details_in_flight = 0
+        self.details_seen = set()  # Listing URLs queued this run or still fresh
+        self.details_fetched = 0
+        self.details_skipped = 0
+
+        # Frontier: 'local' keeps the queue in this process, 'shared' claims
+        # work from crawl_frontier so several workers can split one run.
+        # `join_run` (a run id or 'latest') joins a run another worker started.
+        if frontier not in ('local', 'shared'):
+            raise ValueError(f"Unknown frontier mode: {frontier}")
+        self.join_run = join_run
+        self.shared = None
+        self.use_shared_frontier = frontier == 'shared' or join_run is not None
+        self.shared_details = []
+        self.pages_published = 1
+        self.items_reported = 0
+        self.last_lease_renewal = datetime.utcnow()
+        self.frontier_remaining = None  # Counted by the claims of an idle worker
+
+        # Frontier and dead letter writes run on the reactor's thread pool,
+        # one at a time and in the order the crawl made them
+        self.db_tasks = defer.DeferredLock()
+
+        # Set by AdaptiveRateLimitMiddleware when it is enabled
+        self.rate_limiter = None
+
+        # Counters live on the spider and errors in `error_log`; both are
+        # written every RUN_STATS_INTERVAL seconds from the reactor's thread
+        # pool. The lock keeps those writes from overlapping closed().
+        self.error_log = RunErrorLog()
+        self.stats_loop = None
+        self.stats_lock = threading.Lock()
+        self.stats_write = None
+        self.stats_dirty = False
+
+        # Dead letters: requests that failed after all retries. `redrive_run`
+        # re-crawls only the dead letters of that run and attaches the
+        # results to it.
+        self.dead_letters = None
+        self.redrive_run = redrive_run
+        self.redrive_concurrency = 2
+        self.redrive_queue = deque()
+        self.redrive_in_flight = 0
+        self.redrive_resolved = 0
+        self.redrive_status = None  # The run's status before the re-drive
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(VetSpider, cls).from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.spider_idle, signal=signals.spider_idle)
+        crawler.signals.connect(spider.spider_opened, signal=signals.spider_opened)
+        return spider
+
+    def spider_opened(self, spider):
+        """Start the periodic run stats and error log flush"""
+        interval = self.settings.getfloat('RUN_STATS_INTERVAL', 30)
+        if interval > 0:
+            self.stats_loop = task.LoopingCall(self.update_run_stats)
+            self.stats_loop.start(interval, now=False)
+
     def start_requests(self):
         """Initialize scraping run and start requests"""
         session = self.db.get_session()
@@ -46,127 +172,756 @@ class VetSpider(scrapy.Spider):
             
             self.source_id = source.id
 
-            # Create new scraping run
+            if self.replay:
+                run = ScrapingRun(
+                    source_id=self.source_id,
+                    status='running',
+                    config_snapshot={**self.custom_settings, 'replay': self.replay}
+                )
+                session.add(run)
+                session.commit()
+                self.run_id = run.id
+                self.logger.info(f"Replaying archive {self.replay} into run {self.run_id}")
+                yield from self.replay_requests()
+                return
+
+            if self.redrive_run:
+                self.start_redrive(session)
+                yield from self.redrive_requests()
+                return
+
+            if self.use_shared_frontier:
+                self.start_shared(session)
+            else:
+                run = self.find_resumable_run(session) if self.resume_run else None
+                if run:
+                    run.status = 'running'
+                    session.commit()
+                    self.run_id = run.id
+                    self.logger.info(f"Resuming scraping run {self.run_id}")
+                else:
+                    # Create new scraping run
+                    run = ScrapingRun(
+                        source_id=self.source_id,
+                        status='running',
+                        config_snapshot=self.custom_settings
+                    )
+                    session.add(run)
+                    session.commit()
+                    self.run_id = run.id
+
+            self.dead_letters = DeadLetterQueue(self.run_id, self.source_id)
+
+            if self.settings.getbool('CONDITIONAL_REQUESTS', True):
+                self.conditional = True
+                known = self.validators.load(session, self.source_id)
+                self.logger.info(f"Loaded validators for {known} listing pages")
+
+            if self.details:
+                self.detail_concurrency = self.settings.getint('DETAIL_CONCURRENCY', 2)
+                fresh_days = self.settings.getint('DETAIL_FRESHNESS_DAYS', 30)
+                self.details_seen = self.load_fresh_details(session, fresh_days)
+                self.logger.info(
+                    f"Detail stage on: {len(self.details_seen)} practices fetched in the "
+                    f"last {fresh_days} days, {self.detail_concurrency} detail requests in flight"
+                )
+
+            if self.shared:
+                # The shared frontier is the durable queue; no local journal
+                self.shared.add(session, [self.frontier_page(1)])
+                yield from self.claimed_requests(self.claim_entries(session, [], *self.free_slots()))
+                return
+
+            checkpoint_dir = self.settings.get('CHECKPOINT_DIR', 'checkpoints')
+            self.journal = CheckpointJournal.load(checkpoint_dir, self.run_id)
+
+            # Start scraping, or continue from the journal's frontier
+            if self.journal.completed_pages or self.journal.pending:
+                yield from self.resume_requests()
+            else:
+                yield self.page_request(1)
+
+        except Exception as e:
+            self.logger.error(f"Error initializing spider: {str(e)}")
+            raise e
+        finally:
+            session.close()
+
+    def load_fresh_details(self, session, fresh_days):
+        """Listing URLs whose detail page was fetched within the freshness window"""
+        cutoff = (datetime.utcnow() - timedelta(days=fresh_days)).isoformat()
+        rows = session.query(RawData.url).filter(
+            RawData.source_id == self.source_id,
+            RawData.raw_content['detail_fetched_at'].astext >= cutoff
+        ).distinct().all()
+        return {url for url, in rows}
+
+    def find_resumable_run(self, session, run_ref=None):
+        """Look up the run named by `resume_run`, or the latest unfinished one"""
+        run_ref = run_ref or self.resume_run
+        query = session.query(ScrapingRun).filter_by(source_id=self.source_id)
+        if run_ref == 'latest':
+            run = query.filter(
+                ScrapingRun.status.in_(['running', 'interrupted'])
+            ).order_by(ScrapingRun.start_time.desc()).first()
+        else:
+            run = query.filter_by(id=int(run_ref)).first()
+
+        if not run:
+            self.logger.warning(f"No run to resume for '{run_ref}', starting a new one")
+        return run
+
+    def start_shared(self, session):
+        """Start or join a run whose requests live in the shared frontier"""
+        run = self.find_resumable_run(session, self.join_run) if self.join_run else None
+        if run:
+            run.status = 'running'
+            session.commit()
+        else:
             run = ScrapingRun(
                 source_id=self.source_id,
                 status='running',
-                config_snapshot=self.custom_settings
+                config_snapshot={**self.custom_settings, 'frontier': 'shared'}
             )
             session.add(run)
             session.commit()
-            self.run_id = run.id
-
-            # Start scraping
-            for url in self.start_urls:
-                yield scrapy.Request(
-                    url=url,
-                    callback=self.parse,
-                    errback=self.errback_httpbin,
-                    dont_filter=True,
-                    meta={'page': 1}
-                )
+        self.run_id = run.id
 
-        except Exception as e:
-            self.logger.error(f"Error initializing spider: {str(e)}")
-            raise e
+        self.shared = SharedFrontier(
+            self.run_id,
+            lease_seconds=self.settings.getint('FRONTIER_LEASE_SECONDS', 300),
+            max_attempts=self.settings.getint('FRONTIER_MAX_ATTEMPTS', 5)
+        )
+        self.logger.info(f"Worker {self.shared.worker_id} working on shared run {self.run_id}")
+
+    def start_redrive(self, session):
+        """Queue the unresolved dead letters of the run being re-driven"""
+        run = session.query(ScrapingRun).filter_by(
+            id=int(self.redrive_run), source_id=self.source_id
+        ).first()
+        if not run:
+            raise ValueError(f"No scraping run {self.redrive_run} to re-drive")
+        self.redrive_status = run.status
+        run.status = 'running'
+        session.commit()
+        self.run_id = run.id
+
+        self.dead_letters = DeadLetterQueue(self.run_id, self.source_id)
+        self.redrive_concurrency = self.settings.getint('REDRIVE_CONCURRENCY', 2)
+        for letter in self.dead_letters.pending(session):
+            self.redrive_queue.append({
+                'id': letter.id,
+                'url': letter.url,
+                'page': letter.page,
+                'callback': letter.callback,
+                'meta': letter.meta or {}
+            })
+        self.logger.info(
+            f"Re-driving {len(self.redrive_queue)} dead letters of run {self.run_id}, "
+            f"{self.redrive_concurrency} requests in flight"
+        )
+
+    def redrive_requests(self):
+        """Issue queued dead letters up to the re-drive concurrency cap"""
+        while self.redrive_queue and self.redrive_in_flight < self.redrive_concurrency:
+            letter = self.redrive_queue.popleft()
+            self.redrive_in_flight += 1
+            if letter['callback'] == 'parse_detail':
+                self.details_in_flight += 1
+                request = self.detail_request(letter['meta'].get('listing_url'), letter['url'])
+            else:
+                request = self.page_request(letter['page'])
+            request.meta['dead_letter_id'] = letter['id']
+            yield request
+
+    def db_task(self, work, *args):
+        """Queue work(session, *args) for a pool thread, behind the tasks queued before it
+
+        Returns a Deferred firing with the work's result.
+        """
+        return self.db_tasks.run(threads.deferToThread, self.in_session, work, *args)
+
+    def in_session(self, work, *args):
+        """Run work(session, *args) in a session of its own; runs in a pool thread"""
+        session = self.db.get_session()
+        try:
+            return work(session, *args)
         finally:
             session.close()
 
+    def redrive_finished(self, meta, resolved):
+        """Free a re-drive slot and resolve its dead letter if it succeeded"""
+        if 'dead_letter_id' not in meta:
+            return
+        self.redrive_in_flight -= 1
+        if not resolved:
+            return
+        letter_id = meta['dead_letter_id']
+        d = self.db_task(self.dead_letters.resolve, letter_id)
+        d.addCallback(self.dead_letter_resolved)
+        d.addErrback(lambda failure: self.logger.error(
+            f"Error resolving dead letter {letter_id}: {str(failure.value)}"
+        ))
+
+    def dead_letter_resolved(self, _):
+        self.redrive_resolved += 1
+
+    def record_dead_letter(self, failure, callback):
+        """Store a request that failed after all retries"""
+        if not self.dead_letters:
+            return
+        url = failure.request.url
+        d = self.db_task(self.dead_letters.record, failure.request, failure, callback)
+        d.addErrback(lambda error: self.logger.error(
+            f"Error recording dead letter {url}: {str(error.value)}"
+        ))
+
+    def frontier_page(self, page):
+        """Shared frontier entry for a listing page"""
+        return {'url': self.page_url(page), 'kind': 'listing', 'page': page, 'priority': self.listing_priority}
+
+    def claim_requests(self, count_remaining=False):
+        """Lease work from the shared frontier up to the local in-flight limits
+
+        The claim runs on a pool thread; claimed requests go to the engine
+        once it returns.
+        """
+        d = self.db_tasks.run(self.claim_in_thread, count_remaining)
+        d.addErrback(lambda failure: self.logger.error(
+            f"Error claiming frontier entries: {str(failure.value)}"
+        ))
+        return d
+
+    def claim_in_thread(self, count_remaining):
+        """Claim for the slots free once this task's turn comes"""
+        details, self.shared_details = self.shared_details, []
+        d = threads.deferToThread(
+            self.in_session, self.claim_entries, details, *self.free_slots(), count_remaining
+        )
+        d.addCallback(self.crawl_claimed)
+        return d
+
+    def free_slots(self):
+        """Listing and detail requests this worker can still take on"""
+        listing = self.window - len(self.pages_in_flight)
+        details = self.detail_concurrency - self.details_in_flight if self.details else 0
+        return listing, details
+
+    def claim_entries(self, session, details, listing_slots, detail_slots, count_remaining=False):
+        """Publish queued details, keep leases alive and claim new entries"""
+        if details:
+            self.shared.add(session, details)
+
+        # Keep leases alive for long-running pages held by this worker
+        if (datetime.utcnow() - self.last_lease_renewal).total_seconds() > self.shared.lease_seconds / 3:
+            self.shared.renew(session)
+            self.last_lease_renewal = datetime.utcnow()
+
+        listing = self.shared.claim(session, listing_slots, kind='listing')
+        claimed_details = self.shared.claim(session, detail_slots, kind='detail')
+        if count_remaining:
+            self.frontier_remaining = self.shared.remaining(session)
+        return listing, claimed_details
+
+    def claimed_requests(self, claimed):
+        """Requests for the listing and detail entries of a claim"""
+        listing, details = claimed
+        for entry in listing:
+            yield self.page_request(entry['page'])
+        for entry in details:
+            self.details_in_flight += 1
+            yield self.detail_request(entry['meta']['listing_url'], entry['url'])
+
+    def crawl_claimed(self, claimed):
+        for request in self.claimed_requests(claimed):
+            self.crawler.engine.crawl(request)
+
+    def share_pages(self, page, has_entries):
+        """Publish listing pages discovered from `page` to the shared frontier"""
+        if not has_entries:
+            return
+        d = self.db_tasks.run(self.publish_pages, page)
+        d.addErrback(lambda failure: self.logger.error(
+            f"Error publishing pages after page {page}: {str(failure.value)}"
+        ))
+
+    def publish_pages(self, page):
+        """Publish the pages not published yet once this task's turn comes"""
+        # Everything the pagination links reveal, plus the next page as a probe
+        last = max(self.last_page or 0, page + 1)
+        first = max(page + 1, self.pages_published + 1)
+        if first > last:
+            return None
+        d = threads.deferToThread(
+            self.in_session, self.shared.add, [self.frontier_page(n) for n in range(first, last + 1)]
+        )
+        d.addCallback(self.pages_shared, last)
+        return d
+
+    def pages_shared(self, _, last):
+        self.pages_published = max(self.pages_published, last)
+
+    def finish_shared(self, url, status='done'):
+        """Mark a shared frontier entry as handled by this worker"""
+        if not self.shared:
+            return
+        d = self.db_task(self.shared.finish, url, status)
+        d.addErrback(lambda failure: self.logger.error(
+            f"Error updating frontier for {url}: {str(failure.value)}"
+        ))
+
+    def spider_idle(self, spider):
+        """Keep a shared-frontier worker alive while other workers hold work
+
+        The worker waits while frontier tasks are queued, and closes once a
+        claim made while idle found nothing left in the run.
+        """
+        if not self.shared:
+            return
+        if self.db_tasks.locked:
+            raise DontCloseSpider
+        if self.frontier_remaining == 0:
+            return
+        if self.frontier_remaining:
+            self.logger.debug(
+                f"Idle worker waiting, {self.frontier_remaining} frontier entries left in run {self.run_id}"
+            )
+        self.claim_requests(count_remaining=True)
+        raise DontCloseSpider
+
+    def resume_requests(self):
+        """Re-issue the pending requests recorded in the checkpoint journal"""
+        self.last_page = self.journal.last_page
+        self.end_seen = self.journal.end_seen
+        self.next_page = self.journal.frontier_page() + 1
+        self.logger.info(
+            f"Checkpoint has {len(self.journal.completed_pages)} completed pages, "
+            f"{len(self.journal.pending)} pending requests"
+        )
+
+        pending_pages = sorted(
+            meta['page'] for meta in self.journal.pending.values() if meta.get('page')
+        )
+        for page in pending_pages:
+            yield self.page_request(page)
+
+        # Nothing left in flight: pick the chain up after the last completed page
+        if not pending_pages and not self.end_seen:
+            yield from self.next_page_requests(self.next_page - 1, True)
+
+    def replay_requests(self):
+        """Requests served from the response archive instead of the network"""
+        archive = ResponseArchive(self.replay)
+        for segment, offset, header, _ in archive.records():
+            page = header['meta'].get('page')
+            if header['status'] != 200 or not page:
+                continue
+            yield scrapy.Request(
+                url=header['url'],
+                callback=self.parse,
+                errback=self.errback_httpbin,
+                dont_filter=True,
+                meta={
+                    'page': page,
+                    'archive_record': (segment, offset),
+                    'archive_dir': self.replay,
+                    'dont_obey_robotstxt': True
+                }
+            )
+
+    def page_url(self, page):
+        """Build the listing URL for a page number"""
+        if page == 1:
+            return self.start_urls[0]
+        return self.page_url_template.format(page=page)
+
+    def page_request(self, page):
+        """Build the request for a listing page"""
+        self.pages_in_flight.add(page)
+        if self.journal:
+            self.journal.mark_pending(self.page_url(page), {'page': page})
+        url = self.page_url(page)
+        return scrapy.Request(
+            url=url,
+            callback=self.parse,
+            errback=self.errback_httpbin,
+            dont_filter=True,
+            priority=self.listing_priority,
+            headers=self.validators.headers_for(url) if self.conditional else None,
+            meta={'page': page, 'handle_httpstatus_list': [304]}
+        )
+
+    def detect_last_page(self, response):
+        """Read the highest page number linked from a listing page"""
+        pages = [
+            int(match.group(1))
+            for href in response.css('a::attr(href)').getall()
+            for match in [self.page_link_pattern.search(href)]
+            if match
+        ]
+        return max(pages) if pages else None
+
+    def learn_last_page(self, response):
+        """Raise the known page count from the pagination links of a response"""
+        if self.end_seen:
+            return
+        linked = self.detect_last_page(response)
+        if linked and (self.last_page is None or linked > self.last_page):
+            self.last_page = linked
+            self.logger.info(f"Listing has at least {self.last_page} pages")
+
+    def next_page_requests(self, page, has_entries):
+        """Schedule further listing pages after `page` has been handled"""
+        self.pages_in_flight.discard(page)
+
+        if self.replay:
+            # Every archived page is already queued
+            return
+
+        if not has_entries:
+            # An empty page marks the end of the listing
+            if not self.end_seen or page - 1 < self.last_page:
+                self.last_page = page - 1
+            self.end_seen = True
+            return
+
+        if self.pagination == 'sequential':
+            if page + 1 >= self.next_page:
+                self.next_page = page + 2
+                self.logger.info(f"Following next page: {self.page_url(page + 1)}")
+                yield self.page_request(page + 1)
+            return
+
+        # Window mode: top up the in-flight set without passing the known end.
+        # Until an empty page confirms the end, an idle window probes one page
+        # past last_page in case the pagination links undercounted.
+        while len(self.pages_in_flight) < self.window:
+            if self.last_page is not None and self.next_page > self.last_page:
+                if self.end_seen or self.pages_in_flight:
+                    break
+            self.logger.debug(f"Scheduling page {self.next_page} ({len(self.pages_in_flight) + 1}/{self.window} in flight)")
+            yield self.page_request(self.next_page)
+            self.next_page += 1
+
     def parse(self, response):
         """Parse each page of results"""
+        page = response.meta.get('page', 1)
+        url = self.page_url(page)
+        has_entries = False
+        parsed = False
         try:
-            entries = response.css('div.hit')
-            self.logger.info(f"Processing page {self.current_page} - found {len(entries)} entries")
-            
-            for entry in entries:
-                self.items_processed += 1
-                
-                # Extract address
-                address_texts = entry.xpath('.//address//text()').getall()
-                address_texts = [text.strip() for text in address_texts if text.strip()]
-                
-                street = address_texts[0] if address_texts else ''
-                city = address_texts[-1] if len(address_texts) > 1 else ''
-
-                item = {
-                    'source_id': self.source_id,
-                    'run_id': self.run_id,
-                    'url': entry.css('h2 a.hitlnk_name::attr(href)').get(),
-                    'raw_content': {
-                        'name': self.clean_text(entry.css('h2 a.hitlnk_name::text').get()),
-                        'subtitle': self.clean_text(entry.css('div.subline::text').get()),
-                        'category': self.clean_text(entry.css('div.category::text').get()),
-                        'address': {
-                            'street': street,
-                            'city': city
-                        },
-                        'phone': self.clean_text(entry.css('div.phoneblock span::text').get()),
-                        'opening_hours': self.clean_text(entry.css('div.hitlnk_times::text').get()),
-                        'page_number': self.current_page,
-                        'html': entry.get()
-                    }
-                }
-                
-                yield item
+            if response.status == 304:
+                # Server confirmed the page is unchanged since our validators
+                validator = self.validators.get(url) or {}
+                has_entries = bool(validator.get('entry_count'))
+                yield self.mark_unchanged(page, url)
+            else:
+                hits = self.extractor.hits(response)
+                has_entries = bool(hits)
+                self.logger.info(f"Processing page {page} - found {len(hits)} entries")
 
-            # Update run statistics
-            self.update_run_stats()
+                self.learn_last_page(response)
 
-            # Handle pagination
-            if entries:
-                next_page = self.current_page + 1
-                next_url = f'https://www.dasoertliche.de/Themen/Tierarzt-Seite-{next_page}.html'
-                
-                self.logger.info(f"Following next page: {next_url}")
-                self.current_page = next_page
-                
-                yield scrapy.Request(
-                    url=next_url,
-                    callback=self.parse,
-                    errback=self.errback_httpbin,
-                    dont_filter=True,
-                    meta={'page': next_page}
-                )
+                html = [self.extractor.html(hit) for hit in hits]
+                digest = page_digest(html)
+                if self.conditional and self.validators.is_unchanged(url, digest):
+                    yield self.mark_unchanged(page, url)
+                else:
+                    keys = []
+                    for item in self.parse_entries(hits, html, page):
+                        keys.append(identity_key(item['raw_content']))
+                        yield item
+                        if self.details and item['url']:
+                            self.queue_detail(item['url'], response.urljoin(item['url']))
+                    self.pages_parsed += 1
+                    self.validators.update(
+                        url,
+                        etag=self.header_text(response, 'ETag'),
+                        last_modified=self.header_text(response, 'Last-Modified'),
+                        digest=digest,
+                        entry_count=len(hits),
+                        identity_keys=keys
+                    )
+            parsed = True
 
         except Exception as e:
-            self.logger.error(f"Error parsing page: {str(e)}")
-            self.record_error(str(e))
+            self.logger.error(f"Error parsing page {page}: {str(e)}")
+            self.record_error(str(e), response.url)
 
-    def update_run_stats(self):
-        """Update scraping run statistics"""
-        session = self.db.get_session()
-        try:
-            run = session.query(ScrapingRun).get(self.run_id)
-            if run:
-                run.items_processed = self.items_processed
-                session.commit()
-        except Exception as e:
-            self.logger.error(f"Error updating run stats: {str(e)}")
-        finally:
-            session.close()
+        if self.redrive_run:
+            # Re-drives only revisit dead letters, pagination is not followed
+            self.pages_in_flight.discard(page)
+            self.redrive_finished(response.meta, parsed)
+            yield from self.redrive_requests()
+        elif self.shared:
+            # Publish what this page revealed, then lease more work
+            self.pages_in_flight.discard(page)
+            self.share_pages(page, has_entries)
+            self.finish_shared(url)
+            self.claim_requests()
+        else:
+            # Handle pagination, then top up detail requests
+            yield from self.next_page_requests(page, has_entries)
+            yield from self.detail_requests()
 
-    def record_error(self, error_message):
-        """Record error in scraping run"""
-        session = self.db.get_session()
+        if self.journal:
+            # Follows the page's items through the pipeline, which marks the
+            # page completed once they are committed
+            yield {'completed_page': page, 'url': url}
+            self.journal.last_page = self.last_page
+            self.journal.end_seen = self.end_seen
+            self.journal.flush()
+
+    def parse_entries(self, hits, html, page):
+        """Extract one item per `div.hit` entry"""
+        for hit, hit_html in zip(hits, html):
+            self.items_processed += 1
+            fields = self.extractor.extract(hit)
+            yield {
+                'source_id': self.source_id,
+                'run_id': self.run_id,
+                'url': fields.get('url'),
+                'raw_content': self.build_raw_content(fields, page, hit_html)
+            }
+
+    def build_raw_content(self, fields, page, html):
+        """Shape extracted fields into the stored raw_content dict"""
+        # Extract address
+        address_texts = [text.strip() for text in fields['address_texts'] if text.strip()]
+
+        street = address_texts[0] if address_texts else ''
+        city = address_texts[-1] if len(address_texts) > 1 else ''
+
+        return {
+            'name': self.clean_text(fields.get('name')),
+            'subtitle': self.clean_text(fields.get('subtitle')),
+            'category': self.clean_text(fields.get('category')),
+            'address': {
+                'street': street,
+                'city': city
+            },
+            'phone': self.clean_text(fields.get('phone')),
+            'opening_hours': self.clean_text(fields.get('opening_hours')),
+            'page_number': page,
+            'html': html
+        }
+
+    def queue_detail(self, listing_url, detail_url):
+        """Queue a practice's detail page unless it is fresh or already queued
+
+        This is the only dedupe of detail pages: their requests bypass the
+        dupefilter, whose silent drops would never free a detail slot.
+        """
+        if listing_url in self.details_seen or detail_url in self.details_seen:
+            self.details_skipped += 1
+            return
+        self.details_seen.update((listing_url, detail_url))
+        if self.shared:
+            self.shared_details.append({
+                'url': detail_url,
+                'kind': 'detail',
+                'meta': {'listing_url': listing_url},
+                'priority': self.detail_priority
+            })
+        else:
+            self.detail_queue.append((listing_url, detail_url))
+
+    def detail_requests(self):
+        """Issue queued detail requests up to the detail concurrency cap"""
+        if self.shared:
+            self.claim_requests()
+            return
+
+        while self.detail_queue and self.details_in_flight < self.detail_concurrency:
+            listing_url, detail_url = self.detail_queue.popleft()
+            self.details_in_flight += 1
+            yield self.detail_request(listing_url, detail_url)
+
+    def detail_request(self, listing_url, detail_url):
+        """Build the request for a practice's detail page"""
+        return scrapy.Request(
+            url=detail_url,
+            callback=self.parse_detail,
+            errback=self.errback_detail,
+            dont_filter=True,
+            priority=self.detail_priority,
+            meta={'listing_url': listing_url, 'detail_url': detail_url}
+        )
+
+    def parse_detail(self, response):
+        """Extract detail fields and merge them into the practice's raw_data row"""
+        self.details_in_flight -= 1
+        parsed = False
         try:
-            run = session.query(ScrapingRun).get(self.run_id)
-            if run:
-                if not run.errors:
-                    run.errors = []
-                run.errors.append({
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'error': error_message
-                })
-                session.commit()
+            detail = {}
+            for field, selectors in self.detail_selectors.items():
+                for selector in selectors:
+                    value = response.css(selector).get()
+                    if value:
+                        detail[field] = value.strip()
+                        break
+            if 'email' in detail:
+                detail['email'] = detail['email'].replace('mailto:', '', 1).split('?')[0]
+
+            hours = [
+                self.clean_text(' '.join(row.css('::text').getall()))
+                for row in response.css(self.detail_hours_rows)
+            ]
+            detail['opening_hours'] = [row for row in hours if row]
+
+            self.details_fetched += 1
+            yield {
+                'source_id': self.source_id,
+                'run_id': self.run_id,
+                'url': response.meta['listing_url'],
+                'detail': detail,
+                'detail_fetched_at': datetime.utcnow().isoformat()
+            }
+            parsed = True
         except Exception as e:
-            self.logger.error(f"Error recording error: {str(e)}")
-        finally:
-            session.close()
+            self.logger.error(f"Error parsing detail page {response.url}: {str(e)}")
+            self.record_error(str(e), response.url)
+
+        self.finish_shared(response.meta['detail_url'])
+        if self.redrive_run:
+            self.redrive_finished(response.meta, parsed)
+            yield from self.redrive_requests()
+        else:
+            yield from self.detail_requests()
+
+    def errback_detail(self, failure):
+        """Handle failed detail requests and free their slot"""
+        self.details_in_flight -= 1
+        self.logger.error(f"Detail request failed: {failure.value}")
+        self.record_error(str(failure.value), failure.request.url)
+        self.record_dead_letter(failure, 'parse_detail')
+        self.finish_shared(failure.request.meta['detail_url'], 'failed')
+        if self.redrive_run:
+            self.redrive_finished(failure.request.meta, False)
+            yield from self.redrive_requests()
+        else:
+            yield from self.detail_requests()
+
+    def mark_unchanged(self, page, url):
+        """Skip parsing for a page that has not changed
+
+        Returns the item through which the pipeline marks the page's
+        practices as seen in this run.
+        """
+        self.pages_unchanged += 1
+        self.logger.info(f"Page {page} unchanged since last successful run, skipping")
+        return {
+            'source_id': self.source_id,
+            'run_id': self.run_id,
+            'seen': self.validators.identity_keys(url)
+        }
+
+    def header_text(self, response, name):
+        """Decoded response header value, or None"""
+        value = response.headers.get(name)
+        return value.decode('latin-1') if value else None
+
+    def run_stats(self):
+        """Counters stored in ScrapingRun.stats"""
+        return {
+            'pages_parsed': self.pages_parsed,
+            'pages_unchanged': self.pages_unchanged,
+            'details_fetched': self.details_fetched,
+            'details_skipped': self.details_skipped,
+            'dead_letters_resolved': self.redrive_resolved,
+            'errors': self.error_log.count,
+            'rate_limit': self.rate_limiter.snapshot() if self.rate_limiter else {},
+            'db_pool': pool_stats()
+        }
+
+    def locked_run(self, session):
+        """Load this spider's run, locked against concurrent stat updates"""
+        return session.query(ScrapingRun).filter_by(id=self.run_id).with_for_update().first()
+
+    def write_run_stats(self, run):
+        """Add this process's progress to a run, which other workers may share"""
+        run.items_processed = (run.items_processed or 0) + self.items_processed - self.items_reported
+        if self.shared:
+            workers = dict((run.stats or {}).get('workers', {}))
+            workers[self.shared.worker_id] = self.run_stats()
+            run.stats = {**(run.stats or {}), 'workers': workers}
+        elif self.redrive_run:
+            # Keep the original crawl's stats, the re-drive gets its own entry
+            run.stats = {**(run.stats or {}), 'redrive': self.run_stats()}
+        else:
+            run.stats = self.run_stats()
+
+    def update_run_stats(self):
+        """Flush run statistics and errors without blocking the reactor"""
+        if self.run_id is None:
+            return
+        if self.stats_write is not None:
+            # A write is in flight; it is followed up once it finishes
+            self.stats_dirty = True
+            return
+        self.stats_dirty = False
+        self.stats_write = threads.deferToThread(self.save_run_stats)
+        self.stats_write.addBoth(self.run_stats_saved)
+
+    def run_stats_saved(self, _):
+        self.stats_write = None
+        if self.stats_dirty:
+            self.update_run_stats()
+
+    def save_run_stats(self):
+        """Write run statistics and buffered errors, runs in a pool thread"""
+        with self.stats_lock:
+            session = self.db.get_session()
+            errors = []
+            try:
+                run = self.locked_run(session)
+                if run:
+                    self.write_run_stats(run)
+                    errors = self.error_log.flush(session, self.run_id)
+                    session.commit()
+                    self.items_reported = self.items_processed
+            except Exception as e:
+                self.error_log.restore(errors)
+                self.logger.error(f"Error updating run stats: {str(e)}")
+            finally:
+                session.close()
+
+    def finish_redrive(self, session, run, reason):
+        """Complete a re-driven run once none of its dead letters is left
+
+        Otherwise the run gets back the status it had before the re-drive,
+        so an interrupted crawl stays resumable.
+        """
+        left = len(self.dead_letters.pending(session))
+        if not left and reason == 'finished' and self.redrive_status not in ('running', 'interrupted'):
+            run.status = 'completed'
+            run.end_time = datetime.utcnow()
+        else:
+            run.status = self.redrive_status
+        self.logger.info(f"Re-drive of run {self.run_id} done, {left} dead letters left, status {run.status}")
+
+    def record_error(self, error_message, url=None):
+        """Buffer an error for the run's append-only run_errors log"""
+        self.error_log.add(self.run_id, error_message, url)
 
     def errback_httpbin(self, failure):
         """Handle failed requests"""
         self.logger.error(f"Request failed: {failure.value}")
-        self.record_error(str(failure.value))
+        self.record_error(str(failure.value), failure.request.url)
+        self.record_dead_letter(failure, 'parse')
+
+        # Free the window slot of a failed listing page so the crawl keeps going
+        page = failure.request.meta.get('page')
+        if self.redrive_run:
+            self.pages_in_flight.discard(page)
+            self.redrive_finished(failure.request.meta, False)
+            yield from self.redrive_requests()
+        elif page is not None and self.shared:
+            self.pages_in_flight.discard(page)
+            self.finish_shared(self.page_url(page), 'failed')
+            self.claim_requests()
+        elif page is not None and self.pagination == 'window':
+            yield from self.next_page_requests(page, True)
 
     def clean_text(self, text):
         """Clean and normalize text data"""
@@ -175,15 +930,43 @@ class VetSpider(scrapy.Spider):
         return ' '.join(text.strip().split())
 
     def closed(self, reason):
-        """Update run status when spider closes"""
+        """Update run status once the queued frontier and dead letter writes are done"""
+        if self.stats_loop and self.stats_loop.running:
+            self.stats_loop.stop()
+        return self.db_tasks.run(threads.deferToThread, self.close_run, reason)
+
+    def close_run(self, reason):
+        """Save validators, release leases and finish the run; runs in a pool thread"""
         session = self.db.get_session()
         try:
-            run = session.query(ScrapingRun).get(self.run_id)
-            if run:
-                run.status = 'completed'
-                run.end_time = datetime.utcnow()
-                run.items_processed = self.items_processed
-                session.commit()
+            if self.journal:
+                self.journal.flush()
+
+            if not self.replay:
+                saved = self.validators.save(session, self.source_id, self.run_id)
+                self.logger.info(f"Saved validators for {saved} listing pages")
+
+            remaining = 0
+            if self.shared:
+                self.shared.release(session)
+                remaining = self.shared.remaining(session)
+
+            with self.stats_lock:
+                run = self.locked_run(session)
+                if run:
+                    self.write_run_stats(run)
+                    if remaining:
+                        # Other workers still have frontier entries to crawl
+                        self.logger.info(f"Leaving shared run {self.run_id} with {remaining} entries left")
+                    elif self.redrive_run:
+                        self.finish_redrive(session, run, reason)
+                    else:
+                        # Anything but a clean finish can be picked up with resume_run
+                        run.status = 'completed' if reason == 'finished' else 'interrupted'
+                        run.end_time = datetime.utcnow()
+                    self.error_log.flush(session, self.run_id)
+                    session.commit()
+                    self.items_reported = self.items_processed
         except Exception as e:
             self.logger.error(f"Error closing run: {str(e)}")
         finally:
@@ -0,0 +1,80 @@
+# fox_scraper/maintenance/backfill_identity_keys.py
+import argparse
+from sqlalchemy import text
+from fox_scraper.core.database import DatabaseManager
+from fox_scraper.core.identity import identity_key, content_hash
+
+
+def backfill_identity_keys(batch_size=1000):
+    """Give existing raw_data rows identity keys and stable content hashes
+
+    Rows are visited newest first, so the latest row of each practice gets
+    the key and becomes the one the pipeline upserts into. Older copies
+    keep a NULL key and remain as history.
+    """
+    db = DatabaseManager()
+    db.create_tables()
+    session = db.get_session()
+    claimed = set()  # (source_id, identity_key) already given to a newer row
+
+    try:
+        for source_id, key in session.execute(text(
+            "SELECT source_id, identity_key FROM raw_data WHERE identity_key IS NOT NULL"
+        )):
+            claimed.add((source_id, key))
+
+        last_id = None
+        keyed = 0
+        while True:
+            rows = session.execute(text("""
+                SELECT id, source_id, run_id, scraped_at, raw_content - 'html' - 'html_ref' AS content
+                FROM raw_data
+                WHERE identity_key IS NULL
+                  AND raw_content ? 'name'
+                  AND (CAST(:last_id AS INTEGER) IS NULL OR id < :last_id)
+                ORDER BY id DESC
+                LIMIT :batch_size
+            """), {'last_id': last_id, 'batch_size': batch_size}).fetchall()
+            if not rows:
+                break
+
+            updates = []
+            for row_id, source_id, run_id, scraped_at, content in rows:
+                key = identity_key(content)
+                if (source_id, key) in claimed:
+                    continue
+                claimed.add((source_id, key))
+                updates.append({
+                    'id': row_id,
+                    'key': key,
+                    'hash': content_hash(content),
+                    'run_id': run_id,
+                    'seen_at': scraped_at
+                })
+
+            if updates:
+                session.execute(text("""
+                    UPDATE raw_data
+                    SET identity_key = :key, hash = :hash,
+                        last_seen_run_id = :run_id, last_seen_at = :seen_at
+                    WHERE id = :id
+                """), updates)
+            session.commit()
+            keyed += len(updates)
+            last_id = rows[-1][0]
+            print(f"Keyed {keyed} practices (down to id {last_id})")
+
+        print(f"\nFinished: {keyed} raw_data rows now carry an identity key")
+
+    except Exception as e:
+        session.rollback()
+        print(f"Error backfilling identity keys: {str(e)}")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Backfill raw_data identity keys and content hashes')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+    backfill_identity_keys(args.batch_size)
@@ -0,0 +1,153 @@
+# fox_scraper/maintenance/explain_queries.py
+import argparse
+import json
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from fox_scraper.core.database import DatabaseManager
+from fox_scraper.core.cleaning import CLAIM_SQL as CLEANING_CLAIM_SQL
+from fox_scraper.core.frontier import CLAIM_SQL as FRONTIER_CLAIM_SQL
+from fox_scraper.pipelines.db_pipeline import MERGE_DETAILS
+
+SCAN = re.compile(r'(Seq Scan|Index Scan|Index Only Scan|Bitmap Index Scan)(?: Backward)?(?: using (\w+))? on (\w+)')
+
+
+def queries():
+    """(label, SQL, indexes the plan should use) of the pipeline's, workers' and viewer's queries
+
+    Any one of the listed indexes counts; an empty tuple means a sequential
+    scan is expected, e.g. for whole-source reads.
+    """
+    return [
+        ('cleaning claim', CLEANING_CLAIM_SQL.text, ('ix_raw_data_pending',)),
+        ('frontier claim', FRONTIER_CLAIM_SQL.text, ('idx_crawl_frontier_claim',)),
+        ('detail merge', MERGE_DETAILS.text, ('ix_raw_data_source_url',)),
+        # VetSpider.load_fresh_details, as the ORM renders it
+        ('fresh details', """
+            SELECT DISTINCT url FROM raw_data
+            WHERE source_id = :source_id AND (raw_content ->> 'detail_fetched_at') >= :cutoff
+        """, ('ix_raw_data_detail_fetched',)),
+        ('touch unchanged', """
+            UPDATE raw_data SET last_seen_run_id = :run_id, last_seen_at = now()
+            WHERE hash IN (SELECT hash FROM raw_data WHERE source_id = :source_id LIMIT 100)
+        """, ('raw_data_hash_key',)),
+        ('hash preload', "SELECT hash FROM raw_data WHERE source_id = :source_id AND hash IS NOT NULL", ()),
+        ('resumable run', """
+            SELECT * FROM scraping_runs
+            WHERE source_id = :source_id AND status IN ('running', 'interrupted')
+            ORDER BY start_time DESC LIMIT 1
+        """, ('ix_scraping_runs_source_start',)),
+        ('compaction', """
+            SELECT id FROM raw_data WHERE identity_key IS NULL AND scraped_at < :cutoff
+            ORDER BY id LIMIT 5000
+        """, ('ix_raw_data_superseded', 'raw_data_pkey')),
+        ('viewer: raw data page', """
+            SELECT rd.id, rd.url, rd.scraped_at, rd.last_seen_at, rd.processing_status,
+                   rd.raw_content ->> 'name' AS name
+            FROM raw_data rd
+            WHERE rd.source_id = (SELECT id FROM data_sources WHERE name = :source)
+              AND rd.id < :before_id AND rd.processing_status = 'failed'
+            ORDER BY rd.id DESC LIMIT 51
+        """, ('ix_raw_data_source_status_id',)),
+        ('viewer: cleaned data page', """
+            SELECT cd.id, cd.name, cd.category, cd.address ->> 'postcode' AS postcode, cd.validation_status
+            FROM cleaned_data cd
+            WHERE cd.source_id = (SELECT id FROM data_sources WHERE name = :source)
+              AND cd.id < :before_id AND cd.validation_status = 'valid'
+            ORDER BY cd.id DESC LIMIT 51
+        """, ('ix_cleaned_data_source_validation_id',)),
+        ('viewer: recent master records page', """
+            SELECT id, external_id, name, updated_at FROM master_records
+            WHERE (updated_at, id) < (now(), :before_id)
+            ORDER BY updated_at DESC, id DESC LIMIT 51
+        """, ('ix_master_records_updated_id',)),
+        ('viewer: recent runs', """
+            SELECT sr.id, ds.name, sr.start_time, sr.status FROM scraping_runs sr
+            JOIN data_sources ds ON sr.source_id = ds.id ORDER BY sr.start_time DESC LIMIT 10
+        """, ()),
+    ]
+
+
+def sample_params(session):
+    """Bind values taken from the data, so plans reflect real selectivity"""
+    source_id, source = session.execute(text(
+        "SELECT id, name FROM data_sources ORDER BY id LIMIT 1"
+    )).first() or (0, '')
+    run_id = session.execute(text(
+        "SELECT COALESCE(MAX(id), 0) FROM scraping_runs WHERE source_id = :source_id"
+    ), {'source_id': source_id}).scalar()
+    url = session.execute(text(
+        "SELECT url FROM raw_data WHERE source_id = :source_id ORDER BY id DESC LIMIT 1"
+    ), {'source_id': source_id}).scalar()
+    now = datetime.utcnow()
+    return {
+        'source_id': source_id,
+        'source': source,
+        'run_id': run_id,
+        'kind': 'listing',
+        'worker': 'explain',
+        'now': now,
+        'expires': now + timedelta(minutes=5),
+        'max_attempts': 3,
+        'limit': 500,
+        'after_id': 0,
+        'before_id': 2 ** 31 - 1,
+        'cutoff': (now - timedelta(days=30)).isoformat(),
+        'details': json.dumps([{'source_id': source_id, 'url': url, 'patch': {}}]),
+    }
+
+
+def explain(session, sql, params, analyze=True):
+    """Plan lines of a statement; ANALYZE runs it, so callers roll back"""
+    options = 'ANALYZE, BUFFERS' if analyze else 'COSTS'
+    statement = text(f"EXPLAIN ({options}) {sql}")
+    used = {name: value for name, value in params.items() if f':{name}' in sql}
+    return [row[0] for row in session.execute(statement, used)]
+
+
+def scans(plan):
+    """(scan type, index, table) of each scan node in a plan"""
+    return [match.groups() for line in plan for match in [SCAN.search(line)] if match]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN the pipeline's and viewer's queries against this database")
+    parser.add_argument('--no-analyze', action='store_true',
+                        help='Only plan the queries instead of running them')
+    parser.add_argument('--only', default=None, help='Run the queries whose label contains this text')
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    db.create_tables()
+    session = db.get_session()
+    mismatches = 0
+    try:
+        session.execute(text("ANALYZE"))
+        session.commit()
+        params = sample_params(session)
+        for label, sql, expected in queries():
+            if args.only and args.only not in label:
+                continue
+            try:
+                plan = explain(session, sql, params, analyze=not args.no_analyze)
+            finally:
+                # EXPLAIN ANALYZE executes claims and updates; never keep them
+                session.rollback()
+            used = [index for _, index, _ in scans(plan) if index]
+            verdict = ''
+            if expected:
+                found = any(index in used for index in expected)
+                verdict = 'ok' if found else f"MISSING {' or '.join(expected)}"
+                mismatches += not found
+            print(f"== {label} {('[' + verdict + ']') if verdict else ''}")
+            print('\n'.join(f"   {line}" for line in plan))
+            print()
+    finally:
+        session.close()
+
+    print(f"{mismatches} queries did not use their expected index"
+          + (" (small tables are often scanned sequentially; re-check with real data)" if mismatches else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+# fox_scraper/maintenance/migrate.py
+import argparse
+import logging
+from fox_scraper.core.config import get_engine
+from fox_scraper.core.migrations import migrate, available_migrations, applied_versions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply pending schema migrations')
+    parser.add_argument('--status', action='store_true', help='List migrations and whether they are applied')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    engine = get_engine()
+    if args.status:
+        with engine.connect() as connection:
+            done = applied_versions(connection)
+        for version, module in available_migrations():
+            print(f"{'applied' if version in done else 'pending':>8}  {version}")
+        return
+
+    applied = migrate(engine)
+    print(f"Applied {len(applied)} migrations{': ' + ', '.join(applied) if applied else ''}")
+
+
+if __name__ == "__main__":
+    main()
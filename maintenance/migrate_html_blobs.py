@@ -0,0 +1,72 @@
+# fox_scraper/maintenance/migrate_html_blobs.py
+import argparse
+from sqlalchemy import text
+from fox_scraper.core.database import DatabaseManager
+from fox_scraper.core.blobs import BlobStore
+
+# (table, JSONB column, key holding inline HTML)
+INLINE_HTML = [
+    ('raw_data', 'raw_content', 'html'),
+    ('cleaned_data', 'data_json', 'raw_html'),
+]
+
+
+def migrate_table(session, blobs, table, column, key, batch_size):
+    """Replace inline HTML in one table with content store references"""
+    last_id = 0
+    moved = 0
+    while True:
+        rows = session.execute(text(f"""
+            SELECT id, {column}->>:key AS html
+            FROM {table}
+            WHERE id > :last_id AND {column} ? :key
+            ORDER BY id
+            LIMIT :batch_size
+        """), {'key': key, 'last_id': last_id, 'batch_size': batch_size}).fetchall()
+        if not rows:
+            break
+
+        for row_id, html in rows:
+            ref = blobs.put(session, html) if html else None
+            session.execute(text(f"""
+                UPDATE {table}
+                SET {column} = ({column} - :key) || jsonb_build_object('html_ref', :ref)
+                WHERE id = :id
+            """), {'key': key, 'ref': ref, 'id': row_id})
+
+        session.commit()
+        blobs.committed()
+        moved += len(rows)
+        last_id = rows[-1][0]
+        print(f"{table}: moved HTML of {moved} rows (last id {last_id})")
+    return moved
+
+
+def migrate_html_blobs(batch_size=1000):
+    db = DatabaseManager()
+    db.create_tables()
+    session = db.get_session()
+    blobs = BlobStore()
+
+    try:
+        for table, column, key in INLINE_HTML:
+            moved = migrate_table(session, blobs, table, column, key, batch_size)
+            print(f"Finished {table}: {moved} rows now reference content_blobs")
+
+        count, stored = session.execute(text(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM content_blobs"
+        )).one()
+        print(f"\ncontent_blobs holds {count} unique snippets in {stored / 1024 / 1024:.1f} MB")
+
+    except Exception as e:
+        session.rollback()
+        print(f"Error migrating HTML: {str(e)}")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Move inline entry HTML into content_blobs')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+    migrate_html_blobs(args.batch_size)
@@ -0,0 +1,38 @@
+# fox_scraper/maintenance/refresh_rollups.py
+import argparse
+import logging
+from fox_scraper.core.database import DatabaseManager
+from fox_scraper.core.rollups import install_rollups, rebuild_rollups, refresh_rollups, rollup_totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fold pending rollup deltas into rollup_counts')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Reinstall the triggers and recount everything; blocks writers while it scans')
+    parser.add_argument('--batch-size', type=int, default=10000,
+                        help='Deltas folded per statement')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    db = DatabaseManager()
+    db.create_tables()
+    session = db.get_session()
+    try:
+        if args.rebuild:
+            install_rollups(session)
+            rebuild_rollups(session)
+        else:
+            refresh_rollups(session, batch_size=args.batch_size)
+        session.commit()
+        for table in ('raw_data', 'cleaned_data', 'master_records'):
+            counts = ', '.join(f"{row.status or '-'}: {row.records}" for row in rollup_totals(session, table, by=('status',)))
+            print(f"{table}: {counts or 'empty'}")
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
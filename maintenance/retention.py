@@ -0,0 +1,47 @@
+# fox_scraper/maintenance/retention.py
+import argparse
+import logging
+from fox_scraper.core.database import DatabaseManager
+from fox_scraper.core.partitions import ensure_history, compact_raw_data, apply_retention
+from fox_scraper.core.blobs import delete_orphan_blobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact raw_data and expire old raw_data_history partitions')
+    parser.add_argument('--keep-months', type=int, default=12,
+                        help='Months of raw_data_history to keep attached')
+    parser.add_argument('--compact-after-days', type=int, default=30,
+                        help='Age after which superseded and failed raw_data rows move into history')
+    parser.add_argument('--batch-size', type=int, default=5000,
+                        help='Rows moved per transaction while compacting')
+    parser.add_argument('--archive-schema', default=None,
+                        help='Move expired partitions into this schema instead of dropping them')
+    parser.add_argument('--blob-grace-days', type=int, default=7,
+                        help='Age after which content blobs no row refers to are deleted')
+    parser.add_argument('--skip-compaction', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    db = DatabaseManager()
+    db.create_tables()
+    session = db.get_session()
+    try:
+        ensure_history(session)
+        if not args.skip_compaction:
+            moved = compact_raw_data(session, older_than_days=args.compact_after_days, batch_size=args.batch_size)
+            print(f"Moved {moved} superseded raw_data rows into raw_data_history")
+        expired = apply_retention(session, keep_months=args.keep_months, archive_schema=args.archive_schema)
+        action = f"Archived into {args.archive_schema}" if args.archive_schema else "Dropped"
+        print(f"{action}: {', '.join(expired) if expired else 'no partitions'}")
+        if args.archive_schema:
+            # Archived partitions still refer to their blobs
+            print("Kept content blobs, archived partitions may refer to them")
+        else:
+            deleted = delete_orphan_blobs(session, older_than_days=args.blob_grace_days)
+            print(f"Deleted {deleted} content blobs no longer referenced")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,5 +10,10 @@ setup(
         'sqlalchemy',
         'psycopg2-binary',
         'python-dotenv',
+        'numpy',
+        'pandas>=2.0',
     ],
+    extras_require={
+        'parquet': ['pyarrow'],  # tools/export_data.py --format parquet
+    },
 )
\ No newline at end of file
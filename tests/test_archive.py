@@ -0,0 +1,31 @@
+# test_archive.py
+from fox_scraper.core.archive import ResponseArchive
+
+
+def test_archive_roundtrip(tmp_path):
+    archive = ResponseArchive(str(tmp_path))
+    first = archive.write('https://example.com/1', 200, {}, b'<html>1</html>', {'page': 1})
+    second = archive.write('https://example.com/2', 200, {}, b'<html>2</html>', {'page': 2})
+    archive.close()
+
+    records = list(ResponseArchive(str(tmp_path)).records())
+    assert [(r[0], r[1]) for r in records] == [first, second]
+    assert [r[2]['meta']['page'] for r in records] == [1, 2]
+
+    header, body = ResponseArchive(str(tmp_path)).read(*second)
+    assert header['url'] == 'https://example.com/2'
+    assert body == b'<html>2</html>'
+
+
+def test_archive_skips_truncated_tail(tmp_path):
+    archive = ResponseArchive(str(tmp_path))
+    archive.write('https://example.com/1', 200, {}, b'<html>1</html>')
+    segment, offset = archive.write('https://example.com/2', 200, {}, b'<html>2</html>' * 100)
+    archive.close()
+
+    # Simulate a crash in the middle of the last record
+    path = tmp_path / segment
+    path.write_bytes(path.read_bytes()[:offset + 20])
+
+    records = list(ResponseArchive(str(tmp_path)).records())
+    assert [r[2]['url'] for r in records] == ['https://example.com/1']
@@ -0,0 +1,14 @@
+# test_blobs.py
+from fox_scraper.core.blobs import compress, decompress, content_digest
+
+
+def test_blob_roundtrip():
+    html = '<div class="hit"><h2>Tierarztpraxis Müller</h2></div>' * 20
+    encoding, data = compress(html)
+    assert len(data) < len(html)
+    assert decompress(encoding, data) == html
+
+
+def test_identical_snippets_share_a_digest():
+    assert content_digest('<div>a</div>') == content_digest('<div>a</div>')
+    assert content_digest('<div>a</div>') != content_digest('<div>b</div>')
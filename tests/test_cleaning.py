@@ -0,0 +1,18 @@
+# test_cleaning.py
+from fox_scraper.core.cleaning import clean_batch
+
+
+def test_clean_batch_reports_rows_and_failures():
+    rows = [
+        (1, 7, {'name': 'Praxis A', 'address': {'street': 'Hauptstr. 1', 'city': '10115 Berlin'}, 'phone': '030 1'}),
+        (2, 7, None),
+    ]
+    results = clean_batch(rows)
+
+    raw_data_id, cleaned, error = results[0]
+    assert (raw_data_id, error) == (1, None)
+    assert cleaned['raw_data_id'] == 1 and cleaned['source_id'] == 7
+    assert cleaned['address'] == {'street': 'Hauptstraße', 'house_number': '1', 'postcode': '10115', 'city': 'Berlin'}
+
+    raw_data_id, cleaned, error = results[1]
+    assert raw_data_id == 2 and cleaned is None and error
@@ -0,0 +1,19 @@
+# test_config.py
+from sqlalchemy import text
+from fox_scraper.core.config import get_engine, get_session_factory, pool_stats
+
+
+def test_engine_is_shared_and_pool_is_measured(tmp_path):
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = get_engine(url)
+    assert get_engine(url) is engine
+    assert get_session_factory(url).kw['bind'] is engine
+
+    for _ in range(3):
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+
+    stats = pool_stats(url)
+    assert stats['checkouts'] == 3
+    assert stats['connects'] == 1  # Connections are reused, not reopened
+    assert stats['checked_out'] == 0
@@ -0,0 +1,55 @@
+# test_consolidation.py
+from datetime import datetime
+from fox_scraper.core.consolidation import cologne_phonetic, name_key, blocking_keys, cluster, merge_cluster
+
+
+def record(record_id, name, postcode='10115', street='Hauptstraße', number='5', phone='+4930123456',
+           source_id=1, status='valid', confidence=0.8):
+    return {
+        'id': record_id,
+        'raw_data_id': record_id * 10,
+        'source_id': source_id,
+        'name': name,
+        'category': 'Tierarzt',
+        'address': {'street': street, 'house_number': number, 'postcode': postcode, 'city': 'Berlin'},
+        'contact': {'phone': phone, 'phone_e164': phone, 'hours': None},
+        'validation_status': status,
+        'cleaned_at': datetime(2024, 1, record_id),
+        'source_confidence': confidence,
+    }
+
+
+def test_cologne_phonetic():
+    assert cologne_phonetic('Müller-Lüdenscheidt') == '65752682'
+    assert cologne_phonetic('Meier') == cologne_phonetic('Mayer') == '67'
+    assert name_key('Tierarztpraxis Dr. med. vet. Anna Meier') == name_key('Tierärztin Anna Mayer')
+
+
+def test_blocking_keys():
+    assert blocking_keys(record(1, 'Praxis Meier')) == ['postcode:10115', 'name:67', 'phone:+4930123456']
+    assert blocking_keys({'name': '', 'address': None, 'contact': {}}) == []
+
+
+def test_cluster_matches_within_blocks_only():
+    records = {
+        1: record(1, 'Tierarztpraxis Dr. Meier'),
+        2: record(2, 'Dr. Mayer Tierarzt', phone=''),  # same address
+        3: record(3, 'Praxis Meier', postcode='20095', street='Parkweg', number='1'),  # same phone
+        4: record(4, 'Tierklinik Schulz', phone='+4940111111'),  # same address, other practice
+        5: record(5, 'Praxis Meier', postcode='80331', street='Am Markt', number='2', phone='+4989222222'),
+    }
+    assert sorted(sorted(ids) for ids in cluster(records)) == [[1, 2, 3], [4], [5]]
+
+
+def test_merge_weighs_sources():
+    trusted = record(1, 'Tierarztpraxis Dr. Meier', phone='+4930123456', source_id=2, confidence=0.9)
+    listing = record(2, 'Praxis Meyer', phone='+4930999999', source_id=1, confidence=0.5, status='partial')
+    merged = merge_cluster([listing, trusted])
+
+    assert merged['name'] == 'Tierarztpraxis Dr. Meier'
+    assert merged['contact']['phone_e164'] == '+4930123456'
+    assert merged['primary_data']['address']['support'] == 1.0
+    assert [source['cleaned_data_id'] for source in merged['sources']] == [1, 2]
+    assert merged['data_json']['source_ids'] == [1, 2]
+    assert 0 < merged['confidence_score'] < 1
+    assert merged['external_id'] == merge_cluster([trusted, listing])['external_id']
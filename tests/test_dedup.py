@@ -0,0 +1,32 @@
+# test_dedup.py
+import hashlib
+from fox_scraper.core.dedup import HashIndex
+
+
+def md5(n):
+    return hashlib.md5(str(n).encode()).hexdigest()
+
+
+def test_hash_index_remembers_committed_hashes_only():
+    index = HashIndex()
+    index.hashes.add(bytes.fromhex(md5(1)))
+    assert md5(1) in index
+
+    index.add(md5(2))
+    assert md5(2) in index  # Duplicates within the open batch are caught too
+    index.rolled_back()
+    assert md5(2) not in index
+
+    index.add(md5(3))
+    index.committed()
+    assert md5(3) in index
+    assert len(index) == 2
+
+
+def test_hash_index_memory_report():
+    index = HashIndex()
+    for n in range(1000):
+        index.add(md5(n))
+    index.committed()
+    # 16-byte keys: well under 200 MB per million hashes
+    assert 0 < index.bytes_per_million() < 200 * 1024 * 1024
@@ -0,0 +1,125 @@
+# test_export.py
+import csv
+import json
+import pytest
+from sqlalchemy import create_engine, text
+from fox_scraper.core.export import ExportFilters, export_query, export_table
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE raw_data (id INTEGER PRIMARY KEY, source_id INTEGER, run_id INTEGER, "
+            "url TEXT, scraped_at TEXT)"
+        ))
+        connection.execute(text("INSERT INTO raw_data VALUES (:id, :source_id, :run_id, :url, :scraped_at)"), [
+            {'id': i, 'source_id': 1 + i % 2, 'run_id': 7, 'url': f'https://example.com/{i}',
+             'scraped_at': f'2024-01-{i:02d}'}
+            for i in range(1, 11)
+        ])
+    return engine
+
+
+def test_filters_become_conditions():
+    statement, params = export_query('cleaned_data', ExportFilters(source_id=2, run_id=7, since='2024-01-01'))
+    assert 't.source_id = :source_id' in statement.text and 'r.run_id = :run_id' in statement.text
+    assert params == {'source_id': 2, 'run_id': 7, 'since': '2024-01-01'}
+    with pytest.raises(ValueError):
+        export_query('master_records', ExportFilters(run_id=7))
+
+
+def test_ndjson_export_in_chunks(engine, tmp_path):
+    output = str(tmp_path / 'raw.ndjson')
+    written = export_table(engine, 'raw_data', output, 'ndjson', ExportFilters(source_id=1), chunk_size=2)
+
+    rows = [json.loads(line) for line in open(output)]
+    assert written == 5
+    assert [row['id'] for row in rows] == [2, 4, 6, 8, 10]
+    assert json.load(open(f'{output}.state'))['last_id'] == 10
+
+
+def test_resumed_csv_export_appends_after_last_id(engine, tmp_path):
+    output = str(tmp_path / 'raw.csv')
+    export_table(engine, 'raw_data', output, 'csv', ExportFilters(until='2024-01-05'))
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM raw_data WHERE id = 2"))  # Already exported
+
+    written = export_table(engine, 'raw_data', output, 'csv', chunk_size=3, resume=True)
+
+    rows = list(csv.DictReader(open(output)))
+    assert written == 6
+    assert [int(row['id']) for row in rows] == list(range(1, 11))
+    assert json.load(open(f'{output}.state'))['rows'] == 10
+
+
+def test_parquet_export_is_split_into_parts(engine, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    output = str(tmp_path / 'raw')
+    written = export_table(engine, 'raw_data', output, 'parquet', chunk_size=2, rows_per_file=4)
+
+    assert written == 10
+    assert sorted(p.name for p in (tmp_path / 'raw').iterdir()) == [
+        'part-00001.parquet', 'part-00002.parquet', 'part-00003.parquet'
+    ]
+    assert pq.read_table(output).column('id').to_pylist() == list(range(1, 11))
+
+
+def test_interrupted_parquet_export_resumes_from_the_last_closed_part(engine, tmp_path, monkeypatch):
+    pq = pytest.importorskip('pyarrow.parquet')
+    from fox_scraper.core import export
+    output = str(tmp_path / 'raw')
+    stream = export.stream_chunks
+
+    def interrupted(*args):
+        chunks = stream(*args)
+        for _ in range(3):  # Part 1 closes after two chunks, part 2 stays open
+            yield next(chunks)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(export, 'stream_chunks', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        export_table(engine, 'raw_data', output, 'parquet', chunk_size=2, rows_per_file=4)
+    state = json.load(open(f'{output}.state'))
+    assert (state['last_id'], state['parts']) == (4, 1)
+
+    monkeypatch.setattr(export, 'stream_chunks', stream)
+    written = export_table(engine, 'raw_data', output, 'parquet', chunk_size=2, rows_per_file=4, resume=True)
+    assert written == 6
+    assert pq.read_table(output).column('id').to_pylist() == list(range(1, 11))
+
+
+def test_parquet_keeps_timestamps(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    from datetime import datetime
+    from sqlalchemy import Integer, JSON, DateTime
+    from fox_scraper.core.export import ParquetExportWriter
+
+    columns = [{'name': 'id', 'type': Integer()}, {'name': 'scraped_at', 'type': DateTime()},
+               {'name': 'raw_content', 'type': JSON()}]
+    writer = ParquetExportWriter(str(tmp_path / 'raw'), columns)
+    writer.write([{'id': 1, 'scraped_at': datetime(2024, 1, 2, 3, 4), 'raw_content': {'name': 'Praxis'}}])
+    writer.close()
+
+    table = pytest.importorskip('pyarrow.parquet').read_table(str(tmp_path / 'raw'))
+    assert pa.types.is_timestamp(table.schema.field('scraped_at').type)
+    assert table.column('raw_content').to_pylist() == ['{"name": "Praxis"}']
+
+
+def test_parquet_types_come_from_the_table_not_the_first_chunk(engine, tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE raw_data ADD COLUMN last_seen_run_id INTEGER"))
+        # Legacy rows first, with NULLs all through the first chunk
+        connection.execute(text("UPDATE raw_data SET last_seen_run_id = 7 WHERE id > 4"))
+    output = str(tmp_path / 'raw')
+    written = export_table(engine, 'raw_data', output, 'parquet', chunk_size=4, rows_per_file=4)
+
+    assert written == 10
+    schemas = {str(pq.read_schema(str(part))) for part in (tmp_path / 'raw').iterdir()}
+    assert len(schemas) == 1
+    table = pq.read_table(output)
+    assert table.schema.field('last_seen_run_id').type == pa.int64()
+    assert table.column('last_seen_run_id').to_pylist() == [None] * 4 + [7] * 6
@@ -0,0 +1,30 @@
+# test_extractor.py
+import os
+from scrapy.http import HtmlResponse
+from fox_scraper.core.extractor import HitExtractor
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'listing_page.html')
+
+
+def load_fixture():
+    with open(FIXTURE, 'rb') as f:
+        return HtmlResponse(url='https://www.dasoertliche.de/Themen/Tierarzt.html', body=f.read(), encoding='utf-8')
+
+
+def test_single_pass_matches_parsel_selectors():
+    response = load_fixture()
+    extractor = HitExtractor()
+    entries = response.css('div.hit')
+    hits = extractor.hits(response)
+    assert len(hits) == len(entries) == 30
+
+    for entry, hit in zip(entries, hits):
+        fields = extractor.extract(hit)
+        assert fields.get('url') == entry.css('h2 a.hitlnk_name::attr(href)').get()
+        assert fields.get('name') == entry.css('h2 a.hitlnk_name::text').get()
+        assert fields.get('subtitle') == entry.css('div.subline::text').get()
+        assert fields.get('category') == entry.css('div.category::text').get()
+        assert fields.get('phone') == entry.css('div.phoneblock span::text').get()
+        assert fields.get('opening_hours') == entry.css('div.hitlnk_times::text').get()
+        assert fields['address_texts'] == entry.xpath('.//address//text()').getall()
+        assert extractor.html(hit) == entry.get()
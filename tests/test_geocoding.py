@@ -0,0 +1,67 @@
+# test_geocoding.py
+from sqlalchemy import create_engine, text
+from fox_scraper.core.geocoding import PENDING_SQL, Gazetteer, Geocoder, address_key
+
+GAZETTEER = """postcode,city,street,lat,lon
+10115,Berlin,Hauptstraße,52.5300,13.3850
+10115,Berlin,Parkweg,52.5320,13.3870
+20095,Hamburg,,53.5500,10.0000
+"""
+
+
+def geocoder(tmp_path, cache_size=10):
+    path = tmp_path / 'gazetteer.csv'
+    path.write_text(GAZETTEER, encoding='utf-8')
+    return Geocoder(Gazetteer(str(path)), cache_size=cache_size)
+
+
+def test_lookup_falls_back_from_street_to_postcode_to_city(tmp_path):
+    geo = geocoder(tmp_path)
+    data, confidence = geo.geocode({'street': 'Hauptstr.', 'postcode': '10115', 'city': 'Berlin'})
+    assert (data['lat'], data['precision'], confidence) == (52.53, 'street', 0.9)
+
+    data, confidence = geo.geocode({'street': 'Am Markt', 'postcode': '10115', 'city': 'Berlin'})
+    assert data['precision'] == 'postcode' and round(data['lat'], 3) == 52.531
+
+    data, confidence = geo.geocode({'street': '', 'postcode': '', 'city': 'hamburg'})
+    assert (data['precision'], confidence) == ('city', 0.4)
+
+    assert geo.geocode({'postcode': '99999', 'city': 'Nowhere'}) == ({'matched': False}, 0.0)
+
+
+def test_cache_is_keyed_on_normalized_address(tmp_path):
+    geo = geocoder(tmp_path, cache_size=2)
+    assert address_key({'street': 'Hauptstraße', 'postcode': '10115'}) == address_key(
+        {'street': 'hauptstr. ', 'postcode': '10115 '}
+    )
+    for street in ('Hauptstraße', 'Hauptstrasse', 'Hauptstr.'):
+        geo.geocode({'street': street, 'postcode': '10115', 'city': 'Berlin'})
+
+    stats = geo.stats()
+    assert (stats['cache_hits'], stats['cache_misses'], stats['geocoded']) == (2, 1, 3)
+    assert round(stats['cache_hit_rate'], 2) == 0.67
+
+    for postcode in ('1', '2', '3'):
+        geo.geocode({'postcode': postcode})
+    assert geo.stats()['cache_size'] == 2
+
+
+def test_rows_re_cleaned_after_their_geocode_are_pending_again():
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE cleaned_data (id INTEGER PRIMARY KEY, address TEXT, cleaned_at TEXT)"))
+        connection.execute(text(
+            "CREATE TABLE enriched_data (id INTEGER PRIMARY KEY, cleaned_data_id INTEGER, "
+            "enrichment_type TEXT, enriched_at TEXT)"
+        ))
+        connection.execute(text("INSERT INTO cleaned_data VALUES (:id, '{}', :cleaned_at)"), [
+            {'id': 1, 'cleaned_at': '2024-01-01'},  # Geocoded since
+            {'id': 2, 'cleaned_at': '2024-03-01'},  # Re-cleaned after its geocode
+            {'id': 3, 'cleaned_at': '2024-01-01'},  # Never geocoded
+        ])
+        connection.execute(text("INSERT INTO enriched_data VALUES (:id, :id, 'geocode', '2024-02-01')"), [
+            {'id': 1}, {'id': 2}
+        ])
+        pending = connection.execute(PENDING_SQL, {'after_id': 0, 'limit': 10, 'reprocess': False}).all()
+    assert [row[0] for row in pending] == [2, 3]
+
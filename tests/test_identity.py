@@ -0,0 +1,39 @@
+# test_identity.py
+from fox_scraper.core.identity import identity_key, content_hash
+
+
+def entry(**overrides):
+    raw_content = {
+        'name': 'Tierarztpraxis Dr. Müller',
+        'subtitle': '',
+        'category': 'Tierärzte',
+        'address': {'street': 'Hauptstraße 5', 'city': '10115 Berlin'},
+        'phone': '030 123456',
+        'opening_hours': 'Mo-Fr 9-18',
+        'page_number': 3,
+        'html': '<div class="hit">...</div>'
+    }
+    raw_content.update(overrides)
+    return raw_content
+
+
+def test_page_and_markup_do_not_change_identity_or_content():
+    moved = entry(page_number=7, html='<div class="hit new">...</div>')
+    assert identity_key(moved) == identity_key(entry())
+    assert content_hash(moved) == content_hash(entry())
+
+
+def test_identity_ignores_formatting():
+    reformatted = entry(
+        name='  Tierarztpraxis  Dr Müller',
+        address={'street': 'Hauptstr. 5', 'city': '10115 berlin'},
+        phone='(030) 12 34 56'
+    )
+    assert identity_key(reformatted) == identity_key(entry())
+
+
+def test_changed_data_keeps_identity_but_changes_content():
+    changed = entry(opening_hours='Mo-Sa 8-20')
+    assert identity_key(changed) == identity_key(entry())
+    assert content_hash(changed) != content_hash(entry())
+    assert identity_key(entry(phone='030 654321')) != identity_key(entry())
@@ -0,0 +1,34 @@
+# test_middlewares.py
+from fox_scraper.middlewares.middlewares import AdaptiveRateLimiter, parse_retry_after
+
+
+def test_rate_ramps_up_on_fast_responses():
+    limiter = AdaptiveRateLimiter(start_rate=0.5, max_rate=1.0, increase=0.25)
+    for _ in range(5):
+        limiter.record('host', now=0.0, status=200, latency=0.2)
+    assert limiter.bucket('host').rate == 1.0
+
+    # Slow responses hold the rate
+    limiter.record('host', now=0.0, status=200, latency=5.0)
+    assert limiter.bucket('host').rate == 1.0
+
+
+def test_backoff_halves_rate_and_honours_retry_after():
+    limiter = AdaptiveRateLimiter(start_rate=2.0, min_rate=0.5, decrease=0.5)
+    assert limiter.delay('host', now=0.0) == 0.0
+    assert limiter.delay('host', now=0.0) == 0.5
+
+    assert limiter.record('host', now=1.0, status=429, latency=0.1, retry_after=30)
+    assert limiter.bucket('host').rate == 1.0
+    assert limiter.delay('host', now=1.0) == 30.0
+    assert limiter.snapshot() == {'host': {'rate': 1.0, 'backoffs': 1}}
+
+    for _ in range(5):
+        limiter.record('host', now=2.0, status=503, latency=0.1)
+    assert limiter.bucket('host').rate == 0.5
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(b'120') == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('not a date') is None
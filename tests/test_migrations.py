@@ -0,0 +1,58 @@
+# test_migrations.py
+import re
+import types
+from sqlalchemy import create_engine, text, inspect
+from fox_scraper.core import migrations
+from fox_scraper.core.database import Base
+from fox_scraper.core.migrations import migrate, available_migrations
+
+
+def test_migrations_are_ordered_by_version():
+    versions = [version for version, _ in available_migrations()]
+    assert versions[:3] == ['m0001_baseline', 'm0002_raw_data_identity', 'm0003_pipeline_tables']
+    assert versions == sorted(versions)
+
+
+def test_pending_migrations_run_once(monkeypatch):
+    calls = []
+
+    def make(name):
+        return types.SimpleNamespace(upgrade=lambda connection: (
+            calls.append(name), connection.execute(text(f"CREATE TABLE {name} (id INTEGER)"))
+        ))
+
+    monkeypatch.setattr(migrations, 'available_migrations', lambda: [('m0001_a', make('a')), ('m0002_b', make('b'))])
+    engine = create_engine('sqlite://')
+    assert migrate(engine) == ['m0001_a', 'm0002_b']
+    assert migrate(engine) == []
+    assert calls == ['a', 'b']
+    assert {'a', 'b', 'schema_migrations'} <= set(inspect(engine).get_table_names())
+
+
+def migration_ddl():
+    statements = []
+    for _, module in available_migrations():
+        statements += getattr(module, 'STATEMENTS', ()) + getattr(module, 'INDEXES', ())
+    return ' '.join(' '.join(statements).split())
+
+
+def test_migrations_create_every_declared_column_and_index():
+    ddl = migration_ddl()
+    for table in Base.metadata.sorted_tables:
+        names = [column.name for column in table.columns]
+        names += [index.name for index in table.indexes]
+        names += [constraint.name for constraint in table.constraints if constraint.name]
+        for name in names:
+            assert re.search(rf'\b{name}\b', ddl), f"{table.name}.{name} has no migration"
+    assert "raw_data_hash_key ON raw_data (hash)" in ddl
+    assert "uq_enriched_data_type ON enriched_data (cleaned_data_id, enrichment_type)" in ddl
+
+
+def test_migrations_do_not_read_the_models():
+    for _, module in available_migrations():
+        source = open(module.__file__).read()
+        assert 'create_all' not in source and 'metadata' not in source
+        # Fixed DDL only; live code may change after the migration shipped
+        assert 'import fox_scraper' not in source and 'from fox_scraper' not in source
+    # No index over the whole JSON document
+    assert ' gin' not in migration_ddl().lower()
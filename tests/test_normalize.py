@@ -0,0 +1,54 @@
+# test_normalize.py
+import pandas as pd
+from fox_scraper.core.normalize import normalize_frame, phones_e164, split_address
+from fox_scraper.core.cleaning import clean_batch
+
+
+def test_phones_are_written_in_e164():
+    phones = pd.Series(['030 123456', '(040) 98 76 54', '+49 89 5550100', '0049 221 12345', 'n/a', ''])
+    assert list(phones_e164(phones)) == [
+        '+4930123456', '+4940987654', '+49895550100', '+4922112345', '', ''
+    ]
+
+
+def test_trunk_zero_after_the_country_code_is_dropped():
+    phones = pd.Series(['+49 (0) 30 1234', '0049 (0)40 987654', '+49(0)89 5550100'])
+    assert list(phones_e164(phones)) == ['+49301234', '+4940987654', '+49895550100']
+
+
+def test_addresses_are_split_into_parts():
+    address = split_address(
+        pd.Series(['Hauptstr. 5', 'Str. des 17. Juni 12a', 'Parkweg 1 - 3, 20095 Hamburg', 'Am Markt']),
+        pd.Series(['10115 Berlin', '10623  Berlin', '', 'Am Markt'])
+    )
+    assert address.to_dict('records') == [
+        {'street': 'Hauptstraße', 'house_number': '5', 'postcode': '10115', 'city': 'Berlin'},
+        {'street': 'Straße des 17. Juni', 'house_number': '12a', 'postcode': '10623', 'city': 'Berlin'},
+        {'street': 'Parkweg', 'house_number': '1-3', 'postcode': '20095', 'city': 'Hamburg'},
+        {'street': 'Am Markt', 'house_number': '', 'postcode': '', 'city': ''},
+    ]
+
+
+def test_categories_and_validation_status():
+    frame = pd.DataFrame({
+        'name': ['Praxis A', 'Praxis B', None],
+        'category': ['Tierärzte', ' tierarztpraxis ', 'Hufschmied'],
+        'street': ['Hauptstr. 5', 'Am Markt 1', ''],
+        'city': ['10115 Berlin', 'Berlin', ''],
+        'phone': ['030 123456', '030 123456', ''],
+        'opening_hours': ['Mo - Fr 9 – 18 Uhr', None, ''],
+    })
+    result = normalize_frame(frame)
+    assert list(result['category']) == ['Tierarzt', 'Tierarzt', 'Hufschmied']
+    assert list(result['validation_status']) == ['valid', 'partial', 'invalid']
+    assert result['opening_hours'][0] == 'Mo-Fr 9-18'
+
+
+def test_broken_rows_do_not_fail_the_batch():
+    good = {'name': 'Praxis A', 'address': {'street': 'Hauptstr. 5', 'city': '10115 Berlin'}, 'phone': '030 1234'}
+    rows = [(1, 1, good), (2, 1, {'name': 'Praxis B', 'address': 'not a dict'}), (3, 1, good), (4, 1, [])]
+    results = clean_batch(rows)
+
+    assert [raw_data_id for raw_data_id, _, _ in results] == [1, 2, 3, 4]
+    assert [cleaned is not None for _, cleaned, _ in results] == [True, False, True, False]
+    assert results[2][1]['contact']['phone_e164'] == '+49301234'
@@ -0,0 +1,35 @@
+# test_partitions.py
+from datetime import date
+from fox_scraper.core.partitions import add_months, partition_name, expired_partitions
+
+
+def test_month_arithmetic_and_names():
+    assert add_months(date(2024, 11, 1), 2) == date(2025, 1, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+    assert partition_name(date(2024, 3, 1)) == 'raw_data_history_p202403'
+
+
+def test_only_whole_months_before_the_window_expire():
+    partitions = [(partition_name(month), month) for month in
+                  (date(2023, 12, 1), date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1))]
+    expired = expired_partitions(partitions, keep_months=1, today=date(2024, 3, 15))
+    assert [name for name, _ in expired] == ['raw_data_history_p202312', 'raw_data_history_p202401']
+
+
+def test_every_schema_setup_keeps_partitions_ahead(monkeypatch):
+    import contextlib
+    import types
+    from fox_scraper.core import database
+
+    calls = []
+    monkeypatch.setattr(database, 'migrate', lambda engine: calls.append('migrate'))
+    monkeypatch.setattr(database, 'ensure_history', lambda connection: calls.append('partitions'))
+    manager = database.DatabaseManager.__new__(database.DatabaseManager)
+    manager.engine = types.SimpleNamespace(
+        dialect=types.SimpleNamespace(name='postgresql'),
+        connect=lambda: contextlib.nullcontext(None)
+    )
+
+    manager.create_tables()
+    manager.create_tables()
+    assert calls == ['migrate', 'partitions'] * 2
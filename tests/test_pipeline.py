@@ -0,0 +1,155 @@
+# test_pipeline.py
+from fox_scraper.pipelines.db_pipeline import DatabasePipeline
+
+
+def make_item(n, detail=False):
+    item = {'source_id': 1, 'run_id': 1, 'url': f'https://example.com/{n}'}
+    if detail:
+        item.update(detail={'email': f'{n}@example.com'}, detail_fetched_at='2024-01-01T00:00:00')
+    else:
+        item['raw_content'] = {'name': f'Praxis {n}', 'html': f'<div>{n}</div>'}
+    return item
+
+
+def recording_pipeline(**kwargs):
+    """Pipeline whose batch writes are recorded instead of sent to the database"""
+    pipeline = DatabasePipeline(**kwargs)
+    pipeline.batches = []
+
+    def write_batch(items, details):
+        pipeline.batches.append((len(items), len(details)))
+        return len(items) + len(details)
+
+    pipeline.write_batch = write_batch
+    return pipeline
+
+
+def test_items_are_flushed_by_batch_size():
+    pipeline = recording_pipeline(batch_size=3, flush_interval=60)
+
+    for n in range(2):
+        pipeline.process_item(make_item(n), None)
+    assert pipeline.batches == []
+
+    pipeline.process_item(make_item(2, detail=True), None)
+    assert pipeline.batches == [(2, 1)]
+    assert pipeline.write_stats()['rows_written'] == 3
+
+
+def test_items_are_flushed_by_age():
+    pipeline = recording_pipeline(batch_size=100, flush_interval=60)
+    pipeline.process_item(make_item(0), None)
+    assert pipeline.batches == []
+
+    pipeline.last_flush -= 61
+    pipeline.process_item(make_item(1), None)
+    assert pipeline.batches == [(2, 0)]
+
+
+def test_failed_batch_falls_back_to_single_items():
+    pipeline = recording_pipeline(batch_size=2, flush_interval=60)
+    record = pipeline.write_batch
+
+    def write_batch(items, details):
+        if len(items) > 1:
+            raise RuntimeError('constraint violated')
+        return record(items, details)
+
+    pipeline.write_batch = write_batch
+    pipeline.process_item(make_item(0), None)
+    pipeline.process_item(make_item(1), None)
+    assert pipeline.batches == [(1, 0), (1, 0)]
+
+
+def test_failed_batch_leaves_its_pages_pending():
+    pipeline = recording_pipeline(batch_size=100, flush_interval=60)
+    completed = []
+    pipeline.pages_written = completed.append
+    marker = {'completed_page': 3, 'url': 'https://example.com/page-3'}
+
+    pipeline.write_buffered([make_item(0), marker], [])
+    assert completed == [[('https://example.com/page-3', 3)]]
+
+    def write_batch(items, details):
+        raise RuntimeError('connection lost')
+
+    pipeline.write_batch = write_batch
+    pipeline.write_buffered([make_item(1), marker], [])
+    assert len(completed) == 1
+
+
+def test_full_writer_queue_holds_items_until_a_batch_is_taken():
+    from fox_scraper.core.writer import BatchWriter
+
+    pipeline = DatabasePipeline(batch_size=1, flush_interval=60)
+    written = []
+    pipeline.writer = BatchWriter(lambda items, details: written.append(len(items)), max_batches=1)
+
+    assert pipeline.process_item(make_item(0), None)['url'].endswith('/0')
+    held = pipeline.process_item(make_item(1), None)  # Queue is full
+    results = []
+    held.addCallback(results.append)
+    assert results == []
+
+    pipeline.writer.on_taken = pipeline.batch_taken
+    pipeline.writer.start()
+    pipeline.writer.close()
+    assert written == [1, 1]
+    assert results[0]['url'].endswith('/1')
+
+
+def test_skipped_pages_touch_their_practices():
+    pipeline = DatabasePipeline(batch_size=100, flush_interval=60)
+    touched = []
+    pipeline.touch_entries = lambda session, unchanged, now: 0
+    pipeline.touch_seen = lambda session, seen, now: touched.append(seen) or 3
+
+    rows = pipeline.write_entries(None, [
+        {'source_id': 1, 'run_id': 7, 'seen': ['a', 'b']},
+        {'source_id': 1, 'run_id': 7, 'seen': ['b', 'c']},
+    ])
+    assert rows == 3
+    assert touched == [{(1, 7): {'a', 'b', 'c'}}]
+
+
+class FakeSession:
+    def __init__(self):
+        self.commits = 0
+        self.closed = False
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_finish_spider_folds_rollups_for_the_spiders_run(monkeypatch, caplog):
+    import types
+    from fox_scraper.pipelines import db_pipeline
+
+    calls = []
+    monkeypatch.setattr(db_pipeline, 'refresh_rollups', lambda session: calls.append('refresh'))
+    monkeypatch.setattr(db_pipeline, 'table_counts', lambda session, tables: {table: 10 for table in tables})
+
+    def rollup_totals(session, table, by=(), run_id=None):
+        calls.append(('totals', table, run_id))
+        return [types.SimpleNamespace(status='processed', records=4)]
+
+    monkeypatch.setattr(db_pipeline, 'rollup_totals', rollup_totals)
+    pipeline = DatabasePipeline()
+    session = FakeSession()
+    pipeline.db = types.SimpleNamespace(get_session=lambda: session)
+
+    # The spider only carries run_id, never a run object
+    spider = types.SimpleNamespace(run_id=5)
+    with caplog.at_level('INFO', logger='fox_scraper.pipelines.db_pipeline'):
+        pipeline.finish_spider(spider)
+
+    assert calls == ['refresh', ('totals', 'raw_data', 5)]
+    assert session.commits == 1 and session.closed
+    assert 'Raw records of run 5 by status: processed: 4' in caplog.text
+    assert 'Error closing spider' not in caplog.text
@@ -0,0 +1,112 @@
+# test_rollups.py
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from fox_scraper.core.rollups import (
+    TOTALS_SELECT, delta_sql, rebuild_rollups, refresh_rollups, rollup_totals, table_counts
+)
+
+RAW_COLUMNS = "id INTEGER PRIMARY KEY, source_id INTEGER, run_id INTEGER, scraped_at TEXT, processing_status TEXT"
+
+
+@pytest.fixture
+def engine():
+    """Rollup tables, plus raw_data and the transition tables a raw_data trigger sees"""
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE rollup_counts (table_name TEXT, source_id INTEGER, day DATE, run_id INTEGER, "
+            "status TEXT, records INTEGER NOT NULL DEFAULT 0, updated_at TIMESTAMP, "
+            "PRIMARY KEY (table_name, source_id, day, run_id, status))"
+        ))
+        connection.execute(text(
+            "CREATE TABLE rollup_deltas (id INTEGER PRIMARY KEY, table_name TEXT, source_id INTEGER, "
+            "day DATE, run_id INTEGER, status TEXT, records INTEGER)"
+        ))
+        connection.execute(text(f"CREATE VIEW rollup_totals AS {TOTALS_SELECT}"))
+        for table in ('raw_data', 'new_rows', 'old_rows'):
+            connection.execute(text(f"CREATE TABLE {table} ({RAW_COLUMNS})"))
+    return engine
+
+
+def statement(connection, event, new=(), old=()):
+    """Run the raw_data trigger's delta insert for one statement's transition tables"""
+    for table, rows in (('new_rows', new), ('old_rows', old)):
+        connection.execute(text(f"DELETE FROM {table}"))
+        if rows:
+            connection.execute(text(f"INSERT INTO {table} VALUES (:id, :source_id, :run_id, :scraped_at, :status)"), [
+                dict(zip(('id', 'source_id', 'run_id', 'scraped_at', 'status'), row)) for row in rows
+            ])
+    connection.execute(text(delta_sql('raw_data', event)))
+
+
+def totals(session, **kwargs):
+    return [tuple(row) for row in rollup_totals(session, 'raw_data', **kwargs)]
+
+
+def test_statement_deltas_add_up_to_the_totals(engine):
+    with Session(engine) as session:
+        connection = session.connection()
+        statement(connection, 'INSERT', new=[
+            (1, 1, 7, '2024-01-02 10:00:00', 'pending'),
+            (2, 1, 7, '2024-01-02 11:00:00', 'pending'),
+            (3, 2, 8, None, None),
+        ])
+        statement(connection, 'UPDATE',
+                  new=[(1, 1, 7, '2024-01-02 10:00:00', 'processed')],
+                  old=[(1, 1, 7, '2024-01-02 10:00:00', 'pending')])
+        statement(connection, 'DELETE', old=[(2, 1, 7, '2024-01-02 11:00:00', 'pending')])
+
+        # Unfolded deltas already count; missing keys fall back to their defaults
+        assert totals(session, by=('status',)) == [('', 1), ('pending', 0), ('processed', 1)]
+        assert totals(session, by=('day', 'run_id'), run_id=8) == [('1970-01-01', 8, 1)]
+        assert table_counts(session, ('raw_data',)) == {'raw_data': 2}
+
+
+def test_updates_that_keep_the_key_leave_no_delta(engine):
+    with Session(engine) as session:
+        row = (1, 1, 7, '2024-01-02 10:00:00', 'processed')
+        statement(session.connection(), 'UPDATE', new=[row], old=[row])  # e.g. last_seen_at touched
+        assert session.execute(text("SELECT COUNT(*) FROM rollup_deltas")).scalar() == 0
+
+
+def test_refresh_folds_deltas_in_batches_and_drops_empty_counts(engine):
+    with Session(engine) as session:
+        connection = session.connection()
+        statement(connection, 'INSERT', new=[(1, 1, 7, '2024-01-02', 'pending'), (2, 1, 7, '2024-01-03', 'failed')])
+        statement(connection, 'INSERT', new=[(3, 1, 7, '2024-01-02', 'pending')])
+        statement(connection, 'DELETE', old=[(2, 1, 7, '2024-01-03', 'failed')])
+
+        assert refresh_rollups(session, batch_size=2) == 4  # Two keys upserted per batch
+        assert session.execute(text("SELECT COUNT(*) FROM rollup_deltas")).scalar() == 0
+        counts = session.execute(text("SELECT day, status, records FROM rollup_counts")).all()
+        assert [tuple(row) for row in counts] == [('2024-01-02', 'pending', 2)]
+
+        # Later deltas add to the folded counts
+        statement(connection, 'DELETE', old=[(1, 1, 7, '2024-01-02', 'pending')])
+        assert totals(session, by=('status',)) == [('pending', 1)]
+        refresh_rollups(session)
+        assert totals(session, by=('status',)) == [('pending', 1)]
+
+
+def test_rebuild_recounts_the_table(engine):
+    with Session(engine) as session:
+        connection = session.connection()
+        connection.execute(text("INSERT INTO raw_data VALUES (1, 1, 7, '2024-01-02 09:00:00', 'pending')"))
+        connection.execute(text("INSERT INTO raw_data VALUES (2, 1, 7, '2024-01-02 18:00:00', 'pending')"))
+        statement(connection, 'INSERT', new=[(9, 3, 3, '2023-05-05', 'stale')])
+
+        for table in ('cleaned_data', 'master_records'):
+            connection.execute(text(
+                f"CREATE TABLE {table} (id INTEGER, source_id INTEGER, cleaned_at TEXT, created_at TEXT, "
+                "validation_status TEXT, status TEXT)"
+            ))
+        rebuild_rollups(connection)
+        assert totals(session, by=('day', 'status')) == [('2024-01-02', 'pending', 2)]
+
+
+def test_totals_reject_unknown_tables_and_columns():
+    with pytest.raises(ValueError):
+        rollup_totals(None, 'run_errors')
+    with pytest.raises(ValueError):
+        rollup_totals(None, 'raw_data', by=('url',))
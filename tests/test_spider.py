@@ -0,0 +1,304 @@
+# test_spider.py
+import types
+import pytest
+from scrapy.exceptions import DontCloseSpider
+from twisted.internet import defer, threads
+from scrapy.http import HtmlResponse, Request
+from fox_scraper.spiders.vet_spider import VetSpider
+from fox_scraper.core.checkpoint import CheckpointJournal
+from fox_scraper.pipelines.db_pipeline import DatabasePipeline
+
+HIT = """
+<div class="hit">
+    <h2><a class="hitlnk_name" href="https://www.dasoertliche.de/Themen/Tierarzt/{n}">Praxis {n}</a></h2>
+    <address>Hauptstr. {n}<br>12345 Berlin</address>
+</div>
+"""
+
+
+def make_response(spider, page, hits=2, links=()):
+    """Build a listing page response for `page`"""
+    body = ''.join(HIT.format(n=f'{page}-{i}') for i in range(hits))
+    body += ''.join(f'<a href="/Themen/Tierarzt-Seite-{n}.html">{n}</a>' for n in links)
+    request = Request(spider.page_url(page), meta={'page': page})
+    return HtmlResponse(
+        url=request.url,
+        body=f'<html><body>{body}</body></html>'.encode(),
+        encoding='utf-8',
+        request=request
+    )
+
+
+def split_output(output):
+    """Split parse output into items and scheduled page numbers"""
+    items = [o for o in output if isinstance(o, dict)]
+    pages = [o.meta['page'] for o in output if isinstance(o, Request)]
+    return items, pages
+
+
+def test_sequential_pagination_follows_next_page():
+    spider = VetSpider()
+    spider.update_run_stats = lambda: None
+
+    items, pages = split_output(list(spider.parse(make_response(spider, 1))))
+
+    assert len(items) == 2
+    assert pages == [2]
+
+
+def test_window_pagination_keeps_pages_in_flight():
+    spider = VetSpider(pagination='window', window=4)
+    spider.update_run_stats = lambda: None
+    spider.page_request(1)
+
+    _, pages = split_output(list(spider.parse(make_response(spider, 1, links=[2, 3, 10]))))
+    assert spider.last_page == 10
+    assert pages == [2, 3, 4, 5]
+
+    # Out-of-order response keeps its own page number and frees one slot
+    items, pages = split_output(list(spider.parse(make_response(spider, 4))))
+    assert {item['raw_content']['page_number'] for item in items} == {4}
+    assert pages == [6]
+
+
+def test_window_pagination_stops_after_empty_page():
+    spider = VetSpider(pagination='window', window=2)
+    spider.update_run_stats = lambda: None
+    spider.page_request(1)
+
+    _, pages = split_output(list(spider.parse(make_response(spider, 1))))
+    assert pages == [2, 3]
+
+    _, pages = split_output(list(spider.parse(make_response(spider, 3, hits=0))))
+    assert spider.last_page == 2
+    assert pages == []
+
+    _, pages = split_output(list(spider.parse(make_response(spider, 2))))
+    assert pages == []
+
+
+def test_resume_continues_from_checkpoint(tmp_path):
+    spider = VetSpider()
+    spider.update_run_stats = lambda: None
+    spider.journal = CheckpointJournal(str(tmp_path), run_id=1)
+    spider.page_request(1)
+    items, _ = split_output(list(spider.parse(make_response(spider, 1))))  # Schedules page 2
+
+    # Page 1 is completed only once the pipeline committed its items
+    assert items[-1] == {'completed_page': 1, 'url': spider.page_url(1)}
+    assert CheckpointJournal.load(str(tmp_path), run_id=1).completed_pages == set()
+    pipeline = DatabasePipeline(batch_size=100, flush_interval=60)
+    pipeline.spider = spider
+    pipeline.write_batch = lambda entries, details: len(entries)
+    for item in items:
+        pipeline.process_item(item, spider)
+    pipeline.flush()
+
+    journal = CheckpointJournal.load(str(tmp_path), run_id=1)
+    assert journal.completed_pages == {1}
+    assert [meta['page'] for meta in journal.pending.values()] == [2]
+
+    resumed = VetSpider()
+    resumed.journal = journal
+    _, pages = split_output(list(resumed.resume_requests()))
+    assert pages == [2]
+    assert resumed.next_page == 3
+
+
+def test_unchanged_page_is_skipped():
+    spider = VetSpider()
+    spider.update_run_stats = lambda: None
+    spider.conditional = True
+
+    items, _ = split_output(list(spider.parse(make_response(spider, 1))))
+    assert len(items) == 2
+    assert spider.validators.get(spider.page_url(1))['entry_count'] == 2
+
+    # Next run with the same validators: same body, no items, pagination goes on
+    next_run = VetSpider()
+    next_run.update_run_stats = lambda: None
+    next_run.conditional = True
+    next_run.validators = spider.validators
+
+    items, pages = split_output(list(next_run.parse(make_response(next_run, 1))))
+    # The page's practices are still marked seen in this run
+    assert [item['seen'] for item in items] == [spider.validators.identity_keys(spider.page_url(1))]
+    assert len(items[0]['seen']) == 2
+    assert pages == [2]
+    assert next_run.run_stats()['pages_parsed'] == 0
+    assert next_run.run_stats()['pages_unchanged'] == 1
+
+
+def test_detail_requests_respect_cap_and_priority():
+    spider = VetSpider(details='1')
+    spider.update_run_stats = lambda: None
+    spider.detail_concurrency = 2
+    spider.details_seen = {'https://www.dasoertliche.de/Themen/Tierarzt/1-0'}  # Still fresh
+
+    output = list(spider.parse(make_response(spider, 1, hits=4)))
+    listing = [o for o in output if isinstance(o, Request) and 'page' in o.meta]
+    details = [o for o in output if isinstance(o, Request) and 'listing_url' in o.meta]
+    assert len(details) == 2
+    assert all(d.priority < listing[0].priority for d in details)
+    assert all(d.dont_filter for d in details)
+    assert spider.details_skipped == 1
+
+    # The same practice on another page is not queued twice
+    spider.queue_detail(details[0].meta['listing_url'], details[0].url)
+    assert spider.details_skipped == 2
+
+    # A finished detail page frees its slot for the next queued one
+    detail = details[0]
+    response = HtmlResponse(
+        url=detail.url,
+        body=b'<a href="mailto:praxis@example.com">Mail</a>',
+        request=detail
+    )
+    output = list(spider.parse_detail(response))
+    assert output[0]['detail']['email'] == 'praxis@example.com'
+    assert [o.meta['listing_url'] for o in output[1:]] == ['https://www.dasoertliche.de/Themen/Tierarzt/1-3']
+
+
+class MemoryFrontier:
+    """Stand-in for SharedFrontier that keeps entries in a dict"""
+
+    lease_seconds = 300
+    worker_id = 'test'
+
+    def __init__(self):
+        self.entries = {}
+
+    def add(self, session, entries):
+        for entry in entries:
+            self.entries.setdefault(entry['url'], dict(entry, status='pending'))
+
+    def claim(self, session, limit, kind='listing'):
+        claimed = [
+            entry for entry in self.entries.values()
+            if entry['status'] == 'pending' and entry.get('kind', 'listing') == kind
+        ][:max(limit, 0)]
+        for entry in claimed:
+            entry['status'] = 'leased'
+        return claimed
+
+    def finish(self, session, url, status='done'):
+        self.entries[url]['status'] = status
+
+
+def inline_db_tasks(monkeypatch, spider):
+    """Run the spider's pool-thread DB tasks inline; returns the requests it hands the engine"""
+    monkeypatch.setattr(threads, 'deferToThread', defer.maybeDeferred)
+    spider.db.get_session = lambda: types.SimpleNamespace(close=lambda: None)
+    crawled = []
+    spider.crawler = types.SimpleNamespace(engine=types.SimpleNamespace(crawl=crawled.append))
+    return crawled
+
+
+def test_shared_frontier_publishes_and_claims_pages(monkeypatch):
+    spider = VetSpider(frontier='shared', window=3)
+    spider.update_run_stats = lambda: None
+    crawled = inline_db_tasks(monkeypatch, spider)
+    spider.shared = MemoryFrontier()
+    spider.shared.add(None, [spider.frontier_page(1)])
+    spider.claim_requests()
+    assert [r.meta['page'] for r in crawled] == [1]
+
+    _, pages = split_output(list(spider.parse(make_response(spider, 1, links=[2, 3, 4, 5]))))
+    assert pages == []
+    assert [r.meta['page'] for r in crawled] == [1, 2, 3, 4]
+    assert spider.shared.entries[spider.page_url(1)]['status'] == 'done'
+    assert spider.shared.entries[spider.page_url(5)]['status'] == 'pending'
+
+
+def test_idle_worker_waits_for_queued_frontier_tasks(monkeypatch):
+    spider = VetSpider(frontier='shared')
+    inline_db_tasks(monkeypatch, spider)
+    spider.shared = MemoryFrontier()
+    spider.shared.remaining = lambda session: 0
+
+    spider.db_tasks.acquire()  # A frontier write still running
+    with pytest.raises(DontCloseSpider):
+        spider.spider_idle(spider)
+    spider.db_tasks.release()
+
+    # The next idle claims once more and counts what is left in the run
+    with pytest.raises(DontCloseSpider):
+        spider.spider_idle(spider)
+    assert spider.frontier_remaining == 0
+    spider.spider_idle(spider)  # Nothing left: the worker may close
+
+
+class MemoryDeadLetters:
+    """Stand-in for DeadLetterQueue that records resolved ids"""
+
+    def __init__(self):
+        self.resolved = []
+
+    def resolve(self, session, dead_letter_id):
+        self.resolved.append(dead_letter_id)
+
+
+def test_redrive_revisits_only_dead_letters(monkeypatch):
+    spider = VetSpider(redrive_run='1')
+    spider.update_run_stats = lambda: None
+    inline_db_tasks(monkeypatch, spider)
+    spider.dead_letters = MemoryDeadLetters()
+    spider.redrive_concurrency = 1
+    spider.redrive_queue.extend([
+        {'id': 7, 'url': spider.page_url(5), 'page': 5, 'callback': 'parse', 'meta': {'page': 5}},
+        {'id': 8, 'url': spider.page_url(9), 'page': 9, 'callback': 'parse', 'meta': {'page': 9}},
+    ])
+
+    requests = list(spider.redrive_requests())
+    assert [r.meta['page'] for r in requests] == [5]
+
+    # A re-driven page resolves its dead letter and releases the next one,
+    # without following pagination
+    response = make_response(spider, 5, links=[6, 7])
+    response.request.meta['dead_letter_id'] = requests[0].meta['dead_letter_id']
+    items, pages = split_output(list(spider.parse(response)))
+    assert len(items) == 2
+    assert pages == [9]
+    assert spider.dead_letters.resolved == [7]
+    assert spider.redrive_resolved == 1
+
+
+def test_redrive_completes_the_run_only_without_dead_letters_left():
+    spider = VetSpider(redrive_run='1')
+    spider.redrive_status = 'completed'
+    spider.dead_letters = types.SimpleNamespace(pending=lambda session: ['letter'])
+    run = types.SimpleNamespace(status='running', end_time=None)
+    spider.finish_redrive(None, run, 'finished')
+    assert run.status == 'completed' and run.end_time is None
+
+    # An interrupted crawl stays resumable, the re-drive did not finish it
+    spider.redrive_status = 'interrupted'
+    spider.dead_letters = types.SimpleNamespace(pending=lambda session: [])
+    spider.finish_redrive(None, run, 'finished')
+    assert run.status == 'interrupted'
+
+    spider.redrive_status = 'failed'
+    spider.finish_redrive(None, run, 'finished')
+    assert run.status == 'completed' and run.end_time is not None
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+
+def test_errors_are_buffered_and_flushed_in_one_insert():
+    spider = VetSpider()
+    spider.record_error('parse failed', 'https://example.com/1')
+    spider.run_id = 3
+    spider.record_error('timeout', 'https://example.com/2')
+    assert spider.error_log.count == 2
+
+    session = RecordingSession()
+    rows = spider.error_log.flush(session, spider.run_id)
+    assert [row['run_id'] for row in rows] == [3, 3]
+    assert len(session.statements) == 1
+    assert spider.error_log.flush(session, spider.run_id) == []
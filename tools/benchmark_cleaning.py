@@ -0,0 +1,62 @@
+# fox_scraper/tools/benchmark_cleaning.py
+import argparse
+import random
+import time
+from fox_scraper.core.cleaning import clean_batch
+
+STREETS = ['Hauptstr.', 'Bahnhofstrasse', 'Am Markt', 'Lindenallee', 'Str. des 17. Juni', 'Parkweg']
+CITIES = [('10115', 'Berlin'), ('20095', 'Hamburg'), ('80331', 'München'), ('50667', 'Köln')]
+CATEGORIES = ['Tierarzt', 'Tierärzte', 'tierarztpraxis', 'Tierklinik', ' Tierheilpraktikerin ', 'Hufschmied']
+PHONES = ['030 123456', '(040) 98 76 54', '+49 89 5550100', '0049 221 123 45', '', 'n/a']
+
+
+def synthetic_rows(count, seed=0):
+    """(id, source_id, raw_content) rows shaped like the spider's raw_content"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        postcode, city = rng.choice(CITIES)
+        raw_content = {
+            'name': f"  Tierarztpraxis  Nr. {i} ",
+            'subtitle': '',
+            'category': rng.choice(CATEGORIES),
+            'address': {
+                'street': f"{rng.choice(STREETS)} {rng.randint(1, 200)}{rng.choice(['', 'a', ' - 3'])}",
+                'city': f"{postcode} {city}" if rng.random() > 0.05 else '',
+            },
+            'phone': rng.choice(PHONES),
+            'opening_hours': 'Mo - Fr 08:00 – 18:00 Uhr',
+            'page_number': i // 20 + 1,
+        }
+        rows.append((i + 1, 1, raw_content))
+    return rows
+
+
+def run(rows, batch_size):
+    """Clean all rows in batches, returns rows/sec"""
+    start = time.perf_counter()
+    for i in range(0, len(rows), batch_size):
+        clean_batch(rows[i:i + batch_size])
+    elapsed = time.perf_counter() - start
+    return len(rows) / elapsed if elapsed else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark normalization throughput of clean_batch')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--row-by-row', type=int, default=5000,
+                        help='Rows to clean one at a time for the baseline')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 500, 5000])
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    baseline = run(rows[:args.row_by_row], 1)
+    print(f"{'1 row':>12}: {baseline:,.0f} rows/sec ({args.row_by_row} rows)")
+    for batch_size in args.batch_sizes:
+        rate = run(rows, batch_size)
+        print(f"{batch_size:>7} rows: {rate:,.0f} rows/sec ({args.rows} rows, "
+              f"{rate / baseline if baseline else 0:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# fox_scraper/tools/benchmark_parser.py
+import argparse
+import glob
+import os
+import time
+from scrapy.http import HtmlResponse
+from fox_scraper.core.archive import ResponseArchive
+from fox_scraper.spiders.vet_spider import VetSpider
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures')
+
+
+def clean_text(text):
+    if text is None:
+        return ''
+    return ' '.join(text.strip().split())
+
+
+def legacy_raw_content(entry, page):
+    """Per-field parsel extraction, as VetSpider.parse did it before HitExtractor"""
+    address_texts = entry.xpath('.//address//text()').getall()
+    address_texts = [text.strip() for text in address_texts if text.strip()]
+
+    street = address_texts[0] if address_texts else ''
+    city = address_texts[-1] if len(address_texts) > 1 else ''
+
+    return {
+        'url': entry.css('h2 a.hitlnk_name::attr(href)').get(),
+        'name': clean_text(entry.css('h2 a.hitlnk_name::text').get()),
+        'subtitle': clean_text(entry.css('div.subline::text').get()),
+        'category': clean_text(entry.css('div.category::text').get()),
+        'address': {
+            'street': street,
+            'city': city
+        },
+        'phone': clean_text(entry.css('div.phoneblock span::text').get()),
+        'opening_hours': clean_text(entry.css('div.hitlnk_times::text').get()),
+        'page_number': page,
+        'html': entry.get()
+    }
+
+
+def compiled_raw_content(spider, hit, page):
+    """The same dict built from one HitExtractor walk, via the spider's own code"""
+    fields = spider.extractor.extract(hit)
+    raw_content = spider.build_raw_content(fields, page, spider.extractor.html(hit))
+    return {'url': fields.get('url'), **raw_content}
+
+
+def load_pages(source):
+    """Listing page responses from a directory of .html files or an archive"""
+    responses = []
+    for path in sorted(glob.glob(os.path.join(source, '*.html'))):
+        with open(path, 'rb') as f:
+            responses.append(HtmlResponse(url=f'file://{os.path.abspath(path)}', body=f.read(), encoding='utf-8'))
+    for _, _, header, body in ResponseArchive(source).records():
+        if header['status'] == 200:
+            responses.append(HtmlResponse(url=header['url'], body=body, encoding='utf-8'))
+    return responses
+
+
+def run_legacy(responses):
+    entries = 0
+    for response in responses:
+        for entry in response.css('div.hit'):
+            legacy_raw_content(entry, 1)
+            entries += 1
+    return entries
+
+
+def run_compiled(responses, spider):
+    entries = 0
+    for response in responses:
+        for hit in spider.extractor.hits(response):
+            compiled_raw_content(spider, hit, 1)
+            entries += 1
+    return entries
+
+
+def check_equivalence(responses, spider):
+    """Count entries where both paths disagree"""
+    mismatches = 0
+    for response in responses:
+        legacy = [legacy_raw_content(entry, 1) for entry in response.css('div.hit')]
+        compiled = [compiled_raw_content(spider, hit, 1) for hit in spider.extractor.hits(response)]
+        mismatches += sum(1 for a, b in zip(legacy, compiled) if a != b)
+        mismatches += abs(len(legacy) - len(compiled))
+    return mismatches
+
+
+def benchmark(responses, repeat):
+    spider = VetSpider()
+    results = {}
+    for label, run in [('legacy', run_legacy), ('compiled', lambda r: run_compiled(r, spider))]:
+        # Fresh responses per path so no selector caches carry over
+        pages = [response.replace(body=response.body) for response in responses]
+        start = time.perf_counter()
+        entries = 0
+        for _ in range(repeat):
+            entries += run(pages)
+        elapsed = time.perf_counter() - start
+        results[label] = entries / elapsed if elapsed else 0.0
+        print(f"{label:>9}: {entries} entries in {elapsed:.3f}s ({results[label]:,.0f} entries/sec)")
+    if results['legacy']:
+        print(f"  speedup: {results['compiled'] / results['legacy']:.2f}x")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark div.hit extraction paths')
+    parser.add_argument('source', nargs='?', default=FIXTURE_DIR,
+                        help='Directory of saved .html pages or a response archive')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    responses = load_pages(args.source)
+    if not responses:
+        print(f"No pages found in {args.source}")
+        return
+
+    mismatches = check_equivalence(responses, VetSpider())
+    print(f"Loaded {len(responses)} pages, {mismatches} mismatching entries")
+    benchmark(responses, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# fox_scraper/tools/clean_worker.py
+import argparse
+import logging
+import time
+from fox_scraper.core.database import DatabaseManager
+from fox_scraper.core.cleaning import CleaningWorker
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Clean pending raw_data rows into cleaned_data')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Cleaning processes (default: one per CPU)')
+    parser.add_argument('--chunk-size', type=int, default=5000,
+                        help='Rows claimed per transaction')
+    parser.add_argument('--batch-size', type=int, default=500,
+                        help='Rows handed to a process at a time')
+    parser.add_argument('--max-chunks', type=int, default=None)
+    parser.add_argument('--reprocess', action='store_true',
+                        help='Mark processed and failed rows pending first, e.g. after the cleaning rules changed')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    db = DatabaseManager()
+    db.create_tables()
+    worker = CleaningWorker(db, chunk_size=args.chunk_size, processes=args.processes,
+                            batch_size=args.batch_size)
+
+    session = db.get_session()
+    try:
+        if args.reprocess:
+            print(f"Marked {worker.reset(session)} rows pending for re-cleaning")
+    finally:
+        session.close()
+
+    start = time.perf_counter()
+    handled = worker.run(max_chunks=args.max_chunks)
+    elapsed = time.perf_counter() - start
+    print(f"Cleaned {worker.cleaned} rows, {worker.failed} failed in {elapsed:.1f}s "
+          f"({handled / elapsed if elapsed else 0:,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# fox_scraper/tools/consolidate.py
+import argparse
+import logging
+import time
+from fox_scraper.core.database import DatabaseManager
+from fox_scraper.core.consolidation import Consolidator
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Consolidate cleaned_data into master_records')
+    parser.add_argument('--chunk-size', type=int, default=2000,
+                        help='New or re-cleaned rows consolidated per transaction')
+    parser.add_argument('--max-chunks', type=int, default=None)
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Drop all master records first and consolidate everything again')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    db = DatabaseManager()
+    db.create_tables()
+    consolidator = Consolidator(db, chunk_size=args.chunk_size)
+
+    if args.rebuild:
+        session = db.get_session()
+        try:
+            consolidator.rebuild(session)
+        finally:
+            session.close()
+
+    start = time.perf_counter()
+    handled = consolidator.run(max_chunks=args.max_chunks)
+    elapsed = time.perf_counter() - start
+    print(f"Consolidated {handled} rows in {elapsed:.1f}s: {consolidator.created} master records created, "
+          f"{consolidator.updated} updated, {consolidator.removed} merged away")
+
+
+if __name__ == "__main__":
+    main()
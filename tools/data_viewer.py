@@ -2,27 +2,101 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from sqlalchemy import create_engine, text
-import os
-from dotenv import load_dotenv
+from sqlalchemy import text
 import json
+from fox_scraper.core.config import get_engine
+from fox_scraper.core.database import estimated_rows
+from fox_scraper.core.rollups import table_counts
 
-# Load environment variables
-load_dotenv()
+# Seconds query results stay cached across reruns and sessions
+QUERY_TTL = 60
+PAGE_SIZE = 50
 
 # Database connection
+@st.cache_resource
 def get_db_connection():
-    return create_engine(
-        f"postgresql://{os.getenv('DB_USER', 'postgres')}:"
-        f"{os.getenv('DB_PASSWORD', 'Milena84')}@"
-        f"{os.getenv('DB_HOST', '192.168.1.164')}:"
-        f"{os.getenv('DB_PORT', '5432')}/"
-        f"{os.getenv('DB_NAME', 'fox_db')}"
-    )
+    # Shared pooled engine, created once per Streamlit process
+    return get_engine()
 
-def load_data(query):
+@st.cache_data(ttl=QUERY_TTL, show_spinner=False)
+def load_data(query, params=None):
     engine = get_db_connection()
-    return pd.read_sql_query(query, engine)
+    return pd.read_sql_query(text(query), engine, params=params)
+
+@st.cache_data(ttl=QUERY_TTL, show_spinner=False)
+def load_json(table, column, row_id):
+    """One JSON column of one row, fetched only when the row is opened"""
+    with get_db_connection().connect() as connection:
+        return connection.execute(
+            text(f"SELECT {column} FROM {table} WHERE id = :id"), {'id': row_id}
+        ).scalar()
+
+@st.cache_data(ttl=QUERY_TTL, show_spinner=False)
+def load_estimated_counts(tables):
+    """Planner estimates instead of COUNT(*) scans over large tables"""
+    with get_db_connection().connect() as connection:
+        return {table: estimated_rows(connection, table) for table in tables}
+
+@st.cache_data(ttl=QUERY_TTL, show_spinner=False)
+def load_table_counts(tables):
+    """Exact counts from the rollup tables, without scanning the tables"""
+    with get_db_connection().connect() as connection:
+        return table_counts(connection, tables)
+
+@st.cache_data(ttl=QUERY_TTL, show_spinner=False)
+def source_names():
+    return load_data("SELECT name FROM data_sources ORDER BY name")['name'].tolist()
+
+def keyset_page(view, query, params, cursor_columns, page_size=PAGE_SIZE):
+    """One page of a keyset-paginated query, with previous/next buttons
+
+    The query filters on :before_<column> for each cursor column (NULL on
+    the first page) and ends with ORDER BY those columns DESC LIMIT :limit.
+    Pages are remembered per view and reset when the filters change.
+    """
+    state_key = f'{view}_cursors'
+    filters = json.dumps(params, sort_keys=True, default=str)
+    if st.session_state.get(f'{view}_filters') != filters:
+        st.session_state[f'{view}_filters'] = filters
+        st.session_state[state_key] = [None]
+    cursors = st.session_state[state_key]
+
+    cursor = cursors[-1] or {}
+    page_params = dict(params, limit=page_size + 1)
+    for column in cursor_columns:
+        page_params[f'before_{column}'] = cursor.get(column)
+    data = load_data(query, page_params)
+    has_next = len(data) > page_size
+    data = data.iloc[:page_size]
+
+    col1, col2, col3 = st.columns([1, 1, 6])
+    with col1:
+        if st.button("Previous", key=f'{view}_prev', disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if st.button("Next", key=f'{view}_next', disabled=not has_next):
+            last = data.iloc[-1]
+            cursors.append({column: cursor_value(last[column]) for column in cursor_columns})
+            st.rerun()
+    with col3:
+        st.caption(f"Page {len(cursors)}, {len(data)} rows")
+    return data
+
+def cursor_value(value):
+    # Plain values keep cached query parameters hashable and bindable
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value.item() if hasattr(value, 'item') else value
+
+def show_row_json(table, columns, data, key):
+    """Pick a row of the page and show its JSON columns"""
+    if data.empty:
+        return
+    row_id = st.selectbox("Show details of row", options=data['id'].tolist(), key=key)
+    for column in columns:
+        st.caption(column)
+        st.json(load_json(table, column, int(row_id)) or {})
 
 def main():
     st.set_page_config(page_title="Fox Scraper Data Viewer", layout="wide")
@@ -52,19 +126,15 @@ def show_overview():
     col1, col2, col3 = st.columns(3)
     
     # Get counts from different tables
-    counts = load_data("""
-        SELECT
-            (SELECT COUNT(*) FROM data_sources) as sources_count,
-            (SELECT COUNT(*) FROM raw_data) as raw_count,
-            (SELECT COUNT(*) FROM master_records) as master_count
-    """)
+    counts = load_estimated_counts(('data_sources',))
+    counts.update(load_table_counts(('raw_data', 'master_records')))
     
     with col1:
-        st.metric("Data Sources", counts['sources_count'].iloc[0])
+        st.metric("Data Sources", counts['data_sources'])
     with col2:
-        st.metric("Raw Records", counts['raw_count'].iloc[0])
+        st.metric("Raw Records", counts['raw_data'])
     with col3:
-        st.metric("Master Records", counts['master_count'].iloc[0])
+        st.metric("Master Records", counts['master_records'])
     
     # Show recent scraping runs
     st.subheader("Recent Scraping Runs")
@@ -83,16 +153,16 @@ def show_overview():
     """)
     st.dataframe(runs)
     
-    # Show data source statistics
+    # Show data source statistics, from the daily rollups
     st.subheader("Data Source Statistics")
     source_stats = load_data("""
         SELECT 
             ds.name as source,
-            COUNT(rd.id) as records,
-            MIN(rd.scraped_at) as first_scrape,
-            MAX(rd.scraped_at) as last_scrape
+            COALESCE(SUM(rt.records), 0) as records,
+            MIN(rt.day) as first_scrape_day,
+            MAX(rt.day) as last_scrape_day
         FROM data_sources ds
-        LEFT JOIN raw_data rd ON ds.id = rd.source_id
+        LEFT JOIN rollup_totals rt ON rt.table_name = 'raw_data' AND rt.source_id = ds.id
         GROUP BY ds.name
     """)
     st.dataframe(source_stats)
@@ -105,7 +175,7 @@ def show_raw_data():
     with col1:
         source = st.selectbox(
             "Select Data Source",
-            options=load_data("SELECT name FROM data_sources")['name'].tolist()
+            options=source_names()
         )
     with col2:
         status = st.selectbox(
@@ -113,23 +183,27 @@ def show_raw_data():
             options=['All', 'pending', 'processed', 'failed']
         )
     
-    # Build query
+    # Build query; raw_content is only loaded for the row being inspected
     query = """
-        SELECT rd.id, rd.url, rd.scraped_at, rd.processing_status, rd.raw_content
+        SELECT rd.id, rd.url, rd.scraped_at, rd.last_seen_at, rd.processing_status,
+               rd.raw_content ->> 'name' AS name
         FROM raw_data rd
-        JOIN data_sources ds ON rd.source_id = ds.id
-        WHERE ds.name = :source
+        WHERE rd.source_id = (SELECT id FROM data_sources WHERE name = :source)
+          AND (CAST(:before_id AS INTEGER) IS NULL OR rd.id < :before_id)
     """
+    params = {'source': source}
     if status != 'All':
         query += " AND rd.processing_status = :status"
+        params['status'] = status
+    query += " ORDER BY rd.id DESC LIMIT :limit"
     
     # Load data
-    params = {'source': source, 'status': status}
-    data = load_data(query)
+    data = keyset_page('raw', query, params, ['id'])
     
     # Display data
     if not data.empty:
         st.dataframe(data)
+        show_row_json('raw_data', ['raw_content'], data, key='raw_row')
     else:
         st.info("No data found for selected filters")
 
@@ -141,7 +215,7 @@ def show_cleaned_data():
     with col1:
         source = st.selectbox(
             "Select Data Source",
-            options=load_data("SELECT name FROM data_sources")['name'].tolist(),
+            options=source_names(),
             key='cleaned_source'
         )
     with col2:
@@ -156,21 +230,26 @@ def show_cleaned_data():
             cd.id,
             cd.name,
             cd.category,
-            cd.address,
-            cd.contact,
+            cd.address ->> 'postcode' AS postcode,
+            cd.address ->> 'city' AS city,
+            cd.contact ->> 'phone_e164' AS phone,
             cd.cleaned_at,
             cd.validation_status
         FROM cleaned_data cd
-        JOIN data_sources ds ON cd.source_id = ds.id
-        WHERE ds.name = :source
+        WHERE cd.source_id = (SELECT id FROM data_sources WHERE name = :source)
+          AND (CAST(:before_id AS INTEGER) IS NULL OR cd.id < :before_id)
     """
+    params = {'source': source}
     if validation_status != 'All':
         query += " AND cd.validation_status = :status"
+        params['status'] = validation_status
+    query += " ORDER BY cd.id DESC LIMIT :limit"
     
-    data = load_data(query)
+    data = keyset_page('cleaned', query, params, ['id'])
     
     if not data.empty:
         st.dataframe(data)
+        show_row_json('cleaned_data', ['address', 'contact', 'data_json'], data, key='cleaned_row')
     else:
         st.info("No cleaned data found for selected filters")
 
@@ -180,41 +259,50 @@ def show_master_records():
     # Search functionality
     search_term = st.text_input("Search by name or ID")
     
+    columns = """
+        SELECT id, external_id, name, type, status, address ->> 'postcode' AS postcode,
+               address ->> 'city' AS city, confidence_score, updated_at
+        FROM master_records
+    """
     if search_term:
-        query = """
-            SELECT *
-            FROM master_records
-            WHERE name ILIKE :search
-            OR external_id ILIKE :search
+        query = columns + """
+            WHERE (name ILIKE :search OR external_id ILIKE :search)
+              AND (CAST(:before_id AS INTEGER) IS NULL OR id < :before_id)
+            ORDER BY id DESC
+            LIMIT :limit
         """
-        data = load_data(query, {'search': f'%{search_term}%'})
+        data = keyset_page('master_search', query, {'search': f'%{search_term}%'}, ['id'])
         
         if not data.empty:
             st.dataframe(data)
+            show_row_json('master_records', ['primary_data', 'contact', 'sources'], data, key='master_row')
         else:
             st.info("No records found matching your search")
     else:
         # Show recent records
         st.subheader("Recent Records")
-        recent = load_data("""
-            SELECT *
-            FROM master_records
-            ORDER BY updated_at DESC
-            LIMIT 100
-        """)
+        recent = keyset_page('master_recent', columns + """
+            WHERE CAST(:before_updated_at AS TIMESTAMP) IS NULL
+               OR (updated_at, id) < (CAST(:before_updated_at AS TIMESTAMP), :before_id)
+            ORDER BY updated_at DESC, id DESC
+            LIMIT :limit
+        """, {}, ['updated_at', 'id'])
         st.dataframe(recent)
+        show_row_json('master_records', ['primary_data', 'contact', 'sources'], recent, key='master_recent_row')
 
 def show_analysis():
     st.title("Data Analysis")
     
-    # Record counts over time
+    # Record counts over time; all charts read the rollups, O(days) rows
     st.subheader("Data Collection Progress")
     timeline = load_data("""
         SELECT 
-            DATE(scraped_at) as date,
-            COUNT(*) as count
-        FROM raw_data
-        GROUP BY DATE(scraped_at)
+            day as date,
+            SUM(records) as count
+        FROM rollup_totals
+        WHERE table_name = 'raw_data'
+        GROUP BY day
+        HAVING SUM(records) <> 0
         ORDER BY date
     """)
     
@@ -225,10 +313,12 @@ def show_analysis():
     st.subheader("Data Quality Overview")
     validation_stats = load_data("""
         SELECT 
-            validation_status,
-            COUNT(*) as count
-        FROM cleaned_data
-        GROUP BY validation_status
+            status as validation_status,
+            SUM(records) as count
+        FROM rollup_totals
+        WHERE table_name = 'cleaned_data'
+        GROUP BY status
+        HAVING SUM(records) <> 0
     """)
     
     fig = px.pie(validation_stats, values='count', names='validation_status', 
@@ -240,9 +330,9 @@ def show_analysis():
     source_stats = load_data("""
         SELECT 
             ds.name as source,
-            COUNT(rd.id) as count
+            COALESCE(SUM(rt.records), 0) as count
         FROM data_sources ds
-        LEFT JOIN raw_data rd ON ds.id = rd.source_id
+        LEFT JOIN rollup_totals rt ON rt.table_name = 'raw_data' AND rt.source_id = ds.id
         GROUP BY ds.name
     """)
     
@@ -251,4 +341,4 @@ def show_analysis():
     st.plotly_chart(fig)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
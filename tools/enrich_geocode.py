@@ -0,0 +1,40 @@
+# fox_scraper/tools/enrich_geocode.py
+import argparse
+import logging
+import os
+from fox_scraper.core.database import DatabaseManager
+from fox_scraper.core.geocoding import Gazetteer, Geocoder, GeocodingWorker
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Geocode cleaned addresses into enriched_data, offline')
+    parser.add_argument('--gazetteer', default=os.getenv('GAZETTEER_PATH'),
+                        help='CSV (or .csv.gz) with postcode,city,street,lat,lon columns')
+    parser.add_argument('--chunk-size', type=int, default=5000,
+                        help='Rows geocoded and written per transaction')
+    parser.add_argument('--cache-size', type=int, default=50000,
+                        help='Normalized addresses kept in the LRU cache')
+    parser.add_argument('--max-chunks', type=int, default=None)
+    parser.add_argument('--reprocess', action='store_true',
+                        help='Geocode every cleaned row again, e.g. after a gazetteer update')
+    args = parser.parse_args()
+    if not args.gazetteer:
+        parser.error('--gazetteer or GAZETTEER_PATH is required')
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    db = DatabaseManager()
+    db.create_tables()
+
+    geocoder = Geocoder(Gazetteer(args.gazetteer), cache_size=args.cache_size)
+    worker = GeocodingWorker(db, geocoder, chunk_size=args.chunk_size, reprocess=args.reprocess)
+    worker.run(max_chunks=args.max_chunks)
+
+    stats = worker.stats()
+    print(f"Geocoded {stats['geocoded']} of {stats['addresses']} addresses "
+          f"({stats['unmatched']} unmatched) at {stats['addresses_per_sec']:,.0f} addresses/sec")
+    print(f"Cache: {stats['cache_hit_rate']:.1%} hit rate, {stats['cache_size']}/{stats['cache_max_size']} entries, "
+          f"{stats['lookups_per_sec']:,.0f} lookups/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# fox_scraper/tools/export_data.py
+import argparse
+import logging
+import time
+from datetime import datetime
+from sqlalchemy import text
+from fox_scraper.core.config import get_engine
+from fox_scraper.core.export import TABLES, WRITERS, ExportFilters, export_table
+
+
+def parse_date(value):
+    return datetime.fromisoformat(value)
+
+
+def resolve_source(engine, source):
+    """data_sources id of a source given by id or name"""
+    if source is None or source.isdigit():
+        return int(source) if source else None
+    with engine.connect() as connection:
+        source_id = connection.execute(
+            text("SELECT id FROM data_sources WHERE name = :name"), {'name': source}
+        ).scalar()
+    if source_id is None:
+        raise SystemExit(f"Unknown source: {source}")
+    return source_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream a table to CSV, NDJSON or Parquet in bounded memory')
+    parser.add_argument('table', choices=sorted(TABLES))
+    parser.add_argument('output', help='Output file (.gz compresses CSV/NDJSON) or, for Parquet, a directory')
+    parser.add_argument('--format', choices=sorted(WRITERS), default=None,
+                        help='Defaults to the output extension, else csv')
+    parser.add_argument('--source', default=None, help='Data source id or name')
+    parser.add_argument('--run-id', type=int, default=None)
+    parser.add_argument('--since', type=parse_date, default=None, help='ISO date, inclusive')
+    parser.add_argument('--until', type=parse_date, default=None, help='ISO date, exclusive')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows fetched and written at a time')
+    parser.add_argument('--rows-per-file', type=int, default=500000, help='Rows per Parquet part file')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue after the last id recorded in <output>.state')
+    args = parser.parse_args()
+
+    fmt = args.format
+    if fmt is None:
+        name = args.output[:-3] if args.output.endswith('.gz') else args.output
+        fmt = next((candidate for candidate in WRITERS if name.endswith(f'.{candidate}')), 'csv')
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    engine = get_engine()
+    filters = ExportFilters(
+        source_id=resolve_source(engine, args.source),
+        run_id=args.run_id,
+        since=args.since,
+        until=args.until
+    )
+
+    start = time.perf_counter()
+    writer_options = {'rows_per_file': args.rows_per_file} if fmt == 'parquet' else {}
+    written = export_table(engine, args.table, args.output, fmt, filters,
+                           chunk_size=args.chunk_size, resume=args.resume, **writer_options)
+    elapsed = time.perf_counter() - start
+    print(f"Exported {written} {args.table} rows to {args.output} ({fmt}) in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()